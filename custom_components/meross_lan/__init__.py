@@ -2,17 +2,19 @@
 from __future__ import annotations
 import typing
 from time import time
+from collections import deque
+from zlib import crc32
+import asyncio
 from logging import WARNING, INFO, DEBUG
-from json import (
-    dumps as json_dumps,
-    loads as json_loads,
-)
 from homeassistant.config_entries import ConfigEntry, SOURCE_DISCOVERY
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.components.mqtt.const import MQTT_DISCONNECTED
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.exceptions import ConfigEntryNotReady
+try:
+    from homeassistant.config_entries import SIGNAL_CONFIG_ENTRY_CHANGED
+except ImportError:  # older cores: we'll rely on the index timeout
+    SIGNAL_CONFIG_ENTRY_CHANGED = None
 
 from .merossclient import (
     const as mc, KeyType,
@@ -20,23 +22,30 @@ from .merossclient import (
     build_payload, build_default_payload_get, get_replykey,
 )
 from .merossclient.httpclient import MerossHttpClient
-from .meross_device import MerossDevice
+from .merossclient.codec import json_dumpb, json_loads
 
 from .helpers import (
     LOGGER, LOGGER_trap,
     mqtt_publish, mqtt_is_connected,
+    parse_host_port,
 )
 from .const import (
     DOMAIN, SERVICE_REQUEST,
     CONF_HOST, CONF_PROTOCOL, CONF_PROTOCOL_HTTP, CONF_PROTOCOL_MQTT,
     CONF_DEVICE_ID, CONF_KEY, CONF_CLOUD_KEY, CONF_PAYLOAD,
+    CONF_MQTT_BROKER, CONF_MQTT_BROKER_PORT_DEFAULT, CONF_MQTT_USERNAME, CONF_MQTT_PASSWORD,
     PARAM_UNAVAILABILITY_TIMEOUT,PARAM_HEARTBEAT_PERIOD,
+    PARAM_HTTP_POOL_LIMIT, PARAM_HTTP_POOL_LIMIT_PER_HOST, PARAM_HTTP_KEEPALIVE_TIMEOUT,
+    PARAM_POLLING_WHEEL_SIZE, PARAM_POLLING_CONCURRENCY, PARAM_QUARANTINE_CONCURRENCY,
+    PARAM_DEVICE_INDEX_TIMEOUT, PARAM_UNKNOWN_DEVICE_THROTTLE,
 )
 
 if typing.TYPE_CHECKING:
     from typing import Callable, Coroutine
     from asyncio import TimerHandle
-    from .meross_device import ResponseCallbackType
+    from aiohttp import ClientSession
+    from .meross_device import MerossDevice, ResponseCallbackType
+    from .merossclient.mqttclient import MerossMQTTClient, MQTTMessage
 
 
 class MerossApi:
@@ -46,6 +55,9 @@ class MerossApi:
     """
     KEY_STARTTIME = '__starttime'
     KEY_REQUESTTIME = '__requesttime'
+    # device_id is extracted from topic '/appliance/{device_id}/publish'
+    TOPIC_DEVICE_ID_START = len("/appliance/")
+    TOPIC_DEVICE_ID_END = -len("/publish")
 
     key: str | None
     cloud_key: str | None
@@ -55,8 +67,13 @@ class MerossApi:
     mqtt_subscribing: bool
     unsub_mqtt_subscribe: Callable | None
     unsub_mqtt_disconnected: Callable | None
+    mqtt_client: MerossMQTTClient | None
     unsub_entry_update_listener: Callable | None
     unsub_discovery_callback: TimerHandle | None
+    _http_session: ClientSession | None
+    _polling_wheel: list[set[MerossDevice]]
+    _polling_schedule: dict[MerossDevice, list[int]]
+    _unsub_polling_tick: TimerHandle | None
 
     @staticmethod
     def peek(hass: HomeAssistant) -> 'MerossApi' | None:
@@ -88,8 +105,42 @@ class MerossApi:
         self.mqtt_subscribing = False # guard for asynchronous mqtt sub registration
         self.unsub_mqtt_subscribe = None
         self.unsub_mqtt_disconnected = None
+        self.mqtt_client = None # our own MQTT client when a broker is configured in the hub entry
         self.unsub_entry_update_listener = None
         self.unsub_discovery_callback = None
+        # index of device_ids (ConfigEntry.unique_id) which are not managed by any
+        # MerossDevice (disabled, ignored, flow in progress,...): see _get_device_index
+        self._device_index: dict[str, str] | None = None
+        self._device_index_epoch = 0
+        self._unknown_device_epochs: dict[str, float] = {}
+        self._unknown_device_purge_epoch = 0
+        self.unsub_entry_changed = None
+        if SIGNAL_CONFIG_ENTRY_CHANGED is not None:
+            @callback
+            def _entry_changed(change, entry: ConfigEntry):
+                if entry.domain == DOMAIN:
+                    self._device_index = None
+
+            self.unsub_entry_changed = async_dispatcher_connect(
+                hass, SIGNAL_CONFIG_ENTRY_CHANGED, _entry_changed
+            )
+        self._http_session = None
+        self._unsub_http_session_close = None
+        self._http_stats_new = 0
+        self._http_stats_reused = 0
+        self._http_stats_new_epochs = deque()
+        # polling scheduler: a (hashed) timer wheel with 1 sec resolution
+        # where devices are queued in the slot for their next polling
+        # _polling_schedule maps the scheduled device to [slot, rounds]
+        self._polling_wheel = [set() for _ in range(PARAM_POLLING_WHEEL_SIZE)]
+        self._polling_wheel_cursor = 0
+        self._polling_schedule = {}
+        self._polling_semaphore = asyncio.Semaphore(PARAM_POLLING_CONCURRENCY)
+        # slow lane for quarantined devices so that they don't steal slots to the healthy ones
+        self._quarantine_semaphore = asyncio.Semaphore(PARAM_QUARANTINE_CONCURRENCY)
+        self._polling_inflight = 0
+        self._polling_tick_time = 0
+        self._unsub_polling_tick = None
 
         @callback
         def _request(service_call):
@@ -105,7 +156,7 @@ class MerossApi:
                     device.request(namespace, method, payload)
                     return
                 # device not registered (yet?) try direct MQTT
-                if (self.unsub_mqtt_subscribe is not None) and mqtt_is_connected(self.hass):
+                if (self.unsub_mqtt_subscribe is not None) and self.mqtt_connected:
                     self.mqtt_publish(device_id, namespace, method, payload, key)
                     return
                 if host is None:
@@ -126,20 +177,95 @@ class MerossApi:
         return
 
     def shutdown(self):
-        if self.unsub_mqtt_disconnected is not None:
-            self.unsub_mqtt_disconnected()
-            self.unsub_mqtt_disconnected = None
-        if self.unsub_mqtt_subscribe is not None:
-            self.unsub_mqtt_subscribe()
-            self.unsub_mqtt_subscribe = None
+        if self.unsub_entry_changed is not None:
+            self.unsub_entry_changed()
+            self.unsub_entry_changed = None
+        self.mqtt_unregister()
         if self.unsub_entry_update_listener is not None:
             self.unsub_entry_update_listener()
             self.unsub_entry_update_listener = None
         if self.unsub_discovery_callback is not None:
             self.unsub_discovery_callback.cancel()
             self.unsub_discovery_callback = None
+        if self._unsub_polling_tick is not None:
+            self._unsub_polling_tick.cancel()
+            self._unsub_polling_tick = None
+        if self._unsub_http_session_close is not None:
+            self._unsub_http_session_close()
+            self._unsub_http_session_close = None
+        if self._http_session is not None:
+            self.hass.async_create_task(self._http_session.close())
+            self._http_session = None
         self.hass.data.pop(DOMAIN)
 
+    @property
+    def http_session(self) -> ClientSession:
+        """
+        dedicated (lazy created) session shared among our devices: the HA shared
+        one is tuned for 'general' usage while we want to limit concurrent
+        connections to the (tiny) embedded device servers and reuse them when possible
+        """
+        if self._http_session is None:
+            import aiohttp
+
+            async def _on_connection_create_end(session, context, params):
+                self._http_stats_new += 1
+                self._http_stats_new_epochs.append(time())
+
+            async def _on_connection_reuseconn(session, context, params):
+                self._http_stats_reused += 1
+
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(_on_connection_create_end)
+            trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=PARAM_HTTP_POOL_LIMIT,
+                    limit_per_host=PARAM_HTTP_POOL_LIMIT_PER_HOST,
+                    keepalive_timeout=PARAM_HTTP_KEEPALIVE_TIMEOUT,
+                ),
+                trace_configs=[trace_config],
+            )
+
+            if self._unsub_http_session_close is None:
+                # the session could be re-created after being closed: the
+                # listener is 'once' so we just need to not stack them up
+                @callback
+                def _on_close(_event):
+                    self._unsub_http_session_close = None
+                    if self._http_session is not None:
+                        self.hass.async_create_task(self._http_session.close())
+                        self._http_session = None
+
+                self._unsub_http_session_close = self.hass.bus.async_listen_once(
+                    EVENT_HOMEASSISTANT_CLOSE, _on_close
+                )
+
+        return self._http_session
+
+    def get_http_pool_stats(self) -> dict:
+        epoch = time()
+        new_epochs = self._http_stats_new_epochs
+        while new_epochs and ((epoch - new_epochs[0]) > 60):
+            new_epochs.popleft()
+        stats = {
+            "open": None,
+            "new": self._http_stats_new,
+            "reused": self._http_stats_reused,
+            "new_per_minute": len(new_epochs),
+        }
+        if self._http_session is not None:
+            # peeking into aiohttp internals (not critical): these are private
+            # and could disappear in any aiohttp release so the stat is 'best effort'
+            connector = self._http_session.connector
+            acquired = getattr(connector, "_acquired", None)
+            conns = getattr(connector, "_conns", None)
+            if isinstance(acquired, set) and isinstance(conns, dict):
+                stats["open"] = len(acquired) + sum(
+                    len(_conns) for _conns in conns.values()
+                )
+        return stats
+
     def get_device_with_mac(self, macaddress:str):
         # macaddress from dhcp discovery is already stripped/lower but...
         macaddress = macaddress.replace(':', '').lower()
@@ -162,6 +288,7 @@ class MerossApi:
             from .meross_device_hub import MerossDeviceHub
             class_base = MerossDeviceHub
         else:
+            from .meross_device import MerossDevice
             class_base = MerossDevice
 
         mixin_classes = []
@@ -226,6 +353,8 @@ class MerossApi:
             class_type = self.deviceclasses[class_name]
         else:
             class_type = type(class_name, tuple(mixin_classes), {})
+            # precompute message dispatching for the new class
+            class_type.build_dispatch_tables()
             self.deviceclasses[class_name] = class_type
 
         device = class_type(self, descriptor, entry)
@@ -241,98 +370,256 @@ class MerossApi:
     def schedule_callback(self, delay: float, target: Callable, *args) -> TimerHandle:
         return self.hass.loop.call_later(delay, target, *args)
 
+    @staticmethod
+    def polling_jitter(device_id: str, period: int) -> int:
+        """
+        deterministic 'phase' for the device polling cycle so that devices
+        get spread over the period (and keep their position across restarts)
+        """
+        return crc32(device_id.encode()) % period if period > 0 else 0
+
+    def polling_schedule(self, device: MerossDevice, delay: float):
+        """
+        (re)schedule the device polling cycle (_async_polling_callback) after delay
+        """
+        self.polling_unschedule(device)
+        ticks = max(int(delay + 0.5), 1)
+        wheel_size = len(self._polling_wheel)
+        slot = (self._polling_wheel_cursor + ticks) % wheel_size
+        self._polling_wheel[slot].add(device)
+        self._polling_schedule[device] = [slot, (ticks - 1) // wheel_size]
+        if self._unsub_polling_tick is None:
+            loop = self.hass.loop
+            self._polling_tick_time = loop.time() + 1
+            self._unsub_polling_tick = loop.call_at(
+                self._polling_tick_time, self._polling_tick
+            )
+
+    def polling_advance(self, device: MerossDevice, delay: float):
+        """
+        anticipate the device polling cycle if it is scheduled later than delay.
+        If it's not scheduled at all it is running right now and will reschedule itself
+        """
+        if (schedule := self._polling_schedule.get(device)) is not None:
+            wheel_size = len(self._polling_wheel)
+            ticks = (
+                ((schedule[0] - self._polling_wheel_cursor - 1) % wheel_size)
+                + 1
+                + schedule[1] * wheel_size
+            )
+            if ticks > delay:
+                self.polling_schedule(device, delay)
+
+    def polling_unschedule(self, device: MerossDevice):
+        if (schedule := self._polling_schedule.pop(device, None)) is not None:
+            self._polling_wheel[schedule[0]].discard(device)
+
+    @callback
+    def _polling_tick(self):
+        wheel_size = len(self._polling_wheel)
+        self._polling_wheel_cursor = cursor = (self._polling_wheel_cursor + 1) % wheel_size
+        if (devices := self._polling_wheel[cursor]):
+            for device in list(devices):
+                schedule = self._polling_schedule[device]
+                if schedule[1]:
+                    schedule[1] -= 1
+                else:
+                    devices.remove(device)
+                    self._polling_schedule.pop(device)
+                    self.hass.async_create_task(self._async_polling_run(device))
+
+        if self._polling_schedule:
+            self._polling_tick_time += 1
+            self._unsub_polling_tick = self.hass.loop.call_at(
+                self._polling_tick_time, self._polling_tick
+            )
+        else:
+            self._unsub_polling_tick = None
+
+    async def _async_polling_run(self, device: MerossDevice):
+        # cap the number of devices concurrently polling: when the semaphore
+        # is exhausted devices will wait their turn here
+        async with (
+            self._quarantine_semaphore if device.quarantined else self._polling_semaphore
+        ):
+            # the device could have been unloaded while waiting its turn
+            if self.devices.get(device.device_id) is not device:
+                return
+            self._polling_inflight += 1
+            try:
+                await device._async_polling_callback()
+            finally:
+                self._polling_inflight -= 1
+
+    def get_polling_stats(self) -> dict:
+        return {
+            "scheduled": len(self._polling_schedule),
+            "inflight": self._polling_inflight,
+            "quarantined": sum(1 for device in self.devices.values() if device.quarantined),
+        }
+
     @property
     def mqtt_registered(self):
         return self.unsub_mqtt_subscribe is not None
 
+    @property
+    def mqtt_connected(self) -> bool:
+        if (mqtt_client := self.mqtt_client) is not None:
+            return mqtt_client.connected
+        return mqtt_is_connected(self.hass)
+
+    def invalidate_device_index(self):
+        self._device_index = None
+
+    def _get_device_index(self) -> dict[str, str]:
+        """
+        returns the index of device_ids (ConfigEntry.unique_id) we know about
+        mapped to the reason we're not managing them. The index is invalidated
+        on ConfigEntry changes and anyway rebuilt every PARAM_DEVICE_INDEX_TIMEOUT
+        since we're not notified about flows progress
+        """
+        epoch = time()
+        if (
+            (device_index := self._device_index) is None
+            or (epoch - self._device_index_epoch) > PARAM_DEVICE_INDEX_TIMEOUT
+        ):
+            device_index = {}
+            for domain_entry in self.hass.config_entries.async_entries(DOMAIN):
+                device_index[domain_entry.unique_id] = (
+                    "disabled" if domain_entry.disabled_by is not None
+                    else "ignored" if domain_entry.source == "ignore"
+                    else "unknown"
+                )
+            for flow in self.hass.config_entries.flow.async_progress_by_handler(DOMAIN):
+                flow_unique_id = flow.get("context", {}).get("unique_id")
+                if flow_unique_id not in device_index:
+                    device_index[flow_unique_id] = "in progress"
+            self._device_index = device_index
+            self._device_index_epoch = epoch
+        return device_index
+
+    def _mqtt_route(self, device_id: str, payload) -> bool:
+        """dispatch the message to the (registered) device: returns False if unknown"""
+        if (device := self.devices.get(device_id)) is None:
+            return False
+        message = json_loads(payload)
+        header = message[mc.KEY_HEADER]
+        if LOGGER.isEnabledFor(DEBUG):
+            LOGGER.debug("MerossApi: MQTT RECV device_id:(%s) method:(%s) namespace:(%s)", device_id, header[mc.KEY_METHOD], header[mc.KEY_NAMESPACE])
+        device.mqtt_receive(header, message[mc.KEY_PAYLOAD])
+        return True
+
+    @callback
+    def _mqtt_client_message(self, msg: MQTTMessage):
+        """on_message handler for our own MQTT client: registered devices are served inline"""
+        try:
+            device_id = msg.topic[MerossApi.TOPIC_DEVICE_ID_START:MerossApi.TOPIC_DEVICE_ID_END]
+            if self._mqtt_route(device_id, msg.payload):
+                return
+        except Exception as error:
+            LOGGER.debug("MerossApi: _mqtt_client_message exception:(%s) payload:(%s)", str(error), str(msg))
+            return
+        self.hass.async_create_task(self.async_mqtt_receive(msg))
+
+    @callback
+    def _mqtt_disconnected(self):
+        for device in self.devices.values():
+            device.mqtt_disconnected()
+
     @callback
     async def async_mqtt_receive(self, msg):
         """ global MQTT discovery (for unregistered) and routing (for registered devices)"""
         try:
+            device_id = msg.topic[MerossApi.TOPIC_DEVICE_ID_START:MerossApi.TOPIC_DEVICE_ID_END]
+            if self._mqtt_route(device_id, msg.payload):
+                return
+
+            # lookout for any disabled/ignored entry or
+            # discovered integrations waiting in HA queue
+            device_index = self._get_device_index()
+            if (msg_reason := device_index.get(device_id)) is not None:
+                LOGGER_trap(INFO, 14400, "Ignoring discovery for device_id: %s (ConfigEntry is %s)", device_id, msg_reason)
+                return
+
+            if (discovered := self.discovering.get(device_id)) is None:
+                # this is a new device: throttle the processing of its messages
+                # so that a chatty (unpaired) device doesn't cost us on every publish
+                epoch = time()
+                unknown_device_epochs = self._unknown_device_epochs
+                if (epoch - unknown_device_epochs.get(device_id, 0)) < PARAM_UNKNOWN_DEVICE_THROTTLE:
+                    return
+                if (epoch - self._unknown_device_purge_epoch) > PARAM_UNKNOWN_DEVICE_THROTTLE:
+                    # entries out of the throttle window are useless: evict them
+                    # (at most once per window) so that the dict doesn't grow unbounded
+                    self._unknown_device_purge_epoch = epoch
+                    for _device_id in [
+                        _device_id
+                        for _device_id, _epoch in unknown_device_epochs.items()
+                        if (epoch - _epoch) >= PARAM_UNKNOWN_DEVICE_THROTTLE
+                    ]:
+                        unknown_device_epochs.pop(_device_id)
+                unknown_device_epochs[device_id] = epoch
+
             message = json_loads(msg.payload)
             header = message[mc.KEY_HEADER]
-            device_id = msg.topic.split("/")[2]
             if LOGGER.isEnabledFor(DEBUG):
                 LOGGER.debug("MerossApi: MQTT RECV device_id:(%s) method:(%s) namespace:(%s)", device_id, header[mc.KEY_METHOD], header[mc.KEY_NAMESPACE])
-            if (device := self.devices.get(device_id)) is None:
-                # lookout for any disabled/ignored entry
-                mqtt_entry_present = False
-                for domain_entry in self.hass.config_entries.async_entries(DOMAIN):
-                    if (domain_entry.unique_id == device_id):
-                        # entry already present...
-                        #if domain_entry.disabled_by == DOMAIN:
-                            # we previously disabled this one due to extended anuavailability
-                            #await self.hass.config_entries.async_set_disabled_by(domain_entry.entry_id, None)
-                        # skip discovery anyway
-                        msg_reason = "disabled" if domain_entry.disabled_by is not None \
-                            else "ignored" if domain_entry.source == "ignore" \
-                                else "unknown"
-                        LOGGER_trap(INFO, 14400, "Ignoring discovery for device_id: %s (ConfigEntry is %s)", device_id, msg_reason)
-                        return
-                    mqtt_entry_present |= domain_entry.unique_id == DOMAIN
-                #also skip discovered integrations waiting in HA queue
-                for flow in self.hass.config_entries.flow.async_progress_by_handler(DOMAIN):
-                    flow_unique_id = flow.get("context", {}).get("unique_id")
-                    if (flow_unique_id == device_id):
-                        LOGGER_trap(INFO, 14400, "Ignoring discovery for device_id: %s (ConfigEntry is in progress)", device_id)
-                        return
-                    mqtt_entry_present |= flow_unique_id == DOMAIN
 
-                if (not mqtt_entry_present):
-                    await self.hass.config_entries.flow.async_init(
-                        DOMAIN,
-                        context={ "source": "hub" },
-                        data=None,
-                    )
+            if DOMAIN not in device_index:
+                # the MQTT hub entry is neither configured nor in progress
+                device_index[DOMAIN] = "in progress"
+                await self.hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={ "source": "hub" },
+                    data=None,
+                )
 
-                replykey = get_replykey(header, self.key)
-                if replykey is not self.key:
-                    LOGGER_trap(WARNING, 300, "Meross discovery key error for device_id: %s", device_id)
-                    if self.key is not None:# we're using a fixed key in discovery so ignore this device
-                        return
+            replykey = get_replykey(header, self.key)
+            if replykey is not self.key:
+                LOGGER_trap(WARNING, 300, "Meross discovery key error for device_id: %s", device_id)
+                if self.key is not None:# we're using a fixed key in discovery so ignore this device
+                    return
 
-                discovered = self.discovering.get(device_id)
-                if discovered is None:
-                    # new device discovered: try to determine the capabilities
-                    self.mqtt_publish_get(device_id, mc.NS_APPLIANCE_SYSTEM_ALL, replykey)
-                    epoch = time()
-                    self.discovering[device_id] = {
-                        MerossApi.KEY_STARTTIME: epoch,
-                        MerossApi.KEY_REQUESTTIME: epoch
-                        }
-                    if self.unsub_discovery_callback is None:
-                        self.unsub_discovery_callback = self.schedule_callback(
-                            PARAM_UNAVAILABILITY_TIMEOUT + 2,
-                            self.discovery_callback
-                        )
-                else:
-                    if header[mc.KEY_METHOD] == mc.METHOD_GETACK:
-                        namespace = header[mc.KEY_NAMESPACE]
-                        if namespace == mc.NS_APPLIANCE_SYSTEM_ALL:
-                            discovered[mc.NS_APPLIANCE_SYSTEM_ALL] = message[mc.KEY_PAYLOAD]
-                            self.mqtt_publish_get(device_id, mc.NS_APPLIANCE_SYSTEM_ABILITY, replykey)
+            if discovered is None:
+                # new device discovered: try to determine the capabilities
+                self.mqtt_publish_get(device_id, mc.NS_APPLIANCE_SYSTEM_ALL, replykey)
+                epoch = time()
+                self.discovering[device_id] = {
+                    MerossApi.KEY_STARTTIME: epoch,
+                    MerossApi.KEY_REQUESTTIME: epoch
+                    }
+                if self.unsub_discovery_callback is None:
+                    self.unsub_discovery_callback = self.schedule_callback(
+                        PARAM_UNAVAILABILITY_TIMEOUT + 2,
+                        self.discovery_callback
+                    )
+            else:
+                if header[mc.KEY_METHOD] == mc.METHOD_GETACK:
+                    namespace = header[mc.KEY_NAMESPACE]
+                    if namespace == mc.NS_APPLIANCE_SYSTEM_ALL:
+                        discovered[mc.NS_APPLIANCE_SYSTEM_ALL] = message[mc.KEY_PAYLOAD]
+                        self.mqtt_publish_get(device_id, mc.NS_APPLIANCE_SYSTEM_ABILITY, replykey)
+                        discovered[MerossApi.KEY_REQUESTTIME] = time()
+                        return
+                    elif namespace == mc.NS_APPLIANCE_SYSTEM_ABILITY:
+                        if discovered.get(mc.NS_APPLIANCE_SYSTEM_ALL) is None:
+                            self.mqtt_publish_get(device_id, mc.NS_APPLIANCE_SYSTEM_ALL, replykey)
                             discovered[MerossApi.KEY_REQUESTTIME] = time()
                             return
-                        elif namespace == mc.NS_APPLIANCE_SYSTEM_ABILITY:
-                            if discovered.get(mc.NS_APPLIANCE_SYSTEM_ALL) is None:
-                                self.mqtt_publish_get(device_id, mc.NS_APPLIANCE_SYSTEM_ALL, replykey)
-                                discovered[MerossApi.KEY_REQUESTTIME] = time()
-                                return
-                            payload = message[mc.KEY_PAYLOAD]
-                            payload.update(discovered[mc.NS_APPLIANCE_SYSTEM_ALL])
-                            self.discovering.pop(device_id)
-                            await self.hass.config_entries.flow.async_init(
-                                DOMAIN,
-                                context={ "source": SOURCE_DISCOVERY },
-                                data={
-                                    CONF_DEVICE_ID: device_id,
-                                    CONF_PAYLOAD: payload,
-                                    CONF_KEY: self.key
-                                },
-                            )
-                            return
-            else:
-                device.mqtt_receive(header, message[mc.KEY_PAYLOAD])
+                        payload = message[mc.KEY_PAYLOAD]
+                        payload.update(discovered[mc.NS_APPLIANCE_SYSTEM_ALL])
+                        self.discovering.pop(device_id)
+                        device_index[device_id] = "in progress"
+                        await self.hass.config_entries.flow.async_init(
+                            DOMAIN,
+                            context={ "source": SOURCE_DISCOVERY },
+                            data={
+                                CONF_DEVICE_ID: device_id,
+                                CONF_PAYLOAD: payload,
+                                CONF_KEY: self.key
+                            },
+                        )
+                        return
 
         except Exception as error:
             LOGGER.debug("MerossApi: async_mqtt_receive exception:(%s) payload:(%s)", str(error), str(msg))
@@ -346,18 +633,70 @@ class MerossApi:
         if (self.unsub_mqtt_subscribe is None) and (not self.mqtt_subscribing):
             self.mqtt_subscribing = True
             try:
-                @callback
-                def mqtt_disconnected():
-                    for device in self.devices.values():
-                        device.mqtt_disconnected()
-
-                self.unsub_mqtt_subscribe = await self.hass.components.mqtt.async_subscribe(mc.TOPIC_DISCOVERY, self.async_mqtt_receive)
-                self.unsub_mqtt_disconnected = async_dispatcher_connect(self.hass, MQTT_DISCONNECTED, mqtt_disconnected)
-                #self.unsub_mqtt_connected = async_dispatcher_connect(self.hass, MQTT_CONNECTED, mqtt_connected)
-            except:
-                pass
+                if (broker := self._get_mqtt_broker()) is not None:
+                    await self._async_mqtt_client_register(*broker)
+                else:
+                    from homeassistant.components.mqtt.const import MQTT_DISCONNECTED
+
+                    self.unsub_mqtt_subscribe = await self.hass.components.mqtt.async_subscribe(
+                        mc.TOPIC_DISCOVERY, self.async_mqtt_receive, 0, None # encoding = None: we'll get raw bytes
+                    )
+                    self.unsub_mqtt_disconnected = async_dispatcher_connect(self.hass, MQTT_DISCONNECTED, self._mqtt_disconnected)
+                    #self.unsub_mqtt_connected = async_dispatcher_connect(self.hass, MQTT_CONNECTED, mqtt_connected)
+            except Exception as error:
+                LOGGER.warning("MerossApi: MQTT registration failed (%s)", str(error))
             self.mqtt_subscribing = False
 
+    def mqtt_unregister(self):
+        if self.unsub_mqtt_disconnected is not None:
+            self.unsub_mqtt_disconnected()
+            self.unsub_mqtt_disconnected = None
+        if self.unsub_mqtt_subscribe is not None:
+            self.unsub_mqtt_subscribe()
+            self.unsub_mqtt_subscribe = None
+
+    def _get_mqtt_broker(self) -> tuple[str, int, str | None, str | None] | None:
+        """
+        returns (host, port, username, password) when the hub entry is configured
+        to use our own MQTT client instead of the HA mqtt component
+        """
+        for entry in self.hass.config_entries.async_entries(DOMAIN):
+            if entry.unique_id == DOMAIN:
+                if not (broker := entry.data.get(CONF_MQTT_BROKER)):
+                    return None
+                try:
+                    host, port = parse_host_port(broker, CONF_MQTT_BROKER_PORT_DEFAULT)
+                except ValueError as error:
+                    LOGGER.warning("MerossApi: invalid MQTT broker configuration (%s)", str(error))
+                    return None
+                return (
+                    host,
+                    port,
+                    entry.data.get(CONF_MQTT_USERNAME) or None,
+                    entry.data.get(CONF_MQTT_PASSWORD) or None,
+                )
+        return None
+
+    async def _async_mqtt_client_register(self, host: str, port: int, username: str | None, password: str | None):
+        from .merossclient.mqttclient import MerossMQTTClient
+
+        mqtt_client = MerossMQTTClient(host, port, username, password, logger=LOGGER)
+        mqtt_client.on_message = self._mqtt_client_message
+        mqtt_client.on_disconnect = self._mqtt_disconnected
+        await mqtt_client.async_subscribe(mc.TOPIC_DISCOVERY)
+        mqtt_client.start()
+        self.mqtt_client = mqtt_client
+
+        def _unsub():
+            self.mqtt_client = None
+            self.hass.async_create_task(mqtt_client.async_stop())
+
+        self.unsub_mqtt_subscribe = _unsub
+        # like HA mqtt.async_subscribe we're 'registered' even if the broker
+        # is not (yet) reachable: the client will keep retrying in background
+        if not await mqtt_client.async_wait_connected():
+            LOGGER.warning("MerossApi: cannot connect to MQTT broker %s:%d (retrying in background)", host, port)
+
     def mqtt_publish(self,
         device_id: str,
         namespace: str,
@@ -365,15 +704,16 @@ class MerossApi:
         payload: dict,
         key: KeyType = None,
         messageid: str | None = None
-    ):
+    ) -> bool:
+        """returns False when the message couldn't be published (broker disconnected)"""
         LOGGER.debug("MerossApi: MQTT SEND device_id:(%s) method:(%s) namespace:(%s)", device_id, method, namespace)
-        mqtt_publish(
-            self.hass,
-            mc.TOPIC_REQUEST.format(device_id),
-            json_dumps(build_payload(
-                namespace, method, payload, key,
-                mc.TOPIC_RESPONSE.format(device_id), messageid))
-            )
+        message = json_dumpb(build_payload(
+            namespace, method, payload, key,
+            mc.TOPIC_RESPONSE.format(device_id), messageid))
+        if (mqtt_client := self.mqtt_client) is not None:
+            return mqtt_client.publish(mc.TOPIC_REQUEST.format(device_id), message)
+        mqtt_publish(self.hass, mc.TOPIC_REQUEST.format(device_id), message)
+        return True
 
     def mqtt_publish_get(self,
         device_id: str,
@@ -399,7 +739,7 @@ class MerossApi:
         try:
             _httpclient:MerossHttpClient = getattr(self, '_httpclient', None) # type: ignore
             if _httpclient is None:
-                _httpclient = MerossHttpClient(host, key, async_get_clientsession(self.hass), LOGGER)
+                _httpclient = MerossHttpClient(host, key, self.http_session, LOGGER)
                 self._httpclient = _httpclient
             else:
                 _httpclient.host = host
@@ -408,6 +748,8 @@ class MerossApi:
             response = await _httpclient.async_request(namespace, method, payload)
             r_header = response[mc.KEY_HEADER]
             if callback_or_device is not None:
+                from .meross_device import MerossDevice
+
                 if isinstance(callback_or_device, MerossDevice):
                     callback_or_device.receive(r_header, response[mc.KEY_PAYLOAD], CONF_PROTOCOL_HTTP)
                 else:
@@ -448,6 +790,14 @@ class MerossApi:
     @callback
     async def entry_update_listener(self, hass: HomeAssistant, config_entry: ConfigEntry):
         self.key = config_entry.data.get(CONF_KEY) or ''
+        if (mqtt_client := self.mqtt_client) is not None:
+            broker = (mqtt_client.host, mqtt_client.port, mqtt_client.username, mqtt_client.password)
+        else:
+            broker = None
+        if broker != self._get_mqtt_broker():
+            # MQTT transport changed: re-register our subscription
+            self.mqtt_unregister()
+            await self.async_mqtt_register()
 
     @callback
     def discovery_callback(self):
@@ -461,7 +811,7 @@ class MerossApi:
         if len(discovering := self.discovering) == 0:
             return
 
-        _mqtt_is_connected = mqtt_is_connected(self.hass)
+        _mqtt_is_connected = self.mqtt_connected
         epoch = time()
         for device_id, discovered in discovering.copy().items():
             if (epoch - discovered.get(MerossApi.KEY_STARTTIME, 0)) > PARAM_HEARTBEAT_PERIOD:
@@ -493,6 +843,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up Meross IoT local LAN from a config entry."""
     LOGGER.debug("async_setup_entry entry_id = %s", entry.entry_id)
     api = MerossApi.get(hass)
+    api.invalidate_device_index()
     device_id = entry.data.get(CONF_DEVICE_ID)
     if (device_id is None) or (entry.data.get(CONF_PROTOCOL) != CONF_PROTOCOL_HTTP):
         """
@@ -530,6 +881,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     LOGGER.debug("async_unload_entry entry_id = %s", entry.entry_id)
     if (api := MerossApi.peek(hass)) is not None:
+        api.invalidate_device_index()
         device_id = entry.data.get(CONF_DEVICE_ID)
         if device_id is not None:
             LOGGER.debug("async_unload_entry device_id = %s", device_id)
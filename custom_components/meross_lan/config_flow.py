@@ -27,13 +27,17 @@ from .merossclient.cloudapi import (
 )
 
 from . import MerossApi
-from .helpers import LOGGER
+from .helpers import LOGGER, parse_host_port
 from .const import (
     DOMAIN,
     CONF_HOST, CONF_DEVICE_ID, CONF_KEY, CONF_CLOUD_KEY,
     CONF_PAYLOAD, CONF_TIMESTAMP,
-    CONF_PROTOCOL, CONF_PROTOCOL_OPTIONS,
+    CONF_PROTOCOL, CONF_PROTOCOL_OPTIONS, CONF_PROTOCOL_HTTP,
     CONF_POLLING_PERIOD, CONF_POLLING_PERIOD_DEFAULT,
+    CONF_MQTT_WINDOW, CONF_MQTT_WINDOW_DEFAULT, CONF_HEDGE,
+    CONF_LIVENESS, CONF_LIVENESS_ALL, CONF_LIVENESS_OPTIONS,
+    CONF_POLLING_POLICY, CONF_TRANSITION_PERIOD, CONF_TRANSITION_PERIOD_DEFAULT,
+    CONF_MQTT_BROKER, CONF_MQTT_BROKER_PORT_DEFAULT, CONF_MQTT_USERNAME, CONF_MQTT_PASSWORD,
     CONF_TRACE, CONF_TRACE_TIMEOUT, CONF_TRACE_TIMEOUT_DEFAULT,
 )
 
@@ -47,6 +51,8 @@ ERR_INVALID_NULL_KEY = 'invalid_nullkey'
 ERR_DEVICE_ID_MISMATCH = 'device_id_mismatch'
 ERR_ALREADY_CONFIGURED_DEVICE = 'already_configured_device'
 ERR_INVALID_AUTH = 'invalid_auth'
+ERR_INVALID_POLLING_POLICY = 'invalid_polling_policy'
+ERR_INVALID_MQTT_BROKER = 'invalid_mqtt_broker'
 
 
 async def _http_discovery(hass, host: str, key: KeyType) -> dict[str, object]:
@@ -67,6 +73,43 @@ class ConfigError(Exception):
         self.reason = reason
 
 
+def _parse_polling_policy(value: str | None, ability: dict) -> dict[str, int]:
+    """
+    parse the polling overrides typed in as 'namespace:period, namespace:period'
+    (period in seconds: 0 polls the namespace every cycle)
+    """
+    polling_policy = {}
+    for item in (value or '').split(','):
+        if not (item := item.strip()):
+            continue
+        namespace, _, period = item.rpartition(':')
+        namespace = namespace.strip()
+        if ability and (namespace not in ability):
+            raise ConfigError(ERR_INVALID_POLLING_POLICY)
+        try:
+            polling_policy[namespace] = int(period)
+        except ValueError:
+            raise ConfigError(ERR_INVALID_POLLING_POLICY)
+        if (not namespace) or (polling_policy[namespace] < 0):
+            raise ConfigError(ERR_INVALID_POLLING_POLICY)
+    return polling_policy
+
+
+def _parse_mqtt_broker(value: str | None) -> str | None:
+    """validate the 'host[:port]' of the MQTT broker (empty to use HA mqtt)"""
+    if not (value := (value or '').strip()):
+        return None
+    try:
+        parse_host_port(value, CONF_MQTT_BROKER_PORT_DEFAULT)
+    except ValueError:
+        raise ConfigError(ERR_INVALID_MQTT_BROKER)
+    return value
+
+
+def _format_polling_policy(polling_policy: dict[str, int] | None) -> str:
+    return ', '.join(f"{namespace}:{period}" for namespace, period in (polling_policy or {}).items())
+
+
 class MerossFlowHandlerMixin(FlowHandler if typing.TYPE_CHECKING else object):
     """ Mixin providing cloud key retrieval for both Config and Option flows"""
     _device_id: str | None = None
@@ -338,6 +381,11 @@ class OptionsFlowHandler(MerossFlowHandlerMixin, config_entries.OptionsFlow):
             self._cloud_key = data.get(CONF_CLOUD_KEY) # null for non cloud keys
             self._protocol = data.get(CONF_PROTOCOL)
             self._polling_period = data.get(CONF_POLLING_PERIOD)
+            self._mqtt_window = data.get(CONF_MQTT_WINDOW)
+            self._hedge = data.get(CONF_HEDGE, False)
+            self._liveness = data.get(CONF_LIVENESS)
+            self._polling_policy = _format_polling_policy(data.get(CONF_POLLING_POLICY)) # type: ignore
+            self._transition_period = data.get(CONF_TRANSITION_PERIOD)
             self._trace = data.get(CONF_TRACE, 0) > time()
             self._trace_timeout = data.get(CONF_TRACE_TIMEOUT)
             self._placeholders = {
@@ -351,20 +399,46 @@ class OptionsFlowHandler(MerossFlowHandlerMixin, config_entries.OptionsFlow):
         return await self.async_step_device(user_input)
 
     async def async_step_hub(self, user_input=None):
+        errors = {}
+        defaults = self._config_entry.data
 
         if user_input is not None:
-            data = dict(self._config_entry.data)
-            data[CONF_KEY] = user_input.get(CONF_KEY)
-            self.hass.config_entries.async_update_entry(self._config_entry, data=data)
-            return self.async_create_entry(title="", data=None) # type: ignore
+            try:
+                data = dict(self._config_entry.data)
+                data[CONF_KEY] = user_input.get(CONF_KEY)
+                data[CONF_MQTT_BROKER] = _parse_mqtt_broker(user_input.get(CONF_MQTT_BROKER))
+                data[CONF_MQTT_USERNAME] = user_input.get(CONF_MQTT_USERNAME)
+                data[CONF_MQTT_PASSWORD] = user_input.get(CONF_MQTT_PASSWORD)
+                self.hass.config_entries.async_update_entry(self._config_entry, data=data)
+                return self.async_create_entry(title="", data=None) # type: ignore
+            except ConfigError as error:
+                errors[ERR_BASE] = error.reason
+                defaults = user_input
 
         config_schema = {
             vol.Optional(
                 CONF_KEY,
-                description={ DESCR: self._config_entry.data.get(CONF_KEY) }
-                ): str
+                description={ DESCR: defaults.get(CONF_KEY) }
+                ): str,
+            # leave empty to use the HA mqtt integration
+            vol.Optional(
+                CONF_MQTT_BROKER,
+                description={ DESCR: defaults.get(CONF_MQTT_BROKER) }
+                ): str,
+            vol.Optional(
+                CONF_MQTT_USERNAME,
+                description={ DESCR: defaults.get(CONF_MQTT_USERNAME) }
+                ): str,
+            vol.Optional(
+                CONF_MQTT_PASSWORD,
+                description={ DESCR: defaults.get(CONF_MQTT_PASSWORD) }
+                ): str,
         }
-        return self.async_show_form(step_id="hub", data_schema=vol.Schema(config_schema))
+        return self.async_show_form(
+            step_id="hub",
+            data_schema=vol.Schema(config_schema),
+            errors=errors
+        )
 
     async def async_step_device(self, user_input=None):
         """
@@ -378,9 +452,22 @@ class OptionsFlowHandler(MerossFlowHandlerMixin, config_entries.OptionsFlow):
             self._key = user_input.get(CONF_KEY)
             self._protocol = user_input.get(CONF_PROTOCOL)
             self._polling_period = user_input.get(CONF_POLLING_PERIOD)
+            # not shown (so preserved) for HTTP only devices
+            self._mqtt_window = user_input.get(
+                CONF_MQTT_WINDOW,
+                CONF_MQTT_WINDOW_DEFAULT if self._mqtt_window is None else self._mqtt_window
+            )
+            self._hedge = user_input.get(CONF_HEDGE, False)
+            self._liveness = user_input.get(CONF_LIVENESS, CONF_LIVENESS_ALL)
+            self._polling_policy = user_input.get(CONF_POLLING_POLICY)
+            self._transition_period = user_input.get(CONF_TRANSITION_PERIOD, CONF_TRANSITION_PERIOD_DEFAULT)
             self._trace = user_input.get(CONF_TRACE)
             self._trace_timeout = user_input.get(CONF_TRACE_TIMEOUT, CONF_TRACE_TIMEOUT_DEFAULT)
             try:
+                polling_policy = _parse_polling_policy(
+                    self._polling_policy,
+                    self._config_entry.data.get(CONF_PAYLOAD, {}).get(mc.KEY_ABILITY) # type: ignore
+                )
                 if self._host is not None:
                     _discovery_info = await _http_discovery(self.hass, self._host, self._key)
                     _descriptor = MerossDeviceDescriptor(_discovery_info.get(CONF_PAYLOAD, {})) # type: ignore
@@ -397,6 +484,11 @@ class OptionsFlowHandler(MerossFlowHandlerMixin, config_entries.OptionsFlow):
                 data[CONF_KEY] = self._key
                 data[CONF_PROTOCOL] = self._protocol
                 data[CONF_POLLING_PERIOD] = self._polling_period
+                data[CONF_MQTT_WINDOW] = self._mqtt_window
+                data[CONF_HEDGE] = self._hedge
+                data[CONF_LIVENESS] = self._liveness
+                data[CONF_POLLING_POLICY] = polling_policy
+                data[CONF_TRANSITION_PERIOD] = self._transition_period
                 data[CONF_TRACE] = (time() + self._trace_timeout) if self._trace else 0
                 data[CONF_TRACE_TIMEOUT] = self._trace_timeout
                 if device is not None:
@@ -438,6 +530,36 @@ class OptionsFlowHandler(MerossFlowHandlerMixin, config_entries.OptionsFlow):
                 default=CONF_POLLING_PERIOD_DEFAULT, # type: ignore
                 description={ DESCR: self._polling_period}
             )] = cv.positive_int
+        if self._protocol != CONF_PROTOCOL_HTTP:
+            config_schema[
+                vol.Optional(
+                    CONF_MQTT_WINDOW,
+                    default=CONF_MQTT_WINDOW_DEFAULT, # type: ignore
+                    description={ DESCR: self._mqtt_window}
+                )] = cv.positive_int
+        config_schema[
+            vol.Optional(
+                CONF_HEDGE,
+                description={ DESCR: self._hedge}
+            )] = bool
+        config_schema[
+            vol.Optional(
+                CONF_LIVENESS,
+                default=CONF_LIVENESS_ALL, # type: ignore
+                description={ DESCR: self._liveness}
+            )] = vol.In(CONF_LIVENESS_OPTIONS.keys())
+        # i.e. 'Appliance.Control.ConsumptionX:10' to poll energy every 10 sec
+        config_schema[
+            vol.Optional(
+                CONF_POLLING_POLICY,
+                description={ DESCR: self._polling_policy}
+            )] = str
+        config_schema[
+            vol.Optional(
+                CONF_TRANSITION_PERIOD,
+                default=CONF_TRANSITION_PERIOD_DEFAULT, # type: ignore
+                description={ DESCR: self._transition_period}
+            )] = cv.positive_int
         # setup device specific config right before last option
         if device is not None:
             self._placeholders[CONF_DEVICE_TYPE] = get_productnametype(device.descriptor.type)
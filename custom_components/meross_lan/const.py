@@ -29,6 +29,28 @@ CONF_PROTOCOL_OPTIONS = {
 CONF_POLLING_PERIOD = 'polling_period' # general device state polling or whatever
 CONF_POLLING_PERIOD_MIN = 5
 CONF_POLLING_PERIOD_DEFAULT = 30
+CONF_POLLING_POLICY = 'polling_policy' # per-device polling period overrides {namespace: period}
+CONF_TRANSITION_PERIOD = 'transition_period' # polling period (sec) while a cover is moving
+CONF_TRANSITION_PERIOD_DEFAULT = 1
+
+CONF_MQTT_BROKER = 'mqtt_broker' # 'host[:port]' of a broker for our own MQTT client (else use HA mqtt)
+CONF_MQTT_BROKER_PORT_DEFAULT = 1883
+CONF_MQTT_USERNAME = 'mqtt_username'
+CONF_MQTT_PASSWORD = 'mqtt_password'
+CONF_MQTT_WINDOW = 'mqtt_window' # max number of MQTT requests (per device) awaiting their ACK
+CONF_MQTT_WINDOW_DEFAULT = 4 # 0 disables flow-control
+
+CONF_HEDGE = 'hedge' # (protocol auto) re-send SETs on the other transport when the ACK is late
+
+CONF_LIVENESS = 'liveness' # how the heartbeat (and offline retries) check the device is there
+CONF_LIVENESS_ALL = 'all' # full NS_APPLIANCE_SYSTEM_ALL GET (legacy)
+CONF_LIVENESS_NAMESPACE = 'namespace' # light GET (Appliance.System.Online or Runtime)
+CONF_LIVENESS_TCP = 'tcp' # (HTTP only) just a TCP connect to the device
+CONF_LIVENESS_OPTIONS = {
+    CONF_LIVENESS_ALL: CONF_LIVENESS_ALL,
+    CONF_LIVENESS_NAMESPACE: CONF_LIVENESS_NAMESPACE,
+    CONF_LIVENESS_TCP: CONF_LIVENESS_TCP
+}
 
 CONF_TRACE = 'trace' # create a file with device info and communication tracing
 CONF_TRACE_TIMEOUT = 'trace_timeout'
@@ -38,6 +60,7 @@ CONF_TRACE_DIRECTORY = 'traces' # folder where to store traces
 CONF_TRACE_FILENAME = '{}-{}.csv' # filename format: device_type-device_id.csv
 
 CONF_TIMESTAMP = mc.KEY_TIMESTAMP # this is a 'fake' conf used to force-flush
+CONF_NEGATIVE_CACHE = 'negative_cache' # (runtime) polled namespaces failing on the device: not a user option
 
 """
  general working/configuration parameters (waiting to be moved to CONF_ENTRY)
@@ -49,8 +72,41 @@ PARAM_ENERGY_UPDATE_PERIOD = 55 # read energy consumption only every ... second
 PARAM_SIGNAL_UPDATE_PERIOD = 295 # read energy consumption only every ... second
 PARAM_HUBBATTERY_UPDATE_PERIOD = 3595 # read battery levels only every ... second
 PARAM_HUBSENSOR_UPDATE_PERIOD = 55
+# polling policies (see meross_device.PollingPolicy) are evaluated in this order along the cycle
+POLLING_PRIORITY_HIGH = 0
+POLLING_PRIORITY_DEFAULT = 1
+POLLING_PRIORITY_LOW = 2
 PARAM_TIMEZONE_CHECK_PERIOD = 604800 # 1 week before retrying timezone updates
 #PARAM_STALE_DEVICE_REMOVE_TIMEOUT = 60 # disable config_entry when device is offline for more than...
 PARAM_GARAGEDOOR_TRANSITION_MAXDURATION = 60
 PARAM_GARAGEDOOR_TRANSITION_MINDURATION = 10
-PARAM_TIMESTAMP_TOLERANCE = 5 # max device timestamp diff against our and trigger warning and (eventually) fix it
\ No newline at end of file
+PARAM_TIMESTAMP_TOLERANCE = 5 # max device timestamp diff against our and trigger warning and (eventually) fix it
+PARAM_HTTP_POOL_LIMIT = 256 # max number of (total) connections open towards devices
+PARAM_HTTP_POOL_LIMIT_PER_HOST = 2 # embedded http servers are not really able to serve many
+PARAM_HTTP_KEEPALIVE_TIMEOUT = 10 # release idle connections after .. secs (devices drop them anyway)
+PARAM_POLLING_WHEEL_SIZE = 64 # number of (1 sec) slots in the polling scheduler timer wheel
+PARAM_POLLING_CONCURRENCY = 16 # max number of devices concurrently running their polling cycle
+PARAM_OFFLINE_BACKOFF_MAX = 300 # offline devices are retried with exponential backoff up to .. secs
+PARAM_OFFLINE_PROBE_TIMEOUT = 3 # single shot (no retries) timeout when probing an offline device over HTTP
+PARAM_QUARANTINE_TIMEOUT = 3600 # devices offline for longer than .. are moved to the quarantine lane..
+PARAM_QUARANTINE_PERIOD = 1800 # ..where they're retried every .. secs..
+PARAM_QUARANTINE_CONCURRENCY = 1 # ..and only .. at a time
+PARAM_LIVENESS_STALE = 1800 # with a light liveness strategy refresh NS_ALL anyway if older than .. secs
+PARAM_NEGATIVE_CACHE_BACKOFF_MIN = 60 # stop polling a namespace failing on the device for .. secs
+PARAM_NEGATIVE_CACHE_BACKOFF_MAX = 86400 # (doubling on every new failure) up to .. secs
+PARAM_DEVICE_INDEX_TIMEOUT = 60 # refresh the index of unmanaged device_ids at least every .. secs
+PARAM_UNKNOWN_DEVICE_THROTTLE = 10 # process messages from unknown (not in discovery) devices at most every .. secs
+PARAM_HUB_CHUNK_MAX = 16 # max number of subdevices queried in a single hub request
+PARAM_HUB_CHUNK_INFLIGHT = 2 # max number of concurrent (chunked) hub requests
+PARAM_MQTT_TRANSACTION_TIMEOUT = 15 # drop (and fail) MQTT requests not replied in .. secs
+PARAM_MQTT_QUEUE_SIZE = 32 # max number of MQTT requests (per device) queued when the window is full
+PARAM_HTTP_QUEUE_SIZE = 32 # max number of queued HTTP requests (per device) before dropping polls
+PARAM_MQTT_LATENCY_SAMPLES = 100 # number of (latest) MQTT ACK latencies kept for percentiles
+PARAM_HEDGE_PERCENTILE = 0.95 # hedge a SET when its ACK is later than this latency percentile..
+PARAM_HEDGE_DELAY_MIN = 0.1 # ..clamped to these bounds (secs)
+PARAM_HEDGE_DELAY_MAX = 2
+PARAM_PROTOCOL_PROBE_PERIOD = 300 # (protocol auto) probe the 'other' transport every .. secs
+PARAM_PROTOCOL_LOSS_MAX = 0.25 # a transport with a higher (smoothed) timeout ratio is not healthy
+PARAM_PROTOCOL_HYSTERESIS = 0.6 # switch when the other transport srtt is less than .. times the current
+PARAM_PROTOCOL_SWITCH_DWELL = 600 # minimum time (secs) between two latency driven switches
+PARAM_PROTOCOL_SWITCH_LOG = 16 # number of protocol switches kept for diagnostics
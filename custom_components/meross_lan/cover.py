@@ -200,6 +200,7 @@ class MLGarage(me.MerossEntity, CoverEntity):
                 if self._transition_unsub is not None:
                     self._transition_unsub.cancel()
                     self._transition_unsub = None
+                    self.device.transition_end(self)
                     self.device.log(
                         WARNING,
                         0,
@@ -297,11 +298,15 @@ class MLGarage(me.MerossEntity, CoverEntity):
         self._transition_unsub = self.device.api.schedule_callback(
             self._transition_duration + 5, self._transition_end_callback
         )
+        # closely sample the door state (see MerossDevice.transition_start)
+        # so to better estimate the transition duration
+        self.device.transition_start(self, (mc.NS_APPLIANCE_GARAGEDOOR_STATE,))
 
     def _cancel_transition(self):
         if self._transition_unsub is not None:
             self._transition_unsub.cancel()
             self._transition_unsub = None
+        self.device.transition_end(self)
         self._open_pending = None
 
     @callback
@@ -311,6 +316,7 @@ class MLGarage(me.MerossEntity, CoverEntity):
         a transition
         """
         self._transition_unsub = None
+        self.device.transition_end(self)
         # transition ended: set the state according to our last known hardware status
         self.update_state(STATE_OPEN if self._open else STATE_CLOSED)
         if not self._open_pending:
@@ -423,9 +429,7 @@ class GarageMixin(
             self.config_doorCloseDuration = MLGarageConfigNumber(
                 self, mc.KEY_DOORCLOSEDURATION
             )
-            self.polling_dictionary[mc.NS_APPLIANCE_GARAGEDOOR_CONFIG] = mc.PAYLOAD_GET[
-                mc.NS_APPLIANCE_GARAGEDOOR_CONFIG
-            ]
+            self.polling_policy_add(mc.NS_APPLIANCE_GARAGEDOOR_CONFIG)
 
     def _init_garageDoor(self, payload: dict):
         MLGarage(self, payload[mc.KEY_CHANNEL])
@@ -455,6 +459,12 @@ class GarageMixin(
                 )
         return
 
+    def _parse_all(self, payload: dict):
+        # MLGarage needs to sample the door state on every NS_ALL even if
+        # unchanged (see MLGarage._parse_state) so we're not caching it
+        self._digest_cache.pop(mc.KEY_GARAGEDOOR, None)
+        super()._parse_all(payload)
+
     def _parse_garageDoor(self, payload):
         self._parse__generic(mc.KEY_STATE, payload)
 
@@ -477,7 +487,6 @@ class MLRollerShutter(me.MerossEntity, CoverEntity):
         self._position_start = None  # set when when we're controlling a timed position
         self._position_starttime = None  # epoch of transition start
         self._position_endtime = None  # epoch of 'target position reached'
-        self._transition_unsub = None
         self._stop_unsub = None
         self._attr_current_cover_position: int | None = None
         self._attr_extra_state_attributes = {}
@@ -614,7 +623,7 @@ class MLRollerShutter(me.MerossEntity, CoverEntity):
         )
 
     def set_unavailable(self):
-        self._transition_cancel()
+        self.device.transition_end(self)
         self._stop_cancel()
         super().set_unavailable()
 
@@ -656,7 +665,6 @@ class MLRollerShutter(me.MerossEntity, CoverEntity):
     def _parse_state(self, payload: dict):
         state = payload.get(mc.KEY_STATE)
         self.device.log(DEBUG, 0, "MLRollerShutter(0): _parse_state(%s)", str(state))
-        self.device.request_get(mc.NS_APPLIANCE_ROLLERSHUTTER_POSITION)
         epoch = time()
         if self._position_native_isgood:
             if state == mc.ROLLERSHUTTER_STATE_OPENING:
@@ -724,9 +732,15 @@ class MLRollerShutter(me.MerossEntity, CoverEntity):
             if epoch >= self._position_endtime:
                 self._request_position(-1)
 
-        if self._transition_unsub is None:
-            # ensure we 'follow' cover movement
-            self._transition_callback()
+        # ensure we 'follow' cover movement: state and position are polled
+        # together at the transition_period until we're idle again
+        self.device.transition_start(
+            self,
+            (
+                mc.NS_APPLIANCE_ROLLERSHUTTER_STATE,
+                mc.NS_APPLIANCE_ROLLERSHUTTER_POSITION,
+            ),
+        )
 
     def _parse_config(self, payload: dict):
         # payload = {"channel": 0, "signalOpen": 50000, "signalClose": 50000}
@@ -747,19 +761,11 @@ class MLRollerShutter(me.MerossEntity, CoverEntity):
                 EXTRA_ATTR_DURATION_CLOSE
             ] = self._signalClose
 
-    @callback
-    def _transition_callback(self):
-        self.device.log(DEBUG, 0, "MLRollerShutter(0): _transition_callback")
-        self._transition_unsub = self.device.api.schedule_callback(
-            1, self._transition_callback
-        )
-        self.device.request_get(mc.NS_APPLIANCE_ROLLERSHUTTER_STATE)
-
     def _transition_cancel(self):
         self.device.log(DEBUG, 0, "MLRollerShutter(0): _transition_cancel")
-        if self._transition_unsub is not None:
-            self._transition_unsub.cancel()
-            self._transition_unsub = None
+        if self.device.transition_end(self):
+            # refresh the final position
+            self.device.request_get(mc.NS_APPLIANCE_ROLLERSHUTTER_POSITION)
 
     @callback
     def _stop_callback(self):
@@ -822,12 +828,9 @@ class RollerShutterMixin(
             # looks like digest (in NS_ALL) doesn't carry state
             # so we're not implementing _init_xxx and _parse_xxx methods here
             MLRollerShutter(self, 0)
-            self.polling_dictionary[
-                mc.NS_APPLIANCE_ROLLERSHUTTER_STATE
-            ] = mc.PAYLOAD_GET[mc.NS_APPLIANCE_ROLLERSHUTTER_STATE]
-            self.polling_dictionary[
-                mc.NS_APPLIANCE_ROLLERSHUTTER_CONFIG
-            ] = mc.PAYLOAD_GET[mc.NS_APPLIANCE_ROLLERSHUTTER_CONFIG]
+            self.polling_policy_add(mc.NS_APPLIANCE_ROLLERSHUTTER_STATE)
+            self.polling_policy_add(mc.NS_APPLIANCE_ROLLERSHUTTER_POSITION)
+            self.polling_policy_add(mc.NS_APPLIANCE_ROLLERSHUTTER_CONFIG)
 
         except Exception as e:
             LOGGER.warning(
@@ -2,6 +2,7 @@ from __future__ import annotations
 import typing
 
 from ..merossclient import const as mc  # mEROSS cONST
+from .. import meross_entity as me
 from ..light import (
     MLLightBase,
     COLOR_MODE_RGB,
@@ -18,7 +19,7 @@ from ..sensor import MLSensor, DEVICE_CLASS_TEMPERATURE, DEVICE_CLASS_HUMIDITY
 from ..helpers import reverse_lookup
 
 if typing.TYPE_CHECKING:
-    from ..meross_device import MerossDevice, ResponseCallbackType
+    from ..meross_device import MerossDevice
 
 class MLDiffuserLight(MLLightBase):
     """
@@ -85,7 +86,12 @@ class MLDiffuserLight(MLLightBase):
             if acknowledge:
                 self._parse_light(light)
 
-        await self.device.async_request_light(light, _ack_callback)
+        await self.async_request_optimistic(
+            *self.device.build_request_light(light),
+            me.STATE_ON,
+            _ack_callback,
+            coalesce=True,
+        )
 
     async def async_turn_off(self, **kwargs):
 
@@ -93,9 +99,13 @@ class MLDiffuserLight(MLLightBase):
             if acknowledge:
                 self.update_onoff(0)
 
-        await self.device.async_request_light(
-            { mc.KEY_CHANNEL: self.channel, mc.KEY_ONOFF: 0 },
-            _ack_callback
+        await self.async_request_optimistic(
+            *self.device.build_request_light(
+                { mc.KEY_CHANNEL: self.channel, mc.KEY_ONOFF: 0 }
+            ),
+            me.STATE_OFF,
+            _ack_callback,
+            coalesce=True,
         )
 
     def _inherited_parse_light(self, payload: dict):
@@ -147,8 +157,7 @@ class DiffuserMixin(MerossDevice if typing.TYPE_CHECKING else object): # pylint:
             # are supporting correct values so we implement them (#243)
             self._sensor_temperature = MLSensor.build_for_device(self, DEVICE_CLASS_TEMPERATURE)
             self._sensor_humidity = MLSensor.build_for_device(self, DEVICE_CLASS_HUMIDITY)
-            self.polling_dictionary[mc.NS_APPLIANCE_CONTROL_DIFFUSER_SENSOR] = \
-                mc.PAYLOAD_GET[mc.NS_APPLIANCE_CONTROL_DIFFUSER_SENSOR]
+            self.polling_policy_add(mc.NS_APPLIANCE_CONTROL_DIFFUSER_SENSOR)
 
     def _handle_Appliance_Control_Diffuser_Light(self, header: dict, payload: dict):
         self._parse_diffuser_light(payload.get(mc.KEY_LIGHT))
@@ -195,24 +204,14 @@ class DiffuserMixin(MerossDevice if typing.TYPE_CHECKING else object): # pylint:
             if _parse is not None:
                 _parse(value)
 
-    async def async_request_light(self, payload, callback: ResponseCallbackType):
-        await self.async_request(
-            mc.NS_APPLIANCE_CONTROL_DIFFUSER_LIGHT,
-            mc.METHOD_SET,
-            {
-                mc.KEY_TYPE: self._type,
-                mc.KEY_LIGHT: [ payload ]
-            },
-            callback
-        )
+    def build_request_light(self, payload) -> tuple[str, dict]:
+        return mc.NS_APPLIANCE_CONTROL_DIFFUSER_LIGHT, {
+            mc.KEY_TYPE: self._type,
+            mc.KEY_LIGHT: [ payload ]
+        }
 
-    async def async_request_spray(self, payload, callback: ResponseCallbackType):
-        await self.async_request(
-            mc.NS_APPLIANCE_CONTROL_DIFFUSER_SPRAY,
-            mc.METHOD_SET,
-            {
-                mc.KEY_TYPE: self._type,
-                mc.KEY_SPRAY: [ payload ]
-            },
-            callback
-        )
+    def build_request_spray(self, payload) -> tuple[str, dict]:
+        return mc.NS_APPLIANCE_CONTROL_DIFFUSER_SPRAY, {
+            mc.KEY_TYPE: self._type,
+            mc.KEY_SPRAY: [ payload ]
+        }
@@ -232,11 +232,13 @@ class ThermostatMixin(MerossDevice if typing.TYPE_CHECKING else object): # pylin
                 self._polling_payload.append({ mc.KEY_CHANNEL: m[mc.KEY_CHANNEL] })
         if self._polling_payload:
             if mc.NS_APPLIANCE_CONTROL_THERMOSTAT_SENSOR in self.descriptor.ability:
-                self.polling_dictionary[mc.NS_APPLIANCE_CONTROL_THERMOSTAT_SENSOR] = \
-                    { mc.KEY_SENSOR: self._polling_payload }
+                self.polling_policy_add(
+                    mc.NS_APPLIANCE_CONTROL_THERMOSTAT_SENSOR,
+                    { mc.KEY_SENSOR: self._polling_payload })
             if mc.NS_APPLIANCE_CONTROL_THERMOSTAT_OVERHEAT in self.descriptor.ability:
-                self.polling_dictionary[mc.NS_APPLIANCE_CONTROL_THERMOSTAT_OVERHEAT] = \
-                    { mc.KEY_OVERHEAT: self._polling_payload }
+                self.polling_policy_add(
+                    mc.NS_APPLIANCE_CONTROL_THERMOSTAT_OVERHEAT,
+                    { mc.KEY_OVERHEAT: self._polling_payload })
 
     def _handle_Appliance_Control_Thermostat_Mode(self, header: dict, payload: dict):
         self._parse__generic_array(mc.KEY_MODE, payload.get(mc.KEY_MODE))
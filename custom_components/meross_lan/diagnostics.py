@@ -33,10 +33,14 @@ async def _async_get_diagnostics(hass, entry: 'ConfigEntry'):
 
     device_id = entry.data.get(CONF_DEVICE_ID)
     if device_id is None:# MQTT hub entry
+        api = MerossApi.peek(hass)
         return {
             CONF_KEY: REDACTED if entry.data.get(CONF_KEY) else None,
             "disabled_by": entry.disabled_by,
             "disabled_polling": entry.pref_disable_polling,
+            "http_pool": api.get_http_pool_stats() if api is not None else None,
+            "polling": api.get_polling_stats() if api is not None else None,
+            "mqtt_client": api.mqtt_client.get_diagnostics() if (api is not None) and (api.mqtt_client is not None) else None,
         }
 
     device = MerossApi.peek_device(hass, device_id)
@@ -57,6 +61,7 @@ async def _async_get_diagnostics(hass, entry: 'ConfigEntry'):
         "deviceclass": deviceclass,
         "disabled_by": entry.disabled_by,
         "disabled_polling": entry.pref_disable_polling,
+        "runtime": device.get_diagnostics() if device is not None else None,
         CONF_TRACE: (await device.get_diagnostics_trace(trace_timeout)) if device is not None else None
     }
 
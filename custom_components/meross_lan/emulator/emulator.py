@@ -32,8 +32,12 @@ class MerossEmulator:
 
     async def post_config(self, request: web_Request):
         jsonrequest = await request.json()
-        header:dict = jsonrequest[mc.KEY_HEADER]
-        payload:dict = jsonrequest[mc.KEY_PAYLOAD]
+        return web_json_response(
+            self.handle(jsonrequest[mc.KEY_HEADER], jsonrequest[mc.KEY_PAYLOAD])
+        )
+
+
+    def handle(self, header: dict, payload: dict) -> dict:
         namespace:str = header[mc.KEY_NAMESPACE]
         method:str = header[mc.KEY_METHOD]
 
@@ -61,7 +65,7 @@ class MerossEmulator:
 
         data = build_payload(namespace, method, payload, self.key, mc.MANUFACTURER, header[mc.KEY_MESSAGEID])
         print(f"Emulator({self.descriptor.uuid}) TX: namespace={namespace} method={method} payload={json_dumps(payload)}")
-        return web_json_response(data)
+        return data
 
 
     def _get_key_state(self, namespace: str) -> tuple[str, dict]:
@@ -135,6 +139,19 @@ class MerossEmulator:
         return mc.METHOD_SETACK, {}
 
 
+    def _SET_Appliance_Control_Multiple(self, header, payload):
+        max_len = self.descriptor.ability[mc.NS_APPLIANCE_CONTROL_MULTIPLE].get(mc.KEY_MAXCMDNUM, 0)
+        p_multiple = payload[mc.KEY_MULTIPLE]
+        if len(p_multiple) > max_len:
+            raise Exception(f"{mc.KEY_MULTIPLE} exceeding {mc.KEY_MAXCMDNUM}")
+        return mc.METHOD_SETACK, {
+            mc.KEY_MULTIPLE: [
+                self.handle(message[mc.KEY_HEADER], message[mc.KEY_PAYLOAD])
+                for message in p_multiple
+            ]
+        }
+
+
     def _GET_Appliance_System_DNDMode(self, header, payload):
         return mc.METHOD_GETACK, self.p_dndmode
 
@@ -51,6 +51,45 @@ def reverse_lookup(_dict: dict, value):
     return None
 
 
+def build_dispatch_table(cls: type, prefix: str) -> dict:
+    """
+    scans the class for methods named '{prefix}{key}' and returns
+    the {key: function} map so that message dispatching could avoid
+    building names and looking up attributes for every message
+    """
+    prefix_len = len(prefix)
+    return {
+        name[prefix_len:]: getattr(cls, name)
+        for name in dir(cls)
+        if name.startswith(prefix)
+    }
+
+
+def parse_host_port(value: str, default_port: int) -> tuple[str, int]:
+    """
+    split 'host[:port]' where host could be an IPv6 address (enclosed
+    in brackets when followed by the port like in '[::1]:1883').
+    Raises ValueError when malformed
+    """
+    value = value.strip()
+    if value.startswith('['):
+        host, bracket, port = value[1:].partition(']')
+        if not bracket or (port and port[0] != ':'):
+            raise ValueError(f"invalid address '{value}'")
+        port = port[1:]
+    elif value.count(':') > 1:
+        host, port = value, '' # plain IPv6 address
+    else:
+        host, _, port = value.partition(':')
+    if not host:
+        raise ValueError(f"invalid address '{value}'")
+    if not port:
+        return host, default_port
+    if not (0 < (_port := int(port)) < 65536):
+        raise ValueError(f"invalid port '{port}'")
+    return host, _port
+
+
 def versiontuple(version: str):
     """
     helper for version checking, comparisons, etc
@@ -150,13 +189,14 @@ def mqtt_publish(hass, topic, payload):
 """
 RECORDER helpers
 """
-from homeassistant.components.recorder import history
-
 async def get_entity_last_state(hass, entity_id):
     """
     recover the last known good state from recorder in order to
     restore transient state information when restarting HA
     """
+    # recorder is heavy to import: only load it when some entity needs it
+    from homeassistant.components.recorder import history
+
     if hasattr(history, 'get_state'):# removed in 2022.6.x
         return history.get_state(hass, utcnow(), entity_id) # type: ignore
 
@@ -72,7 +72,7 @@ if typing.TYPE_CHECKING:
     from typing import Mapping
     from homeassistant.core import HomeAssistant
     from homeassistant.config_entries import ConfigEntry
-    from .meross_device import MerossDevice, ResponseCallbackType
+    from .meross_device import MerossDevice
 
 """
     map light Temperature effective range to HA mired(s):
@@ -158,6 +158,7 @@ class MLLightBase(me.MerossToggle, LightEntity):
             onoff = payload.get(mc.KEY_ONOFF)
             if onoff is not None:
                 self._attr_state = me.STATE_ON if onoff else me.STATE_OFF
+                self._state_reported(self._attr_state)
 
             self._attr_color_mode = COLOR_MODE_UNKNOWN
 
@@ -342,11 +343,20 @@ class MLLight(MLLightBase):
                 self._light = {} # invalidate so _parse_light will force-flush
                 self._attr_state = me.STATE_ON
                 self._parse_light(light)
-        await self.device.async_request_light(light, _ack_callback)
+        await self.async_request_optimistic(
+            *self.device.build_request_light(light),
+            me.STATE_ON,
+            _ack_callback,
+            coalesce=True,
+        )
         # 87: @nao-pon bulbs need a 'double' send when setting Temp
         if ATTR_COLOR_TEMP in kwargs:
             if self.device.descriptor.firmware.get(mc.KEY_VERSION) == "2.1.2":
-                await self.device.async_request_light(light, None)
+                await self.async_request_optimistic(
+                    *self.device.build_request_light(light),
+                    me.STATE_ON,
+                    coalesce=True,
+                )
 
     async def async_turn_off(self, **kwargs):
         if self._hastogglex:
@@ -358,9 +368,13 @@ class MLLight(MLLightBase):
                 if acknowledge:
                     self.update_onoff(0)
 
-            await self.device.async_request_light(
-                {mc.KEY_CHANNEL: self.channel, mc.KEY_ONOFF: 0},
-                _ack_callback
+            await self.async_request_optimistic(
+                *self.device.build_request_light(
+                    {mc.KEY_CHANNEL: self.channel, mc.KEY_ONOFF: 0}
+                ),
+                me.STATE_OFF,
+                _ack_callback,
+                coalesce=True,
             )
 
     def update_effect_map(self, light_effect_map: dict):
@@ -435,27 +449,17 @@ class MLDNDLightEntity(me.MerossToggle, LightEntity):
         return COLOR_MODE_ONOFF
 
     async def async_turn_on(self, **kwargs):
-        def _ack_callback(acknowledge: bool, header: dict, payload: dict):
-            if acknowledge:
-                self.update_state(me.STATE_ON)
-
-        await self.device.async_request(
+        await self.async_request_optimistic(
             mc.NS_APPLIANCE_SYSTEM_DNDMODE,
-            mc.METHOD_SET,
             {mc.KEY_DNDMODE: {mc.KEY_MODE: 0}},
-            _ack_callback,
+            me.STATE_ON,
         )
 
     async def async_turn_off(self, **kwargs):
-        def _ack_callback(acknowledge: bool, header: dict, payload: dict):
-            if acknowledge:
-                self.update_state(me.STATE_OFF)
-
-        await self.device.async_request(
+        await self.async_request_optimistic(
             mc.NS_APPLIANCE_SYSTEM_DNDMODE,
-            mc.METHOD_SET,
             {mc.KEY_DNDMODE: {mc.KEY_MODE: 1}},
-            _ack_callback,
+            me.STATE_OFF,
         )
 
     def update_onoff(self, onoff):
@@ -477,9 +481,7 @@ class LightMixin(
         super().__init__(api, descriptor, entry)
 
         if mc.NS_APPLIANCE_CONTROL_LIGHT_EFFECT in descriptor.ability:
-            self.polling_dictionary[
-                mc.NS_APPLIANCE_CONTROL_LIGHT_EFFECT
-            ] = mc.PAYLOAD_GET[mc.NS_APPLIANCE_CONTROL_LIGHT_EFFECT]
+            self.polling_policy_add(mc.NS_APPLIANCE_CONTROL_LIGHT_EFFECT)
 
     def _init_light(self, payload: dict):
         MLLight(self, payload)
@@ -500,10 +502,5 @@ class LightMixin(
     def _parse_light(self, payload):
         self._parse__generic(mc.KEY_LIGHT, payload)
 
-    async def async_request_light(self, payload, callback: ResponseCallbackType | None):
-        await self.async_request(
-            mc.NS_APPLIANCE_CONTROL_LIGHT,
-            mc.METHOD_SET,
-            { mc.KEY_LIGHT: payload },
-            callback
-        )
+    def build_request_light(self, payload) -> tuple[str, dict]:
+        return mc.NS_APPLIANCE_CONTROL_LIGHT, { mc.KEY_LIGHT: payload }
@@ -8,35 +8,38 @@ from logging import (
     getLevelName as logging_getLevelName,
 )
 import os
+import hashlib
 import socket
 import asyncio
+import heapq
+from collections import deque
+from copy import deepcopy
 from time import strftime, time
 from datetime import datetime, timezone, tzinfo
-from zoneinfo import ZoneInfo
-from uuid import uuid4
 from io import TextIOWrapper
-from json import dumps as json_dumps
-from copy import deepcopy
-import voluptuous as vol
 import weakref
 
 from homeassistant.core import callback
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers import device_registry
 from .merossclient import (
     const as mc,  # mEROSS cONST
     MerossDeviceDescriptor,
+    MerossProtocolError,
+    RttEstimator,
+    SIGNER,
+    build_payload,
     get_namespacekey,
     get_replykey,
     build_default_payload_get,
 )
 from .merossclient.httpclient import MerossHttpClient
-from .meross_entity import MerossFakeEntity
+from .merossclient.codec import json_dumps
+from .meross_entity import MerossEntity, MerossFakeEntity
 from .helpers import (
     LOGGER,
     LOGGER_trap,
     obfuscate,
-    mqtt_is_connected,
+    build_dispatch_table,
 )
 from .const import (
     DOMAIN,
@@ -48,6 +51,17 @@ from .const import (
     CONF_POLLING_PERIOD,
     CONF_POLLING_PERIOD_DEFAULT,
     CONF_POLLING_PERIOD_MIN,
+    CONF_MQTT_WINDOW,
+    CONF_MQTT_WINDOW_DEFAULT,
+    CONF_HEDGE,
+    CONF_LIVENESS,
+    CONF_LIVENESS_ALL,
+    CONF_LIVENESS_TCP,
+    CONF_LIVENESS_OPTIONS,
+    CONF_NEGATIVE_CACHE,
+    CONF_POLLING_POLICY,
+    CONF_TRANSITION_PERIOD,
+    CONF_TRANSITION_PERIOD_DEFAULT,
     CONF_PROTOCOL,
     CONF_PROTOCOL_OPTIONS,
     CONF_PROTOCOL_AUTO,
@@ -61,6 +75,27 @@ from .const import (
     PARAM_HEARTBEAT_PERIOD,
     PARAM_TIMEZONE_CHECK_PERIOD,
     PARAM_TIMESTAMP_TOLERANCE,
+    PARAM_MQTT_TRANSACTION_TIMEOUT,
+    PARAM_MQTT_QUEUE_SIZE,
+    PARAM_HTTP_QUEUE_SIZE,
+    PARAM_MQTT_LATENCY_SAMPLES,
+    PARAM_HEDGE_PERCENTILE,
+    PARAM_HEDGE_DELAY_MIN,
+    PARAM_HEDGE_DELAY_MAX,
+    PARAM_PROTOCOL_PROBE_PERIOD,
+    PARAM_PROTOCOL_LOSS_MAX,
+    PARAM_PROTOCOL_HYSTERESIS,
+    PARAM_PROTOCOL_SWITCH_DWELL,
+    PARAM_PROTOCOL_SWITCH_LOG,
+    PARAM_OFFLINE_BACKOFF_MAX,
+    PARAM_OFFLINE_PROBE_TIMEOUT,
+    PARAM_QUARANTINE_TIMEOUT,
+    PARAM_QUARANTINE_PERIOD,
+    PARAM_LIVENESS_STALE,
+    PARAM_NEGATIVE_CACHE_BACKOFF_MIN,
+    PARAM_NEGATIVE_CACHE_BACKOFF_MAX,
+    POLLING_PRIORITY_HIGH,
+    POLLING_PRIORITY_DEFAULT,
 )
 
 ResponseCallbackType = typing.Callable[[bool, dict, dict], None]
@@ -69,11 +104,22 @@ if typing.TYPE_CHECKING:
     from homeassistant.core import HomeAssistant
     from homeassistant.config_entries import ConfigEntry
     from . import MerossApi
-    from .meross_entity import MerossEntity
 
 # these are dynamically created MerossDevice attributes in a sort of a dumb optimization
 VOLATILE_ATTR_HTTPCLIENT = "_httpclient"
 
+# HTTP requests are served (one at a time) in this order of priority:
+# user commands first, then state-critical pushes and finally polls
+HTTP_PRIORITY_COMMAND = 0
+HTTP_PRIORITY_PUSH = 1
+HTTP_PRIORITY_POLL = 2
+HTTP_PRIORITY_MAP = {
+    mc.METHOD_SET: HTTP_PRIORITY_COMMAND,
+    mc.METHOD_PUSH: HTTP_PRIORITY_PUSH,
+    mc.METHOD_GET: HTTP_PRIORITY_POLL,
+}
+HTTP_PRIORITY_NAMES = ("command", "push", "poll")
+
 # when tracing we enumerate appliance abilities to get insights on payload structures
 # this list will be excluded from enumeration since it's redundant/exposing sensitive info
 # or simply crashes/hangs the device
@@ -112,23 +158,106 @@ TRACE_DIRECTION_TX = "TX"
 
 TIMEZONES_SET = None
 
+_parse_undefined = MerossEntity._parse_undefined
+
+
+def _ability_fingerprint(ability: dict) -> str:
+    return hashlib.md5(",".join(sorted(ability)).encode("utf-8")).hexdigest()
 
-class _MQTTTransaction:
 
-    namespace: str
-    method: str
-    response_callback: ResponseCallbackType
-    messageid: str
-    request_time: float
+def _percentile(samples: list, p: float):
+    # samples must be sorted
+    return samples[min(int(len(samples) * p), len(samples) - 1)] if samples else None
+
+
+class _MQTTTransaction:
+    """
+    a pending MQTT request waiting for its ACK: the response is either
+    delivered to the (legacy) response_callback or set on the future
+    (see MerossDevice.async_mqtt_request)
+    """
+    __slots__ = (
+        "namespace",
+        "method",
+        "response_callback",
+        "future",
+        "messageid",
+        "request_time",
+    )
 
     def __init__(
-        self, namespace: str, method: str, response_callback: ResponseCallbackType
+        self,
+        namespace: str,
+        method: str,
+        response_callback: ResponseCallbackType | None,
+        future: asyncio.Future | None,
+        request_time: float,
+        messageid: str | None = None,
     ):
         self.namespace = namespace
         self.method = method
         self.response_callback = response_callback
-        self.request_time = time()
-        self.messageid = uuid4().hex
+        self.future = future
+        self.request_time = request_time
+        self.messageid = messageid or SIGNER.messageid()
+
+
+class PollingPolicy:
+    """
+    describes how (and when) a namespace is polled along the polling cycle
+    (see MerossDevice.async_request_updates):
+    - period: minimum interval (sec) between updates (0: every cycle)
+    - entities: if any, the namespace is only polled when one of them is enabled
+    - skip_mqtt: don't poll while MQTT is alive since the device pushes the state
+    - priority: order of evaluation along the cycle
+    - async_request: custom coroutine in place of the plain GET (hubs)
+    lastupdate is refreshed whenever the namespace is received (see MerossDevice.receive)
+    and a policy with lastupdate == 0 is requested in the next cycle whatever its period.
+    lastrequest tracks the plain GETs still waiting for a reply (see MerossDevice.negative_cache)
+    """
+    __slots__ = (
+        "namespace",
+        "payload",
+        "period",
+        "entities",
+        "skip_mqtt",
+        "priority",
+        "async_request",
+        "lastupdate",
+        "lastrequest",
+    )
+
+    def __init__(
+        self,
+        namespace: str,
+        payload: dict | None = None,
+        period: int = 0,
+        entities: tuple[MerossEntity, ...] = (),
+        skip_mqtt: bool = True,
+        priority: int = POLLING_PRIORITY_DEFAULT,
+        async_request: typing.Callable[[], typing.Awaitable] | None = None,
+    ):
+        self.namespace = namespace
+        self.payload = (
+            payload if payload is not None else build_default_payload_get(namespace)
+        )
+        self.period = period
+        self.entities = entities
+        self.skip_mqtt = skip_mqtt
+        self.priority = priority
+        self.async_request = async_request
+        self.lastupdate = 0
+        self.lastrequest = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "period": self.period,
+            "entities": len(self.entities),
+            "skip_mqtt": self.skip_mqtt,
+            "priority": self.priority,
+            "lastupdate": self.lastupdate,
+            "lastrequest": self.lastrequest,
+        }
 
 
 class MerossDevice:
@@ -141,8 +270,25 @@ class MerossDevice:
     key: str | None = ""
     polling_period: int = CONF_POLLING_PERIOD_DEFAULT
     _polling_delay: int = CONF_POLLING_PERIOD_DEFAULT
+    mqtt_window: int = CONF_MQTT_WINDOW_DEFAULT
+    hedge: bool = False
+    liveness: str = CONF_LIVENESS_ALL
+    polling_overrides: dict[str, int] = {}  # {namespace: period} (CONF_POLLING_POLICY)
+    transition_period: int = CONF_TRANSITION_PERIOD_DEFAULT
     # other default property values
     _deviceentry = None # weakly cached entry to the device registry
+    # dispatch tables: namespace -> _handle_xxx and digest key -> _parse_xxx
+    # these are built once per (mixin) class in MerossApi.build_device
+    _handlers: dict[str, typing.Callable] = {}
+    _parsers: dict[str, typing.Callable] = {}
+
+    @classmethod
+    def build_dispatch_tables(cls):
+        cls._handlers = {
+            name.replace("_", "."): handler
+            for name, handler in build_dispatch_table(cls, "_handle_").items()
+        }
+        cls._parsers = build_dispatch_table(cls, "_parse_")
 
     def __init__(
         self,
@@ -156,6 +302,8 @@ class MerossDevice:
         self.descriptor = descriptor
         self.entry_id = config_entry.entry_id
         self._online = False
+        self._offline_epoch = time()
+        self.quarantined = False
         self.needsave = (
             False  # while parsing ns.ALL code signals to persist ConfigEntry
         )
@@ -165,6 +313,7 @@ class MerossDevice:
         self.device_timedelta_config_epoch = 0
         self.lastrequest = 0
         self.lastupdate = 0
+        self.lastupdate_all = 0  # last NS_APPLIANCE_SYSTEM_ALL received (full state)
         self.lastmqtt = 0  # means we recently received an mqtt message
         self.hasmqtt = (
             False  # hasmqtt means it is somehow available to communicate over mqtt
@@ -180,17 +329,18 @@ class MerossDevice:
         self.entities: dict[
             object, 'MerossEntity'
         ] = {}
-        # This is mainly for HTTP based devices: we build a dictionary of what we think could be
-        # useful to asynchronously poll so the actual polling cycle doesnt waste time in checks
+        # This is mainly for HTTP based devices: we build a table (see PollingPolicy) of what we think
+        # could be useful to asynchronously poll so the actual polling cycle doesnt waste time in checks
         # TL:DR we'll try to solve everything with just NS_SYS_ALL since it usually carries the full state
         # in a single transaction. Also (see #33) the multiplug mss425 doesnt publish the full switch list state
         # through NS_CNTRL_TOGGLEX (not sure if it's the firmware or the dialect)
         # Even if some devices don't carry significant state in NS_ALL we'll poll it anyway even if bulky
         # since it carries also timing informations and whatever
-        self.polling_dictionary: dict[str, dict] = {}
-        self.polling_dictionary[mc.NS_APPLIANCE_SYSTEM_ALL] = mc.PAYLOAD_GET[
-            mc.NS_APPLIANCE_SYSTEM_ALL
-        ]
+        self.polling_dictionary: dict[str, PollingPolicy] = {}
+        self._polling_policies: list[PollingPolicy] | None = None  # sorted by priority
+        self.polling_policy_add(
+            mc.NS_APPLIANCE_SYSTEM_ALL, priority=POLLING_PRIORITY_HIGH
+        )
         # when we build an entity we also add the relative platform name here
         # so that the async_setup_entry for the integration will be able to forward
         # the setup to the appropriate platform.
@@ -203,21 +353,98 @@ class MerossDevice:
         # device instance in 'receive'. Here, it was traditionally parsed with a
         # switch structure against the different expected namespaces.
         # Now the architecture, while still in place, is being moved to handler methods
-        # which are looked up by inspecting self for a proper '_handler_{namespace}' signature
-        # This signature could be added at runtime or (better I guess) could be added by
+        # with a proper '_handle_{namespace}' signature which could be added by
         # dedicated mixin classes used to build the actual device class when the device is setup
-        # (see __init__.MerossApi.build_device)
-        # The handlers dictionary is anyway parsed first and could override a build-time handler.
-        # The dicionary keys are Meross namespaces matched against when the message enters the handling
-        # self.handlers: Dict[str, Callable] = {}
+        # (see __init__.MerossApi.build_device). At that time the class '_handlers' table
+        # is built so that routing a message is just a dict lookup on the namespace
         # The list of pending MQTT requests (SET or GET) which are waiting their SETACK (or GETACK)
         # in order to complete the transaction
         self._mqtt_transactions: dict[str, _MQTTTransaction] = {}
+        # transactions expire on a heap of (deadline, messageid) serviced by a single
+        # timer armed at the earliest deadline. Entries for already replied transactions
+        # are just skipped when they come due
+        self._mqtt_transactions_timeouts: list[tuple[float, str]] = []
+        self._mqtt_transactions_timer: asyncio.TimerHandle | None = None
+        self.mqtt_rtt = RttEstimator(rto_max=PARAM_MQTT_TRANSACTION_TIMEOUT)
+        self._mqtt_latencies: deque[float] = deque(maxlen=PARAM_MQTT_LATENCY_SAMPLES)
+        # flow-control: GET/SET requests exceeding the window (mqtt_window transactions
+        # awaiting their ACK) are queued and published when some ACK (or timeout) comes in
+        # queue entries: (namespace, method, payload, response_callback, future, messageid, enqueue_time)
+        self._mqtt_queue: deque[tuple] = deque()
+        self._mqtt_queue_maxdepth = 0
+        self._mqtt_queue_dropped = 0
+        self._http_latencies: deque[float] = deque(maxlen=PARAM_MQTT_LATENCY_SAMPLES)
+        # hedged SETs (see _async_request_hedged) are sent with the same messageid
+        # over both the transports: messageid -> True once its (first) ACK was processed
+        self._hedge_messageids: dict[str, bool] = {}
+        self._hedge_requests = 0
+        self._hedge_fired = 0
+        self._hedge_won = 0
+        self._hedge_duplicates = 0
+        # (protocol auto) transport selection: see _protocol_select
+        self._protocol_probe_epoch = 0
+        self._protocol_switch_epoch = 0
+        self._protocol_switches: deque[tuple[int, str, str, str]] = deque(
+            maxlen=PARAM_PROTOCOL_SWITCH_LOG
+        )
+        # HTTP requests are queued (heap of (priority, seq, enqueue_time, request))
+        # and served by a single worker task since the device HTTP server
+        # doesn't handle concurrency well (see _http_enqueue)
+        self._http_queue: list[tuple] = []
+        self._http_queue_seq = 0
+        self._http_queue_maxdepth = 0
+        self._http_queue_served = 0
+        self._http_queue_dropped = 0
+        self._http_queue_wait = [0.0, 0.0, 0.0]  # ewma per priority
+        self._http_worker: asyncio.Task | None = None
+        # single-flight GETs: (namespace, payload) -> (future, awaitable future, request time)
+        # see _request
+        self._inflight_gets: dict[tuple[str, str], tuple[asyncio.Future, asyncio.Future | None, float]] = {}
+        self._inflight_duplicates = 0
+        self._updates_running = False
+        self._updates_duplicates = 0
+        # 'transition mode': entities (covers) currently moving with the namespaces
+        # to follow them (see transition_start)
+        self._transitions: dict[MerossEntity, tuple[str, ...]] = {}
+        self._transition_running = False
+        self._transition_requests = 0
+        self._polling_epoch = 0  # last 'regular' polling cycle
+        # change detection on the NS_ALL digest: digest key -> last parsed value
+        # so that unchanged subtrees are not parsed again (see _parse_all)
+        self._digest_cache: dict[str, object] = {}
+        self._digest_namespaces: dict[str, tuple[str, ...]] = {}
+        self._digest_parsed = 0
+        self._digest_skipped = 0
+        # last-write-wins SETs: (namespace, key) -> [future of the pending command (or None)]
+        # while a command for that key is in flight (see async_request_coalesced)
+        self._commands_pending: dict[tuple[str, object], list[asyncio.Future | None]] = {}
+        self._commands_coalesced = 0
+        # when the device supports NS_APPLIANCE_CONTROL_MULTIPLE we'll pack the GETs
+        # issued along a polling cycle into a (few) single request(s) carrying
+        # up to 'maxCmdNum' messages. _multiple_requests is not None only while
+        # collecting the requests (see _async_request_updates)
+        self._multiple_len: int = descriptor.ability.get(
+            mc.NS_APPLIANCE_CONTROL_MULTIPLE, {}
+        ).get(mc.KEY_MAXCMDNUM, 0)
+        self._multiple_requests: list[tuple[str, dict]] | None = None
 
         self._unsub_entry_update_listener = config_entry.add_update_listener(
             self.entry_update_listener
         )
         self._set_config_entry(config_entry.data)
+        # polled namespaces failing (ERROR or no reply) are suppressed with an exponential
+        # backoff: {namespace: [failures, suppressed_until]}. This is persisted in the
+        # ConfigEntry and discarded when the device abilities change (see #167)
+        self._ability_fingerprint = _ability_fingerprint(descriptor.ability)
+        self.negative_cache: dict[str, list] = {}
+        negative_cache = config_entry.data.get(CONF_NEGATIVE_CACHE)
+        if isinstance(negative_cache, dict) and (
+            negative_cache.get("fingerprint") == self._ability_fingerprint
+        ):
+            self.negative_cache = {
+                namespace: list(backoff)
+                for namespace, backoff in negative_cache.get("namespaces", {}).items()
+            }
 
         try:
             # try block since this is not critical
@@ -248,9 +475,9 @@ class MerossDevice:
                 else:
                     _init(payload)
 
-        self._unsub_polling_callback = api.schedule_async_callback(
-            0, self._async_polling_callback
-        )
+        # the polling cycle is driven by the MerossApi scheduler: the first cycle
+        # runs right away (see _async_polling_callback for the phase of the next ones)
+        api.polling_schedule(self, 0)
 
     def __del__(self):
         LOGGER.debug("MerossDevice(%s) destroy", self.device_id)
@@ -261,9 +488,26 @@ class MerossDevice:
         called when the config entry is unloaded
         we'll try to clear everything here
         """
-        if self._unsub_polling_callback is not None:
-            self._unsub_polling_callback.cancel()
-            self._unsub_polling_callback = None
+        self.api.polling_unschedule(self)
+        if self._mqtt_transactions_timer is not None:
+            self._mqtt_transactions_timer.cancel()
+            self._mqtt_transactions_timer = None
+        for mqtt_transaction in self._mqtt_transactions.values():
+            if mqtt_transaction.future is not None:
+                mqtt_transaction.future.cancel()
+        self._mqtt_transactions.clear()
+        for mqtt_request in self._mqtt_queue:
+            if (future := mqtt_request[4]) is not None:
+                future.cancel()
+        self._mqtt_queue.clear()
+        if self._http_worker is not None:
+            self._http_worker.cancel()
+            self._http_worker = None
+        for http_request in self._http_queue:
+            if (future := http_request[7]) is not None:
+                future.cancel()
+        self._http_queue.clear()
+        self._inflight_gets.clear()
         if self._unsub_entry_update_listener is not None:
             self._unsub_entry_update_listener()
             self._unsub_entry_update_listener = None
@@ -282,7 +526,10 @@ class MerossDevice:
     def tzinfo(self) -> tzinfo:
         tz_name = self.descriptor.timezone
         try:
-            return ZoneInfo(tz_name) if tz_name else timezone.utc
+            if tz_name:
+                from zoneinfo import ZoneInfo
+                return ZoneInfo(tz_name)
+            return timezone.utc
         except Exception:
             self.log(
                 WARNING,
@@ -353,23 +600,47 @@ class MerossDevice:
                 namespace,
                 json_dumps(payload),
             )
+            # custom requests (hubs) deal with their errors (see MerossDeviceHub._async_request_subdevices)
+            # and only the replies to our polling GETs count (not i.e. a failing SET)
+            if (
+                ((policy := self.polling_dictionary.get(namespace)) is not None)
+                and (policy.async_request is None)
+                and (policy.lastrequest > policy.lastupdate)
+            ):
+                self._negative_cache_fail(namespace, epoch)
+            return True
+
+        if namespace == mc.NS_APPLIANCE_CONTROL_MULTIPLE:
+            # this is the reply to our packed requests (see async_multiple_requests_flush)
+            # so we just unpack and route every message as if it was received alone
+            for message in payload.get(mc.KEY_MULTIPLE, []):
+                self.receive(message[mc.KEY_HEADER], message[mc.KEY_PAYLOAD], protocol)
             return True
 
         self.lastupdate = epoch
+        if (policy := self.polling_dictionary.get(namespace)) is not None:
+            policy.lastupdate = epoch
+        if namespace in self.negative_cache:
+            self.negative_cache.pop(namespace)
+            self._save_config_entry({})
         if not self._online:
             self.log(DEBUG, 0, "MerossDevice(%s) back online!", self.name)
             self._online = True
+            if self._polling_delay != self.polling_period:
+                # we were backing off: restore the regular polling
+                self._offline_reset()
             self.api.hass.async_create_task(
-                self.async_request_updates(epoch, namespace)
+                self._async_request_updates(epoch, namespace)
             )
-        # disable this code: it is no use so far....
-        # handler = self.handlers.get(namespace)
-        # if handler is not None:
-        #     handler(header, payload)
-        #     return True
-        handler = getattr(self, f"_handle_{namespace.replace('.', '_')}", None)
+            if namespace != mc.NS_APPLIANCE_SYSTEM_ABILITY:
+                self._negative_cache_check()
+        if namespace != mc.NS_APPLIANCE_SYSTEM_ALL:
+            # anything else (polled, pushed or our own commands) might have moved
+            # the state away from the last digest
+            self._digest_invalidate(namespace)
+        handler = self._handlers.get(namespace)
         if handler is not None:
-            handler(header, payload)
+            handler(self, header, payload)
             return True
 
         return False
@@ -385,7 +656,7 @@ class MerossDevice:
                 if entitykey is None
                 else f"{payload[mc.KEY_CHANNEL]}_{entitykey}"
             ]
-            getattr(entity, f"_parse_{key}", entity._parse_undefined)(payload)
+            entity._parsers.get(key, _parse_undefined)(entity, payload)
         elif isinstance(payload, list):
             for p in payload:
                 self._parse__generic(key, p, entitykey)
@@ -408,7 +679,7 @@ class MerossDevice:
                 if entitykey is None
                 else f"{channel_payload[mc.KEY_CHANNEL]}_{entitykey}"
             ]
-            getattr(entity, f"_parse_{key}", entity._parse_undefined)(channel_payload)
+            entity._parsers.get(key, _parse_undefined)(entity, channel_payload)
 
     def _handle_generic_array(self, header: dict, payload: dict):
         """
@@ -420,6 +691,7 @@ class MerossDevice:
         self._parse__generic_array(key, payload.get(key))
 
     def _handle_Appliance_System_All(self, header: dict, payload: dict):
+        self.lastupdate_all = self.lastupdate
         self._parse_all(payload)
         if self.needsave is True:
             self.needsave = False
@@ -434,6 +706,17 @@ class MerossDevice:
         if isinstance(dndmode := payload.get(mc.KEY_DNDMODE), dict):
             self.entity_dnd.update_onoff(dndmode.get(mc.KEY_MODE))  # type: ignore
 
+    def _handle_Appliance_System_Ability(self, header: dict, payload: dict):
+        if isinstance(ability := payload.get(mc.KEY_ABILITY), dict):
+            fingerprint = _ability_fingerprint(ability)
+            if fingerprint != self._ability_fingerprint:
+                # the device (or hub) now exposes a different set of namespaces
+                # so what was failing before might be working now
+                self.descriptor.ability = ability
+                self._ability_fingerprint = fingerprint
+                self.negative_cache = {}
+                self._save_config_entry({mc.KEY_ABILITY: ability})
+
     def _handle_Appliance_System_Clock(self, header: dict, payload: dict):
         # this is part of initial flow over MQTT
         # we'll try to set the correct time in order to avoid
@@ -474,15 +757,26 @@ class MerossDevice:
         if (self.pref_protocol is CONF_PROTOCOL_MQTT) and (
             self.curr_protocol is CONF_PROTOCOL_HTTP
         ):
-            self.switch_protocol(CONF_PROTOCOL_MQTT)  # will reset 'lastmqtt'
+            self.switch_protocol(CONF_PROTOCOL_MQTT, "mqtt receive")  # will reset 'lastmqtt'
         messageid = header[mc.KEY_MESSAGEID]
-        if messageid in self._mqtt_transactions:
-            mqtt_transaction = self._mqtt_transactions[messageid]
+        if (mqtt_transaction := self._mqtt_transactions.get(messageid)) is not None:
             if mqtt_transaction.namespace == header[mc.KEY_NAMESPACE]:
                 self._mqtt_transactions.pop(messageid)
-                mqtt_transaction.response_callback(
-                    header[mc.KEY_METHOD] != mc.METHOD_ERROR, header, payload
-                )
+                latency = self.api.hass.loop.time() - mqtt_transaction.request_time
+                self.mqtt_rtt.sample(latency)
+                self._mqtt_latencies.append(latency)
+                if self._mqtt_queue:
+                    self._mqtt_queue_flush()
+                acknowledge = header[mc.KEY_METHOD] != mc.METHOD_ERROR
+                if mqtt_transaction.response_callback is not None:
+                    mqtt_transaction.response_callback(acknowledge, header, payload)
+                if ((future := mqtt_transaction.future) is not None) and not future.done():
+                    if acknowledge:
+                        future.set_result((header, payload))
+                    else:
+                        future.set_exception(MerossProtocolError(payload))
+        if self._hedge_messageids and self._hedge_processed(messageid):
+            return
 
         self.receive(header, payload, CONF_PROTOCOL_MQTT)
         # self.lastmqtt is checked against to see if we have to request a full state update
@@ -494,7 +788,7 @@ class MerossDevice:
     def mqtt_disconnected(self):
         if self.curr_protocol is CONF_PROTOCOL_MQTT:
             if self.conf_protocol is CONF_PROTOCOL_AUTO:
-                self.switch_protocol(CONF_PROTOCOL_HTTP)
+                self.switch_protocol(CONF_PROTOCOL_HTTP, "mqtt disconnected")
             # conf_protocol should be CONF_PROTOCOL_MQTT:
             elif self._online:
                 self._set_offline()
@@ -506,19 +800,190 @@ class MerossDevice:
         payload: dict,
         response_callback: ResponseCallbackType | None = None,
         messageid: str | None = None,
-    ):
+        future: asyncio.Future | None = None,
+    ) -> bool:
+        """
+        returns False when the request couldn't be published (MQTT disconnected)
+        so that the caller can fall back to HTTP
+        """
+        if method in mc.METHOD_ACK_MAP:
+            # GET/SET are tracked (awaiting their ACK) and flow-controlled
+            if self.mqtt_window and (
+                self._mqtt_queue or (len(self._mqtt_transactions) >= self.mqtt_window)
+            ):
+                self._mqtt_enqueue(
+                    namespace, method, payload, response_callback, future, messageid
+                )
+                return True
+            return self._mqtt_request_transaction(
+                namespace, method, payload, response_callback, future, messageid
+            )
         if self._trace_file is not None:
             self._trace(
                 payload, namespace, method, CONF_PROTOCOL_MQTT, TRACE_DIRECTION_TX
             )
-        if response_callback is not None:
-            transaction = _MQTTTransaction(namespace, method, response_callback)
-            self._mqtt_transactions[transaction.messageid] = transaction
-            messageid = transaction.messageid
-        self.api.mqtt_publish(
+        return self.api.mqtt_publish(
             self.device_id, namespace, method, payload, self.key, messageid
         )
 
+    def _mqtt_request_transaction(
+        self,
+        namespace: str,
+        method: str,
+        payload: dict,
+        response_callback: ResponseCallbackType | None,
+        future: asyncio.Future | None,
+        messageid: str | None = None,
+    ) -> bool:
+        if self._trace_file is not None:
+            self._trace(
+                payload, namespace, method, CONF_PROTOCOL_MQTT, TRACE_DIRECTION_TX
+            )
+        request_time = self.api.hass.loop.time()
+        transaction = _MQTTTransaction(
+            namespace, method, response_callback, future, request_time, messageid
+        )
+        messageid = transaction.messageid
+        self._mqtt_transactions[messageid] = transaction
+        deadline = request_time + PARAM_MQTT_TRANSACTION_TIMEOUT
+        heapq.heappush(self._mqtt_transactions_timeouts, (deadline, messageid))
+        if self._mqtt_transactions_timer is None:
+            self._mqtt_transactions_timer = self.api.hass.loop.call_at(
+                deadline, self._mqtt_transactions_timeout
+            )
+        if self.api.mqtt_publish(
+            self.device_id, namespace, method, payload, self.key, messageid
+        ):
+            return True
+        # broker disconnected: fail now rather than at the transaction timeout
+        self._mqtt_transactions.pop(messageid)
+        if (future is not None) and not future.done():
+            future.set_exception(ConnectionError("MQTT disconnected"))
+        return False
+
+    def _mqtt_request_release(self, messageid: str):
+        """
+        forget the request (either in flight or still queued) when its requester is
+        not interested in the reply anymore so that it doesn't hold a window slot
+        until its transaction times out
+        """
+        if self._mqtt_transactions.pop(messageid, None) is not None:
+            if self._mqtt_queue:
+                self._mqtt_queue_flush()
+            return
+        for mqtt_request in self._mqtt_queue:
+            if mqtt_request[5] == messageid:
+                self._mqtt_queue.remove(mqtt_request)
+                return
+
+    def _mqtt_enqueue(
+        self,
+        namespace: str,
+        method: str,
+        payload: dict,
+        response_callback: ResponseCallbackType | None,
+        future: asyncio.Future | None,
+        messageid: str | None,
+    ):
+        """
+        queue the request while the window is full. The queue is bounded: a plain GET
+        identical to an already queued one is just discarded and, when full, the
+        oldest GET (or the oldest request if none) is dropped failing its future
+        """
+        mqtt_queue = self._mqtt_queue
+        if (method == mc.METHOD_GET) and (response_callback is None) and (future is None):
+            for mqtt_request in mqtt_queue:
+                if (
+                    (mqtt_request[1] == mc.METHOD_GET)
+                    and (mqtt_request[0] == namespace)
+                    and (mqtt_request[2] == payload)
+                ):
+                    self._inflight_duplicates += 1
+                    return
+        if len(mqtt_queue) >= PARAM_MQTT_QUEUE_SIZE:
+            for mqtt_request in mqtt_queue:
+                if mqtt_request[1] == mc.METHOD_GET:
+                    break
+            else:
+                mqtt_request = mqtt_queue[0]
+            mqtt_queue.remove(mqtt_request)
+            self._mqtt_queue_drop(mqtt_request, "full")
+        mqtt_queue.append(
+            (
+                namespace,
+                method,
+                payload,
+                response_callback,
+                future,
+                messageid,
+                self.api.hass.loop.time(),
+            )
+        )
+        if len(mqtt_queue) > self._mqtt_queue_maxdepth:
+            self._mqtt_queue_maxdepth = len(mqtt_queue)
+
+    def _mqtt_queue_drop(self, mqtt_request: tuple, reason: str):
+        self._mqtt_queue_dropped += 1
+        self.log(
+            WARNING,
+            14400,
+            "MerossDevice(%s) MQTT queue %s: dropping %s %s",
+            self.name,
+            reason,
+            mqtt_request[1],
+            mqtt_request[0],
+        )
+        if ((future := mqtt_request[4]) is not None) and not future.done():
+            future.set_exception(asyncio.TimeoutError())
+
+    def _mqtt_queue_flush(self):
+        mqtt_queue = self._mqtt_queue
+        stale_time = self.api.hass.loop.time() - PARAM_MQTT_TRANSACTION_TIMEOUT
+        while mqtt_queue and (
+            (not self.mqtt_window) or (len(self._mqtt_transactions) < self.mqtt_window)
+        ):
+            mqtt_request = mqtt_queue.popleft()
+            if (mqtt_request[1] == mc.METHOD_GET) and (mqtt_request[6] < stale_time):
+                # too late: the polling cycle will ask again anyway
+                self._mqtt_queue_drop(mqtt_request, "stale")
+                continue
+            self._mqtt_request_transaction(*mqtt_request[:6])
+
+    async def async_mqtt_request(
+        self,
+        namespace: str,
+        method: str,
+        payload: dict,
+    ) -> tuple[dict, dict]:
+        """
+        publish the request and wait for the reply: returns (header, payload)
+        or raises asyncio.TimeoutError if no reply comes in
+        PARAM_MQTT_TRANSACTION_TIMEOUT or MerossProtocolError on METHOD_ERROR
+        """
+        future = self.api.hass.loop.create_future()
+        self.mqtt_request(namespace, method, payload, None, None, future)
+        return await future
+
+    @callback
+    def _mqtt_transactions_timeout(self):
+        # deadlines are (almost) ordered by insertion since the timeout is fixed
+        # so we're usually just popping the heap head(s)
+        self._mqtt_transactions_timer = None
+        timeouts = self._mqtt_transactions_timeouts
+        now = self.api.hass.loop.time()
+        while timeouts and (timeouts[0][0] <= now):
+            messageid = heapq.heappop(timeouts)[1]
+            if (mqtt_transaction := self._mqtt_transactions.pop(messageid, None)) is not None:
+                self.mqtt_rtt.timeout()
+                if ((future := mqtt_transaction.future) is not None) and not future.done():
+                    future.set_exception(asyncio.TimeoutError())
+        if self._mqtt_queue:
+            self._mqtt_queue_flush()
+        if timeouts:
+            self._mqtt_transactions_timer = self.api.hass.loop.call_at(
+                timeouts[0][0], self._mqtt_transactions_timeout
+            )
+
     async def async_http_request(
         self,
         namespace: str,
@@ -528,16 +993,12 @@ class MerossDevice:
     ):
 
         try:
-            _httpclient: MerossHttpClient = getattr(self, VOLATILE_ATTR_HTTPCLIENT, None)  # type: ignore
-            if _httpclient is None:
-                _httpclient = MerossHttpClient(
-                    self.host, self.key, async_get_clientsession(self.api.hass), LOGGER
-                )
-                self._httpclient = _httpclient
+            _httpclient = self._get_httpclient()
 
-            for attempt in range(3):
+            for attempt in range(_httpclient.rtt.attempts):
                 # since we get 'random' connection errors, this is a retry attempts loop
                 # until we get it done. We'd want to break out early on specific events tho (Timeouts)
+                # The number of attempts is tuned on the device (estimated) reliability
                 if self._trace_file is not None:
                     self._trace(
                         payload,
@@ -547,9 +1008,11 @@ class MerossDevice:
                         TRACE_DIRECTION_TX,
                     )
                 try:
+                    request_time = self.api.hass.loop.time()
                     response = await _httpclient.async_request(
                         namespace, method, payload
                     )
+                    self._http_latencies.append(self.api.hass.loop.time() - request_time)
                     break
                 except Exception as e:
                     if not self._online:
@@ -566,9 +1029,9 @@ class MerossDevice:
                     if (
                         (self.conf_protocol is CONF_PROTOCOL_AUTO)
                         and self.lastmqtt
-                        and mqtt_is_connected(self.api.hass)
+                        and self.api.mqtt_connected
                     ):
-                        self.switch_protocol(CONF_PROTOCOL_MQTT)
+                        self.switch_protocol(CONF_PROTOCOL_MQTT, f"http {type(e).__name__}")
                         self.mqtt_request(namespace, method, payload, response_callback)
                         return
                     elif isinstance(e, asyncio.TimeoutError):
@@ -596,38 +1059,250 @@ class MerossDevice:
                 str(e),
             )
 
-    def request(
+    def _get_httpclient(self) -> MerossHttpClient:
+        _httpclient: MerossHttpClient = getattr(self, VOLATILE_ATTR_HTTPCLIENT, None)  # type: ignore
+        if _httpclient is None:
+            _httpclient = MerossHttpClient(
+                self.host, self.key, self.api.http_session, LOGGER
+            )
+            self._httpclient = _httpclient
+        return _httpclient
+
+    def _http_enqueue(
         self,
         namespace: str,
         method: str,
         payload: dict,
-        response_callback: ResponseCallbackType | None = None,
-    ):
+        response_callback: ResponseCallbackType | None,
+        future: asyncio.Future | None,
+        strict: tuple[str | None, float | None] | None = None,
+    ) -> bool:
+        """
+        queue the request for the HTTP worker. The queue is bounded but only
+        for polls: when full these are dropped (returning False) since the next
+        polling cycle will anyway ask again.
+        strict (messageid, timeout) requests are served by _async_http_request_strict
+        and their outcome (reply or exception) is set on the future
+        """
+        if namespace == mc.NS_APPLIANCE_CONTROL_MULTIPLE:
+            # these are our packed polling GETs (see async_multiple_requests_flush)
+            # even if sent as METHOD_SET
+            priority = HTTP_PRIORITY_POLL
+        else:
+            priority = HTTP_PRIORITY_MAP.get(method, HTTP_PRIORITY_POLL)
+        http_queue = self._http_queue
+        if (priority == HTTP_PRIORITY_POLL) and (len(http_queue) >= PARAM_HTTP_QUEUE_SIZE):
+            self._http_queue_dropped += 1
+            self.log(
+                WARNING,
+                14400,
+                "MerossDevice(%s) HTTP queue full: dropping %s %s",
+                self.name,
+                method,
+                namespace,
+            )
+            return False
+        self._http_queue_seq += 1
+        heapq.heappush(
+            http_queue,
+            (
+                priority,
+                self._http_queue_seq,
+                self.api.hass.loop.time(),
+                namespace,
+                method,
+                payload,
+                response_callback,
+                future,
+                strict,
+            ),
+        )
+        if len(http_queue) > self._http_queue_maxdepth:
+            self._http_queue_maxdepth = len(http_queue)
+        if self._http_worker is None:
+            self._http_worker = self.api.hass.async_create_task(
+                self._async_http_worker()
+            )
+        return True
+
+    async def _async_http_worker(self):
+        """
+        serves the HTTP queue one request at a time (in priority order)
+        and exits when the queue is empty
+        """
+        http_queue = self._http_queue
+        try:
+            while http_queue:
+                (
+                    priority,
+                    _,
+                    enqueue_time,
+                    namespace,
+                    method,
+                    payload,
+                    response_callback,
+                    future,
+                    strict,
+                ) = heapq.heappop(http_queue)
+                if (future is not None) and future.done():
+                    continue  # cancelled by the requester (i.e. an hedge already won)
+                wait = self.api.hass.loop.time() - enqueue_time
+                self._http_queue_wait[priority] += (
+                    wait - self._http_queue_wait[priority]
+                ) * RttEstimator.ALPHA
+                result = None
+                try:
+                    if strict is None:
+                        await self.async_http_request(
+                            namespace, method, payload, response_callback
+                        )
+                    else:
+                        result = await self._async_http_request_strict(
+                            namespace, method, payload, *strict
+                        )
+                except Exception as error:
+                    result = error  # only strict requests raise
+                finally:
+                    self._http_queue_served += 1
+                    if (future is not None) and not future.done():
+                        if isinstance(result, Exception):
+                            future.set_exception(result)
+                        else:
+                            future.set_result(result)
+        finally:
+            self._http_worker = None
+
+    async def async_http_request_strict(
+        self,
+        namespace: str,
+        method: str,
+        payload: dict,
+        messageid: str | None = None,
+        timeout: float | None = None,
+    ) -> tuple[dict, dict]:
+        """
+        single shot HTTP request served through the HTTP queue: no retries,
+        no protocol fallback and no offline transition since the caller (hedged
+        requests, probes) manages the outcome. The reply is processed and returned
+        as (header, payload) or raises (asyncio.TimeoutError, MerossProtocolError, ...)
+        """
+        future = self.api.hass.loop.create_future()
+        if not self._http_enqueue(
+            namespace, method, payload, None, future, (messageid, timeout)
+        ):
+            raise asyncio.TimeoutError()  # dropped: the queue is full
+        return await future
+
+    async def _async_http_request_strict(
+        self,
+        namespace: str,
+        method: str,
+        payload: dict,
+        messageid: str | None,
+        timeout: float | None,
+    ) -> tuple[dict, dict]:
+        if self._trace_file is not None:
+            self._trace(
+                payload, namespace, method, CONF_PROTOCOL_HTTP, TRACE_DIRECTION_TX
+            )
+        loop = self.api.hass.loop
+        request_time = loop.time()
+        response = await asyncio.wait_for(
+            self._get_httpclient().async_request(namespace, method, payload, messageid),
+            timeout,
+        )
+        self._http_latencies.append(loop.time() - request_time)
+        r_header = response[mc.KEY_HEADER]
+        r_payload = response[mc.KEY_PAYLOAD]
+        if (messageid is None) or not self._hedge_processed(messageid):
+            self.receive(r_header, r_payload, CONF_PROTOCOL_HTTP)
+        if r_header[mc.KEY_METHOD] == mc.METHOD_ERROR:
+            raise MerossProtocolError(r_payload)
+        return r_header, r_payload
+
+    def _request(
+        self,
+        namespace: str,
+        method: str,
+        payload: dict,
+        response_callback: ResponseCallbackType | None,
+    ) -> asyncio.Future | None:
         """
         route the request through MQTT or HTTP to the physical device.
-        callback will be called on successful replies and actually implemented
-        only when HTTPing SET requests. On MQTT we rely on async PUSH and SETACK to manage
-        confirmation/status updates
+        Returns the future of the HTTP request (done when served) or None
+        when the request was published over MQTT (or dropped).
+        GETs are 'single-flight': while an identical GET (same namespace and payload)
+        is in flight we'll not issue another one but just share the pending one.
+        An MQTT GET stops being 'in flight' as soon as its reply is overdue (by the
+        estimated rto) even if its transaction is still waiting to expire
         """
+        loop = self.api.hass.loop
+        if (method == mc.METHOD_GET) and (response_callback is None):
+            inflight_key = (namespace, json_dumps(payload))
+            if (inflight := self._inflight_gets.get(inflight_key)) is not None:
+                if (inflight[1] is not None) or (
+                    (self.curr_protocol is CONF_PROTOCOL_MQTT)
+                    and ((loop.time() - inflight[2]) < self.mqtt_rtt.rto)
+                ):
+                    self._inflight_duplicates += 1
+                    return inflight[1]
+                self._inflight_gets.pop(inflight_key)
+        else:
+            inflight_key = None
+
         self.lastrequest = time()
+        if self._hedge_enabled(method):
+            return loop.create_task(
+                self._async_request_hedged(namespace, payload, response_callback)
+            )
         if self.curr_protocol is CONF_PROTOCOL_MQTT:
             # only publish when mqtt component is really connected else we'd
             # insanely dump lot of mqtt errors in log
-            if mqtt_is_connected(self.api.hass):
-                self.mqtt_request(namespace, method, payload, response_callback)
-                return
+            if self.api.mqtt_connected:
+                if inflight_key is None:
+                    if self.mqtt_request(namespace, method, payload, response_callback):
+                        return None
+                else:
+                    future = loop.create_future()
+                    if self.mqtt_request(namespace, method, payload, None, None, future):
+                        self._inflight_add(inflight_key, future, None)
+                        return None
+                    future.exception()  # nobody else is waiting on it
             # MQTT not connected
             if self.conf_protocol is CONF_PROTOCOL_MQTT:
-                return
+                return None
             # protocol is AUTO
-            self.switch_protocol(CONF_PROTOCOL_HTTP)
+            self.switch_protocol(CONF_PROTOCOL_HTTP, "mqtt disconnected")
 
         # curr_protocol is HTTP
-        self.api.hass.async_create_task(
-            self.async_http_request(namespace, method, payload, response_callback)
+        future = loop.create_future()
+        if not self._http_enqueue(namespace, method, payload, response_callback, future):
+            return None
+        if inflight_key is not None:
+            self._inflight_add(inflight_key, future, future)
+        return future
+
+    def _inflight_add(
+        self,
+        inflight_key: tuple[str, str],
+        future: asyncio.Future,
+        awaitable: asyncio.Future | None,
+    ):
+        self._inflight_gets[inflight_key] = (
+            future,
+            awaitable,
+            self.api.hass.loop.time(),
         )
 
-    async def async_request(
+        def _done(_future: asyncio.Future):
+            if self._inflight_gets.get(inflight_key, (None,))[0] is _future:
+                self._inflight_gets.pop(inflight_key)
+            if not _future.cancelled():
+                _future.exception()  # consume the exception (if any)
+
+        future.add_done_callback(_done)
+
+    def request(
         self,
         namespace: str,
         method: str,
@@ -640,63 +1315,509 @@ class MerossDevice:
         only when HTTPing SET requests. On MQTT we rely on async PUSH and SETACK to manage
         confirmation/status updates
         """
-        self.lastrequest = time()
-        if self.curr_protocol is CONF_PROTOCOL_MQTT:
-            # only publish when mqtt component is really connected else we'd
-            # insanely dump lot of mqtt errors in log
-            if mqtt_is_connected(self.api.hass):
-                self.mqtt_request(namespace, method, payload, response_callback)
-                return
-            # MQTT not connected
-            if self.conf_protocol is CONF_PROTOCOL_MQTT:
-                return
-            # protocol is AUTO
-            self.switch_protocol(CONF_PROTOCOL_HTTP)
+        self._request(namespace, method, payload, response_callback)
 
-        # curr_protocol is HTTP
-        await self.async_http_request(namespace, method, payload, response_callback)
+    async def async_request(
+        self,
+        namespace: str,
+        method: str,
+        payload: dict,
+        response_callback: ResponseCallbackType | None = None,
+    ):
+        """
+        same as request but awaits the completion of HTTP requests
+        """
+        if (future := self._request(namespace, method, payload, response_callback)) is not None:
+            await asyncio.shield(future)
+
+    async def async_request_ack(
+        self,
+        namespace: str,
+        method: str,
+        payload: dict,
+    ) -> tuple[dict, dict]:
+        """
+        awaitable version of async_request: returns the response (header, payload)
+        or raises asyncio.TimeoutError (no reply) or MerossProtocolError (ERROR reply)
+        """
+        hedged = self._hedge_enabled(method)
+        if (
+            (not hedged)
+            and (self.curr_protocol is CONF_PROTOCOL_MQTT)
+            and self.api.mqtt_connected
+        ):
+            self.lastrequest = time()
+            return await self.async_mqtt_request(namespace, method, payload)
+
+        future = self.api.hass.loop.create_future()
+
+        def _response_callback(acknowledge: bool, header: dict, payload: dict):
+            if not future.done():
+                if acknowledge:
+                    future.set_result((header, payload))
+                else:
+                    future.set_exception(MerossProtocolError(payload))
+
+        await self.async_request(namespace, method, payload, _response_callback)
+        if (not future.done()) and (hedged or (self.curr_protocol is CONF_PROTOCOL_HTTP)):
+            # async_http_request (or both the hedged legs) failed (they don't raise)
+            future.cancel()
+            raise asyncio.TimeoutError()
+        # the request might have been re-routed over MQTT
+        # with our callback: the transaction timeout is not binding
+        # the future so we're guarding it here
+        return await asyncio.wait_for(future, PARAM_MQTT_TRANSACTION_TIMEOUT)
+
+    def _hedge_enabled(self, method: str) -> bool:
+        """hedging is only possible when both the transports are (likely) working"""
+        return (
+            self.hedge
+            and (method == mc.METHOD_SET)
+            and (self.conf_protocol is CONF_PROTOCOL_AUTO)
+            and bool(self._host)
+            and bool(self.lastmqtt)
+            and self.api.mqtt_connected
+        )
+
+    def _hedge_delay(self, protocol) -> float:
+        """how long to wait for the ACK on protocol before hedging the request"""
+        latencies = sorted(
+            self._mqtt_latencies
+            if protocol is CONF_PROTOCOL_MQTT
+            else self._http_latencies
+        )
+        if (delay := _percentile(latencies, PARAM_HEDGE_PERCENTILE)) is None:
+            return PARAM_HEDGE_DELAY_MAX
+        return min(max(delay, PARAM_HEDGE_DELAY_MIN), PARAM_HEDGE_DELAY_MAX)
+
+    def _hedge_processed(self, messageid: str) -> bool:
+        """
+        returns True if this is a reply to an hedged request which was already
+        processed (coming from the other transport) so that it's not parsed twice
+        """
+        if (processed := self._hedge_messageids.get(messageid)) is None:
+            return False
+        if processed:
+            self._hedge_duplicates += 1
+            return True
+        self._hedge_messageids[messageid] = True
+        return False
+
+    async def _async_request_hedged(
+        self,
+        namespace: str,
+        payload: dict,
+        response_callback: ResponseCallbackType | None,
+    ):
+        """
+        send the SET over the current transport and, if the ACK is late (see _hedge_delay),
+        fire the same message (same messageid) over the other one: the first ACK wins
+        """
+        loop = self.api.hass.loop
+        messageid = SIGNER.messageid()
+        self._hedge_messageids[messageid] = False
+        self._hedge_requests += 1
+
+        def _consume(_future: asyncio.Future):
+            if not _future.cancelled():
+                _future.exception()
+
+        def _failed(_future: asyncio.Future) -> bool:
+            # protocol errors are a (negative) reply so they're not a failure here
+            return _future.cancelled() or (
+                (_future.exception() is not None)
+                and not isinstance(_future.exception(), MerossProtocolError)
+            )
+
+        def _release(_future: asyncio.Future):
+            if _future.cancelled():
+                self._mqtt_request_release(messageid)
+
+        def _send(protocol) -> asyncio.Future:
+            # both the legs go through the transports flow-control (window/queue)
+            if protocol is CONF_PROTOCOL_MQTT:
+                future = loop.create_future()
+                self.mqtt_request(
+                    namespace, mc.METHOD_SET, payload, None, messageid, future
+                )
+                future.add_done_callback(_release)
+            else:
+                future = loop.create_task(
+                    self.async_http_request_strict(
+                        namespace, mc.METHOD_SET, payload, messageid
+                    )
+                )
+            future.add_done_callback(_consume)
+            return future
+
+        protocol = self.curr_protocol
+        legs = [_send(protocol)]
+        done, _ = await asyncio.wait(legs, timeout=self._hedge_delay(protocol))
+        if (not done) or _failed(legs[0]):
+            self._hedge_fired += 1
+            legs.append(
+                _send(
+                    CONF_PROTOCOL_HTTP
+                    if protocol is CONF_PROTOCOL_MQTT
+                    else CONF_PROTOCOL_MQTT
+                )
+            )
+        try:
+            pending = legs
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    if _failed(future):
+                        continue  # this leg failed: wait for the other (if any)
+                    if (future is legs[-1]) and (len(legs) > 1):
+                        self._hedge_won += 1
+                    if response_callback is not None:
+                        if (error := future.exception()) is None:
+                            response_callback(True, *future.result())
+                        else:
+                            response_callback(False, {}, error.reason)  # type: ignore
+                    return
+            self.log(
+                DEBUG,
+                0,
+                "MerossDevice(%s) hedged request failed on every transport (%s)",
+                self.name,
+                namespace,
+            )
+        finally:
+            for future in legs:
+                future.cancel()
+            # keep guarding late replies for a while
+            loop.call_later(
+                PARAM_MQTT_TRANSACTION_TIMEOUT,
+                self._hedge_messageids.pop,
+                messageid,
+                None,
+            )
+
+    async def async_request_coalesced(
+        self,
+        namespace: str,
+        payload: dict,
+        key: object = None,
+    ) -> tuple[dict, dict] | None:
+        """
+        last-write-wins SET: while a command for the same (namespace, key) is in flight
+        newer ones wait their turn and replace each other so that only the latest
+        is sent when the device is done with the current. This is typically used
+        by sliders (number, light brightness) where only the final value matters.
+        Like async_request_ack it returns the reply (header, payload) or raises
+        (asyncio.TimeoutError, MerossProtocolError) while a command superseded
+        before being sent just returns None (see MerossEntity.async_request_optimistic)
+        """
+        command_key = (namespace, key)
+
+        def _handover():
+            # wake up the latest pending command (if any) else we're done with the key
+            if ((waiter := command[0]) is not None) and not waiter.done():
+                command[0] = None
+                waiter.set_result(True)
+            else:
+                self._commands_pending.pop(command_key, None)
+
+        if (command := self._commands_pending.get(command_key)) is None:
+            command = self._commands_pending[command_key] = [None]
+        else:
+            if ((waiter := command[0]) is not None) and not waiter.done():
+                self._commands_coalesced += 1
+                waiter.set_result(False)
+            waiter = command[0] = self.api.hass.loop.create_future()
+            try:
+                if not await waiter:
+                    return None
+            except asyncio.CancelledError:
+                if waiter.done() and (not waiter.cancelled()) and waiter.result():
+                    # we were already handed over: don't stall the next ones
+                    _handover()
+                raise
+        try:
+            return await self.async_request_ack(namespace, mc.METHOD_SET, payload)
+        finally:
+            _handover()
 
     def request_get(self, namespace: str):
         self.request(namespace, mc.METHOD_GET, build_default_payload_get(namespace))
 
     async def async_request_get(self, namespace: str):
-        await self.async_request(
-            namespace, mc.METHOD_GET, build_default_payload_get(namespace)
+        await self.async_request_poll(namespace, build_default_payload_get(namespace))
+
+    async def async_request_poll(self, namespace: str, payload: dict):
+        """
+        GET a status namespace: when we're collecting a polling cycle
+        (see _async_request_updates) the request is just queued
+        to be later packed in an NS_APPLIANCE_CONTROL_MULTIPLE
+        """
+        if self._multiple_requests is not None:
+            if (namespace, payload) in self._multiple_requests:
+                self._inflight_duplicates += 1
+            else:
+                self._multiple_requests.append((namespace, payload))
+            return
+        await self.async_request(namespace, mc.METHOD_GET, payload)
+
+    async def async_multiple_requests_flush(self):
+        """
+        send the GETs collected along the polling cycle packing them
+        in NS_APPLIANCE_CONTROL_MULTIPLE requests. The device replies
+        with an equally packed payload which is then unpacked in receive
+        """
+        multiple_requests = self._multiple_requests
+        self._multiple_requests = None
+        if not multiple_requests:
+            return
+
+        from_ = (
+            mc.TOPIC_RESPONSE.format(self.device_id)
+            if self.curr_protocol is CONF_PROTOCOL_MQTT
+            else mc.MANUFACTURER
         )
 
+        index = 0
+        count = len(multiple_requests)
+        while (index < count) and self._online:
+            multiple_len = self._multiple_len
+            if multiple_len < 2 or (count - index) == 1:
+                # either batching was disabled in the meantime or we have
+                # just one request left: no need to pack it
+                namespace, payload = multiple_requests[index]
+                index += 1
+                await self.async_request(namespace, mc.METHOD_GET, payload)
+                continue
+            payload_multiple = [
+                build_payload(namespace, mc.METHOD_GET, payload, self.key, from_)
+                for namespace, payload in multiple_requests[index : index + multiple_len]
+            ]
+            index += multiple_len
+
+            @callback
+            def _ack_callback(
+                acknowledge: bool,
+                header: dict,
+                payload: dict,
+                _payload_multiple=payload_multiple,
+            ):
+                if not acknowledge:
+                    # the device doesn't like our packed request: disable batching
+                    # for this device and re-issue the requests one by one
+                    self.log(
+                        WARNING,
+                        14400,
+                        "MerossDevice(%s) %s not working: reverting to single requests",
+                        self.name,
+                        mc.NS_APPLIANCE_CONTROL_MULTIPLE,
+                    )
+                    self._multiple_len = 0
+                    for message in _payload_multiple:
+                        self.request(
+                            message[mc.KEY_HEADER][mc.KEY_NAMESPACE],
+                            mc.METHOD_GET,
+                            message[mc.KEY_PAYLOAD],
+                        )
+
+            await self.async_request(
+                mc.NS_APPLIANCE_CONTROL_MULTIPLE,
+                mc.METHOD_SET,
+                {mc.KEY_MULTIPLE: payload_multiple},
+                _ack_callback,
+            )
+
+    def polling_policy_add(
+        self,
+        namespace: str,
+        payload: dict | None = None,
+        **kwargs,
+    ) -> PollingPolicy:
+        """
+        register (or replace) the polling policy for namespace: see PollingPolicy
+        for the accepted kwargs. A replaced policy keeps its lastupdate
+        """
+        policy = PollingPolicy(namespace, payload, **kwargs)
+        if (_policy := self.polling_dictionary.get(namespace)) is not None:
+            policy.lastupdate = _policy.lastupdate
+        self.polling_dictionary[namespace] = policy
+        self._polling_policies = None
+        return policy
+
     async def async_request_updates(self, epoch, namespace):
         """
         This is a 'versatile' polling strategy called on timer
-        or when the device comes online (passing in the received namespace)
-        When the device doesnt listen MQTT at all this will always fire the list of requests
-        else, when MQTT is alive this will fire the requests only once when just switching online
-        or when not listening any MQTT over the PARAM_HEARTBEAT_PERIOD
+        or when the device comes online (passing in the received namespace).
+        Every namespace in polling_dictionary is evaluated against its PollingPolicy:
+        when coming online everything is requested (but the namespace just received)
+        else the policy period (or the per-device override) must have elapsed and
+        'skip_mqtt' policies are only requested when the device doesnt listen MQTT
+        at all or when not listening any MQTT over the PARAM_HEARTBEAT_PERIOD
         """
-        if (epoch - self.lastmqtt) > PARAM_HEARTBEAT_PERIOD:
-            for _namespace, _payload in self.polling_dictionary.items():
-                if self._online:
-                    if _namespace != namespace:
-                        await self.async_request(_namespace, mc.METHOD_GET, _payload)
-                else:
-                    # it might happen we detect a timeout when using HTTP
-                    # and this is interpreted as a clear indication the
-                    # device is offline (see async_http_request) so we break
-                    # the polling cycle and wait for a reconnect preocedure
-                    # without wasting execution time here
-                    break
+        if (policies := self._polling_policies) is None:
+            policies = self._polling_policies = sorted(
+                self.polling_dictionary.values(), key=lambda policy: policy.priority
+            )
+        mqtt_alive = (epoch - self.lastmqtt) <= PARAM_HEARTBEAT_PERIOD
+        overrides = self.polling_overrides
+        negative_cache = self.negative_cache
+        for policy in policies:
+            if not self._online:
+                # it might happen we detect a timeout when using HTTP
+                # and this is interpreted as a clear indication the
+                # device is offline (see async_http_request) so we break
+                # the polling cycle and wait for a reconnect preocedure
+                # without wasting execution time here
+                break
+            if policy.namespace == namespace:
+                continue
+            if (policy.lastrequest > policy.lastupdate) and (
+                (epoch - policy.lastrequest) > PARAM_MQTT_TRANSACTION_TIMEOUT
+            ):
+                # the device didn't reply at all to the last GET
+                self._negative_cache_fail(policy.namespace, epoch)
+            if (backoff := negative_cache.get(policy.namespace)) and (
+                epoch < backoff[1]
+            ):
+                continue
+            if policy.entities and not any(
+                entity.enabled for entity in policy.entities
+            ):
+                continue
+            if (namespace is None) and policy.lastupdate:
+                # an explicit override always wins over the MQTT 'push' state
+                if (period := overrides.get(policy.namespace)) is None:
+                    if policy.skip_mqtt and mqtt_alive:
+                        continue
+                    period = policy.period
+                if (epoch - policy.lastupdate) < period:
+                    continue
+            if policy.async_request is not None:
+                await policy.async_request()
+            else:
+                policy.lastrequest = epoch
+                await self.async_request_poll(policy.namespace, policy.payload)
+
+    def _negative_cache_check(self):
+        """
+        something might have changed (the device coming online after a firmware
+        update or a hub pairing new subdevices): query the ability so that
+        _handle_Appliance_System_Ability eventually invalidates the negative cache
+        """
+        if self.negative_cache:
+            self.request_get(mc.NS_APPLIANCE_SYSTEM_ABILITY)
+
+    def _negative_cache_fail(self, namespace: str, epoch: float):
+        if (policy := self.polling_dictionary.get(namespace)) is not None:
+            policy.lastrequest = 0  # account a request only once
+        failures = self.negative_cache.get(namespace, (0, 0))[0] + 1
+        backoff = min(
+            PARAM_NEGATIVE_CACHE_BACKOFF_MIN * 2 ** (failures - 1),
+            PARAM_NEGATIVE_CACHE_BACKOFF_MAX,
+        )
+        self.negative_cache[namespace] = [failures, epoch + backoff]
+        self.log(
+            INFO,
+            14400,
+            "MerossDevice(%s) namespace %s is failing: suspending its polling for %d sec",
+            self.name,
+            namespace,
+            backoff,
+        )
+        self._save_config_entry({})
+
+    async def _async_request_updates(self, epoch, namespace):
+        """
+        entry point for the polling cycle: we're wrapping the (mixin overridable)
+        async_request_updates so that the GETs issued along the cycle are collected
+        and later sent packed in NS_APPLIANCE_CONTROL_MULTIPLE (when supported)
+        """
+        if self._updates_running:
+            # a cycle is already running (i.e. coming online while polling)
+            # and will anyway refresh the state
+            self._updates_duplicates += 1
+            return
+        self._updates_running = True
+        try:
+            if self._multiple_len < 2:
+                await self.async_request_updates(epoch, namespace)
+                return
+            self._multiple_requests = []
+            try:
+                await self.async_request_updates(epoch, namespace)
+            finally:
+                await self.async_multiple_requests_flush()
+        finally:
+            self._updates_running = False
+
+    def transition_start(self, entity: MerossEntity, namespaces: tuple[str, ...]):
+        """
+        enter the 'transition mode': while any entity is in transition the polling
+        cycle runs every transition_period and just requests (packed) the namespaces
+        of the moving entities. The regular cycle is still served on its period
+        """
+        if entity not in self._transitions:
+            self._transitions[entity] = namespaces
+            self.api.polling_advance(self, self.transition_period)
+
+    def transition_end(self, entity: MerossEntity) -> bool:
+        """returns True if the entity was in transition"""
+        return self._transitions.pop(entity, None) is not None
+
+    async def _async_request_transition(self):
+        if self._updates_running or self._transition_running:
+            # a cycle is already running and will anyway refresh the state
+            return
+        namespaces = {
+            namespace
+            for _namespaces in self._transitions.values()
+            for namespace in _namespaces
+        }
+        self._transition_requests += 1
+        # not _updates_running: a (full) update (i.e. coming online) must not be skipped
+        self._transition_running = True
+        if self._multiple_len > 1:
+            # position and state in a single message
+            self._multiple_requests = []
+        try:
+            for namespace in namespaces:
+                await self.async_request_poll(
+                    namespace, build_default_payload_get(namespace)
+                )
+        finally:
+            await self.async_multiple_requests_flush()
+            self._transition_running = False
 
-    @callback
     async def _async_polling_callback(self):
         LOGGER.log(DEBUG, "MerossDevice(%s) polling start", self.name)
+        epoch = time()
         try:
-            epoch = time()
+            if self._transitions and self._online:
+                await self._async_request_transition()
+                if (epoch + 1) < (self._polling_epoch + self._polling_delay):
+                    # not yet time for the regular cycle
+                    return
+            if self._polling_epoch:
+                self._polling_epoch = epoch
+            else:
+                # first cycle: the next ones will run at a deterministic offset
+                # in the period so that devices don't poll in lockstep
+                phase = self.api.polling_jitter(self.device_id, self.polling_period)
+                self._polling_epoch = epoch - self.polling_period + (phase or self.polling_period)
             # this is a kind of 'heartbeat' to check if the device is still there
             # especially on MQTT where we might see no messages for a long time
             # This is also triggered at device setup to immediately request a fresh state
-            if ((epoch - self.lastrequest) > PARAM_HEARTBEAT_PERIOD) and (
-                (epoch - self.lastupdate) > PARAM_HEARTBEAT_PERIOD
+            # Offline devices are instead managed by the backoff in the offline branch
+            if (
+                (self._online or not self.lastrequest)
+                and ((epoch - self.lastrequest) > PARAM_HEARTBEAT_PERIOD)
+                and ((epoch - self.lastupdate) > PARAM_HEARTBEAT_PERIOD)
             ):
-                await self.async_request_get(mc.NS_APPLIANCE_SYSTEM_ALL)
+                if self._online:
+                    await self._async_request_heartbeat(epoch)
+                else:  # startup
+                    await self.async_request_get(mc.NS_APPLIANCE_SYSTEM_ALL)
 
             elif self._online:
                 # evaluate device availability by checking lastrequest got answered in less than polling_period
@@ -710,51 +1831,222 @@ class MerossDevice:
                 elif (self.curr_protocol is CONF_PROTOCOL_MQTT) and (
                     self.conf_protocol is CONF_PROTOCOL_AUTO
                 ):
-                    self.switch_protocol(CONF_PROTOCOL_HTTP)
+                    self.switch_protocol(CONF_PROTOCOL_HTTP, "mqtt timeout")
                 else:
                     self._set_offline()
                     return
 
-                await self.async_request_updates(epoch, None)
-                # also eventually cleanup the mqtt stale callbacks
-                if self._mqtt_transactions:
-                    _mqtt_transaction_stale_list = None
-                    for _mqtt_transaction in self._mqtt_transactions.values():
-                        if (epoch - _mqtt_transaction.request_time) > 15:
-                            if _mqtt_transaction_stale_list is None:
-                                _mqtt_transaction_stale_list = []
-                            _mqtt_transaction_stale_list.append(
-                                _mqtt_transaction.messageid
-                            )
-                    if _mqtt_transaction_stale_list is not None:
-                        for messageid in _mqtt_transaction_stale_list:
-                            self._mqtt_transactions.pop(messageid)
+                await self._async_request_updates(epoch, None)
+                if self.conf_protocol is CONF_PROTOCOL_AUTO:
+                    await self._async_protocol_probe(epoch)
 
             else:  # offline
                 if (self.curr_protocol is CONF_PROTOCOL_MQTT) and (
                     self.conf_protocol is CONF_PROTOCOL_AUTO
                 ):
-                    self.switch_protocol(CONF_PROTOCOL_HTTP)
+                    self.switch_protocol(CONF_PROTOCOL_HTTP, "offline")
                 if (epoch - self.lastrequest) >= self._polling_delay:
-                    self._polling_delay = self._polling_delay + self.polling_period
-                    await self.async_request_get(mc.NS_APPLIANCE_SYSTEM_ALL)
+                    # circuit breaker: exponential backoff and, when offline for long,
+                    # the quarantine lane (see MerossApi._async_polling_run)
+                    if (epoch - self._offline_epoch) > PARAM_QUARANTINE_TIMEOUT:
+                        if not self.quarantined:
+                            self.log(
+                                INFO,
+                                0,
+                                "MerossDevice(%s) offline for more than %d sec: quarantined",
+                                self.name,
+                                PARAM_QUARANTINE_TIMEOUT,
+                            )
+                            self.quarantined = True
+                        self._polling_delay = PARAM_QUARANTINE_PERIOD
+                    else:
+                        self._polling_delay = min(
+                            self._polling_delay * 2, PARAM_OFFLINE_BACKOFF_MAX
+                        )
+                    await self._async_request_offline()
         finally:
-            self._unsub_polling_callback = self.api.schedule_async_callback(
-                self._polling_delay, self._async_polling_callback
-            )
+            # don't reschedule if we've been unloaded in the meantime
+            if self.api.devices.get(self.device_id) is self:
+                # keep the 'phase' by discounting the time spent in this cycle
+                delay = self._polling_epoch + self._polling_delay - time()
+                if self._transitions and self._online:
+                    delay = min(delay, self.transition_period)
+                self.api.polling_schedule(self, delay)
             LOGGER.log(DEBUG, "MerossDevice(%s) polling end", self.name)
 
-    def switch_protocol(self, protocol):
+    async def _async_request_offline(self):
+        """
+        check if an offline device is back: over HTTP this is a single shot with
+        a short timeout instead of the (retrying) async_http_request
+        """
+        namespace = self._liveness_namespace()
+        if (self.curr_protocol is CONF_PROTOCOL_HTTP) and self._host:
+            if self.liveness is CONF_LIVENESS_TCP:
+                if await self._async_probe_tcp():
+                    # state is surely stale after being offline
+                    await self.async_request_get(mc.NS_APPLIANCE_SYSTEM_ALL)
+                return
+            self.lastrequest = time()
+            try:
+                # coming back online, receive will also trigger a full update
+                await self.async_http_request_strict(
+                    namespace,
+                    mc.METHOD_GET,
+                    build_default_payload_get(namespace),
+                    None,
+                    PARAM_OFFLINE_PROBE_TIMEOUT,
+                )
+            except Exception:
+                pass
+        else:
+            await self.async_request_get(namespace)
+
+    def _liveness_namespace(self) -> str:
+        if self.liveness is not CONF_LIVENESS_ALL:
+            ability = self.descriptor.ability
+            for namespace in (mc.NS_APPLIANCE_SYSTEM_ONLINE, mc.NS_APPLIANCE_SYSTEM_RUNTIME):
+                if namespace in ability:
+                    return namespace
+        return mc.NS_APPLIANCE_SYSTEM_ALL
+
+    async def _async_probe_tcp(self) -> bool:
+        """check the device HTTP server accepts connections"""
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(self._host, 80), PARAM_OFFLINE_PROBE_TIMEOUT
+            )
+        except Exception:
+            return False
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), PARAM_OFFLINE_PROBE_TIMEOUT)
+        except Exception:
+            pass  # the connection was accepted anyway
+        return True
+
+    async def _async_request_heartbeat(self, epoch):
+        """
+        the device is (supposedly) online but we didn't hear from it for long:
+        depending on the liveness strategy we'll either ask the full state (NS_ALL)
+        or just check it's there and only refresh NS_ALL when our state is old
+        """
+        if self.liveness is CONF_LIVENESS_ALL:
+            await self.async_request_get(mc.NS_APPLIANCE_SYSTEM_ALL)
+            return
+        if (epoch - self.lastupdate_all) > PARAM_LIVENESS_STALE:
+            await self.async_request_get(mc.NS_APPLIANCE_SYSTEM_ALL)
+            return
+        if (
+            (self.liveness is CONF_LIVENESS_TCP)
+            and (self.curr_protocol is CONF_PROTOCOL_HTTP)
+            and self._host
+        ):
+            self.lastrequest = epoch
+            if await self._async_probe_tcp():
+                self.lastupdate = time()
+            # else the next polling cycle will find the heartbeat unanswered
+            return
+        await self.async_request_get(self._liveness_namespace())
+
+    def _offline_reset(self):
+        """
+        reset the circuit breaker and poll right away: called when the device
+        is back online or we have some good hints it could be (DHCP)
+        """
+        self._polling_delay = self.polling_period
+        self._offline_epoch = time()
+        self.quarantined = False
+        if self.api.devices.get(self.device_id) is self:
+            self.api.polling_schedule(self, 0 if not self._online else self.polling_period)
+
+    async def _async_protocol_probe(self, epoch):
+        """
+        (protocol auto) every PARAM_PROTOCOL_PROBE_PERIOD query the device over the transport
+        we're not currently using so that both the estimators (mqtt_rtt and http rtt)
+        are kept fresh and then let _protocol_select decide. The probe uses the
+        (light) liveness namespace since we're only interested in the latency
+        """
+        if not (self._host and self.hasmqtt and self.api.mqtt_connected):
+            return
+        if (epoch - self._protocol_probe_epoch) >= PARAM_PROTOCOL_PROBE_PERIOD:
+            self._protocol_probe_epoch = epoch
+            namespace = self._liveness_namespace()
+            try:
+                if self.curr_protocol is CONF_PROTOCOL_MQTT:
+                    # the reply is processed in _async_http_request_strict
+                    await self.async_http_request_strict(
+                        namespace,
+                        mc.METHOD_GET,
+                        build_default_payload_get(namespace),
+                    )
+                else:
+                    # the reply is processed in mqtt_receive
+                    await self.async_mqtt_request(
+                        namespace,
+                        mc.METHOD_GET,
+                        build_default_payload_get(namespace),
+                    )
+            except Exception as error:
+                self.log(
+                    DEBUG,
+                    0,
+                    "MerossDevice(%s) %s while probing %s",
+                    self.name,
+                    type(error).__name__,
+                    CONF_PROTOCOL_HTTP
+                    if self.curr_protocol is CONF_PROTOCOL_MQTT
+                    else CONF_PROTOCOL_MQTT,
+                )
+        self._protocol_select(epoch)
+
+    def _protocol_select(self, epoch):
+        """
+        (protocol auto) move to the other transport when it is healthy and either the
+        current one isn't or the other is consistently faster. The hysteresis factor
+        and the dwell time between switches prevent oscillations when the two are close
+        """
+        _httpclient: MerossHttpClient = getattr(self, VOLATILE_ATTR_HTTPCLIENT, None)  # type: ignore
+        if _httpclient is None:
+            return
+        if self.curr_protocol is CONF_PROTOCOL_MQTT:
+            curr_rtt, other_rtt, other = self.mqtt_rtt, _httpclient.rtt, CONF_PROTOCOL_HTTP
+        else:
+            curr_rtt, other_rtt, other = _httpclient.rtt, self.mqtt_rtt, CONF_PROTOCOL_MQTT
+        if (other_rtt.srtt is None) or (other_rtt.loss > PARAM_PROTOCOL_LOSS_MAX):
+            return
+        if (epoch - self._protocol_switch_epoch) < PARAM_PROTOCOL_SWITCH_DWELL:
+            return
+        if (curr_rtt.srtt is None) or (curr_rtt.loss > PARAM_PROTOCOL_LOSS_MAX):
+            reason = f"{self.curr_protocol} loss {curr_rtt.loss:.2f}"
+        elif other_rtt.srtt < (curr_rtt.srtt * PARAM_PROTOCOL_HYSTERESIS):
+            reason = f"{other} srtt {other_rtt.srtt * 1000:.0f}ms vs {curr_rtt.srtt * 1000:.0f}ms"
+        else:
+            return
+        self._protocol_switch_epoch = epoch
+        # make it sticky: pref_protocol is where failures eventually fallback
+        self.pref_protocol = other
+        self.switch_protocol(other, reason, True)
+
+    def switch_protocol(self, protocol, reason: str = "", deliberate: bool = False):
+        """
+        deliberate switches (see _protocol_select) happen while both the transports
+        are healthy so we keep 'lastmqtt' (which enables hedging and the HTTP->MQTT
+        fallback) while failure driven switches reset it
+        """
         self.log(
             INFO,
             0,
-            "MerossDevice(%s) switching protocol to %s",
+            "MerossDevice(%s) switching protocol to %s (%s)",
             self.name,
             protocol,
+            reason,
         )
-        self.lastmqtt = (
-            0  # reset so we'll need a new mqtt message to ensure mqtt availability
+        self._protocol_switches.append(
+            (int(time()), self.curr_protocol, protocol, reason)
         )
+        if not deliberate:
+            # reset so we'll need a new mqtt message to ensure mqtt availability
+            self.lastmqtt = 0
         self.curr_protocol = protocol
 
     def log(self, level: int, timeout: int, msg: str, *args):
@@ -773,6 +2065,7 @@ class MerossDevice:
         see derived implementations
         """
         if self.hasmqtt and (mc.NS_APPLIANCE_SYSTEM_TIME in self.descriptor.ability):
+            import voluptuous as vol
             global TIMEZONES_SET
             if TIMEZONES_SET is None:
                 try:
@@ -820,7 +2113,19 @@ class MerossDevice:
         callback after user changed configuration through OptionsFlowHandler
         deviceid and/or host are not changed so we're still referring to the same device
         """
-        self._set_config_entry(config_entry.data)
+        data = config_entry.data
+        if {
+            key: value for key, value in data.items() if key != CONF_NEGATIVE_CACHE
+        } == {
+            key: value
+            for key, value in self._entry_data.items()
+            if key != CONF_NEGATIVE_CACHE
+        }:
+            # just the negative_cache being persisted (see _save_config_entry)
+            # so we skip the side effects of a configuration change
+            self._entry_data = data
+            return
+        self._set_config_entry(data)
         _httpclient: MerossHttpClient = getattr(self, VOLATILE_ATTR_HTTPCLIENT, None)  # type: ignore
         if _httpclient is not None:
             if self._host:
@@ -835,9 +2140,10 @@ class MerossDevice:
         if endtime > time():
             self._trace_open(endtime)
         # config_entry update might come from DHCP or OptionsFlowHandler address update
-        # so we'll eventually retry querying the device
+        # so we'll eventually retry querying the device (bypassing the backoff)
         if not self._online:
-            self.request_get(mc.NS_APPLIANCE_SYSTEM_ALL)
+            self.lastrequest = 0
+            self._offline_reset()
 
     def _parse_all(self, payload: dict):
         """
@@ -881,17 +2187,41 @@ class MerossDevice:
                 # check the appliance timeoffsets are updated (see #36)
                 self._config_timezone(epoch, descr.time.get(mc.KEY_TIMEZONE))  # type: ignore
 
+        parsers = self._parsers
+        digest_cache = self._digest_cache
         for key, value in descr.digest.items():
-            _parse = getattr(self, f"_parse_{key}", None)
+            _parse = parsers.get(key)
             if _parse is not None:
-                _parse(value)
+                if digest_cache.get(key) == value:
+                    self._digest_skipped += 1
+                    continue
+                self._digest_parsed += 1
+                # a copy: parsers (or later payloads) might mutate the subtree
+                digest_cache[key] = deepcopy(value)
+                _parse(self, value)
         # older firmwares (MSS110 with 1.1.28) look like
         # carrying 'control' instead of 'digest'
         if isinstance(p_control := descr.all.get(mc.KEY_CONTROL), dict):
             for key, value in p_control.items():
-                _parse = getattr(self, f"_parse_{key}", None)
+                _parse = parsers.get(key)
                 if _parse is not None:
-                    _parse(value)
+                    _parse(self, value)
+
+    def _digest_invalidate(self, namespace: str):
+        """
+        drop the cached digest subtrees 'related' to namespace i.e.
+        Appliance.Control.ToggleX -> togglex or Appliance.GarageDoor.State -> garageDoor
+        """
+        if (keys := self._digest_namespaces.get(namespace)) is None:
+            parts = namespace.lower().split(".")[1:3]
+            keys = self._digest_namespaces[namespace] = tuple(
+                key for key in self.descriptor.digest if key.lower() in parts
+            )
+        for key in keys:
+            self._digest_cache.pop(key, None)
+
+    def _digest_reset(self):
+        self._digest_cache.clear()
 
     def _config_timestamp(self, epoch, device_timedelta):
         if abs(self.device_timedelta - device_timedelta) > PARAM_TIMESTAMP_TOLERANCE:
@@ -997,9 +2327,16 @@ class MerossDevice:
 
     def _set_offline(self):
         self.log(DEBUG, 0, "MerossDevice(%s) going offline!", self.name)
+        for policy in self.polling_dictionary.values():
+            policy.lastrequest = 0  # not replying is not the namespace fault
+        # entities are going unavailable: the next digest must be parsed anyway
+        self._digest_reset()
         self._online = False
+        self._offline_epoch = time()
         self._polling_delay = self.polling_period
         self.lastmqtt = 0
+        # GETs still waiting (MQTT) must not hold back the ones probing the device
+        self._inflight_gets.clear()
         for entity in self.entities.values():
             entity.set_unavailable()
 
@@ -1009,8 +2346,16 @@ class MerossDevice:
             entry = entries.async_get_entry(self.entry_id)
             if entry is not None:
                 data = dict(entry.data)  # deepcopy? not needed: see CONF_TIMESTAMP
-                data[CONF_PAYLOAD].update(payload)
-                data[CONF_TIMESTAMP] = time()  # force ConfigEntry update..
+                data[CONF_NEGATIVE_CACHE] = {
+                    "fingerprint": self._ability_fingerprint,
+                    "namespaces": {
+                        namespace: list(backoff)
+                        for namespace, backoff in self.negative_cache.items()
+                    },
+                }
+                if payload:
+                    data[CONF_PAYLOAD].update(payload)
+                    data[CONF_TIMESTAMP] = time()  # force ConfigEntry update..
                 entries.async_update_entry(entry, data=data)
         except Exception as e:
             self.log(
@@ -1025,6 +2370,7 @@ class MerossDevice:
         """
         common properties read from ConfigEntry on __init__ or when a configentry updates
         """
+        self._entry_data = data
         self._host = data.get(CONF_HOST)  # type: ignore
         self.key = data.get(CONF_KEY) or ""  # type: ignore # prevent key-hack at any rate
         self.conf_protocol = CONF_PROTOCOL_OPTIONS.get(data.get(CONF_PROTOCOL), CONF_PROTOCOL_AUTO)  # type: ignore
@@ -1046,6 +2392,92 @@ class MerossDevice:
         if self.polling_period < CONF_POLLING_PERIOD_MIN:  # type: ignore
             self.polling_period = CONF_POLLING_PERIOD_MIN
         self._polling_delay = self.polling_period  # type: ignore
+        self.mqtt_window = data.get(CONF_MQTT_WINDOW, CONF_MQTT_WINDOW_DEFAULT)  # type: ignore
+        self.hedge = data.get(CONF_HEDGE, False)  # type: ignore
+        self.liveness = CONF_LIVENESS_OPTIONS.get(data.get(CONF_LIVENESS), CONF_LIVENESS_ALL)  # type: ignore
+        self.polling_overrides = dict(data.get(CONF_POLLING_POLICY) or {})  # type: ignore
+        self.transition_period = max(data.get(CONF_TRANSITION_PERIOD, CONF_TRANSITION_PERIOD_DEFAULT), 1)  # type: ignore
+        if self._mqtt_queue:
+            self._mqtt_queue_flush()  # in case the window was enlarged
+
+    def get_diagnostics(self) -> dict:
+        """
+        invoked by the diagnostics callback to collect some runtime
+        info about the device (connection) state
+        """
+        _httpclient: MerossHttpClient = getattr(self, VOLATILE_ATTR_HTTPCLIENT, None)  # type: ignore
+        latencies = sorted(self._mqtt_latencies)
+        return {
+            "online": self._online,
+            "curr_protocol": self.curr_protocol,
+            "polling_delay": self._polling_delay,
+            "quarantined": self.quarantined,
+            "pref_protocol": self.pref_protocol,
+            "protocol_switches": [
+                {"epoch": epoch, "from": from_, "to": to, "reason": reason}
+                for epoch, from_, to, reason in self._protocol_switches
+            ],
+            "http_keepalive": _httpclient.keepalive if _httpclient is not None else None,
+            "http_rtt": _httpclient.rtt.as_dict() if _httpclient is not None else None,
+            "mqtt_rtt": self.mqtt_rtt.as_dict(),
+            "mqtt_window": {
+                "size": self.mqtt_window,
+                "inflight": len(self._mqtt_transactions),
+                "queued": len(self._mqtt_queue),
+                "maxqueued": self._mqtt_queue_maxdepth,
+                "dropped": self._mqtt_queue_dropped,
+            },
+            "mqtt_ack_latency": {
+                "p50": _percentile(latencies, 0.5),
+                "p90": _percentile(latencies, 0.9),
+                "p99": _percentile(latencies, 0.99),
+            },
+            "hedge": {
+                "enabled": self.hedge,
+                "requests": self._hedge_requests,
+                "fired": self._hedge_fired,
+                "won": self._hedge_won,
+                "duplicates": self._hedge_duplicates,
+            },
+            "digest": {
+                "parsed": self._digest_parsed,
+                "skipped": self._digest_skipped,
+                "skip_ratio": (
+                    self._digest_skipped / (self._digest_parsed + self._digest_skipped)
+                )
+                if (self._digest_parsed or self._digest_skipped)
+                else None,
+            },
+            "transitions": {
+                "active": [entity.name for entity in self._transitions],
+                "period": self.transition_period,
+                "requests": self._transition_requests,
+            },
+            "duplicates": {
+                "get": self._inflight_duplicates,
+                "updates": self._updates_duplicates,
+                "commands": self._commands_coalesced,
+            },
+            "http_queue": {
+                "depth": len(self._http_queue),
+                "maxdepth": self._http_queue_maxdepth,
+                "served": self._http_queue_served,
+                "dropped": self._http_queue_dropped,
+                "wait": dict(zip(HTTP_PRIORITY_NAMES, self._http_queue_wait)),
+            },
+            "http_pool": self.api.get_http_pool_stats(),
+            "polling": self.api.get_polling_stats(),
+            "negative_cache": {
+                namespace: {"failures": failures, "suppressed_until": until}
+                for namespace, (failures, until) in self.negative_cache.items()
+            },
+            "polling_policy": {
+                namespace: dict(
+                    policy.as_dict(), override=self.polling_overrides.get(namespace)
+                )
+                for namespace, policy in self.polling_dictionary.items()
+            },
+        }
 
     def get_diagnostics_trace(self, trace_timeout) -> asyncio.Future:
         """
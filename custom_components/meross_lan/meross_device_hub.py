@@ -1,6 +1,9 @@
 from __future__ import annotations
 import typing
+import asyncio
+from copy import deepcopy
 from logging import WARNING
+from time import time
 
 from homeassistant.const import (
     DEVICE_CLASS_BATTERY,
@@ -13,6 +16,7 @@ from homeassistant.helpers import device_registry
 from .merossclient import (
     const as mc, # mEROSS cONST
     MerossDeviceDescriptor,
+    MerossProtocolError,
     get_productnameuuid
 )
 from .meross_device import MerossDevice
@@ -22,11 +26,13 @@ from .binary_sensor import PLATFORM_BINARY_SENSOR, MLBinarySensor, DEVICE_CLASS_
 from .number import PLATFORM_NUMBER, MLHubAdjustNumber
 from .switch import PLATFORM_SWITCH, MLSwitch, DEVICE_CLASS_SWITCH
 from .calendar import PLATFORM_CALENDAR
-from .helpers import LOGGER
+from .helpers import LOGGER, build_dispatch_table
 from .const import (
     DOMAIN,
-    PARAM_HEARTBEAT_PERIOD,
     PARAM_HUBBATTERY_UPDATE_PERIOD,
+    PARAM_HUB_CHUNK_MAX,
+    PARAM_HUB_CHUNK_INFLIGHT,
+    POLLING_PRIORITY_LOW,
 )
 
 
@@ -39,6 +45,13 @@ WELL_KNOWN_TYPE_MAP: dict[str, typing.Callable] = dict({
 SENSOR_ALL_TYPESET = (mc.TYPE_MS100, mc.TYPE_SMOKEALARM)
 # subdevices types listed in NS_APPLIANCE_HUB_MTS100_ALL
 MTS100_ALL_TYPESET = (mc.TYPE_MTS100, mc.TYPE_MTS100V3, mc.TYPE_MTS150)
+# initial number of subdevices per request: this is then tuned at runtime
+# (see MerossDeviceHub._async_request_subdevices)
+CHUNK_SIZE_DEFAULT = {
+    mc.NS_APPLIANCE_HUB_SENSOR_ALL: 8,
+    mc.NS_APPLIANCE_HUB_MTS100_ALL: 8,
+    mc.NS_APPLIANCE_HUB_MTS100_SCHEDULEB: 4,
+}
 
 #REMOVE
 TRICK = False
@@ -47,13 +60,28 @@ class MerossDeviceHub(MerossDevice):
     """
     Specialized MerossDevice for smart hub(s) like MSH300
     """
-    _lastupdate_battery = 0
-    _lastupdate_sensor = None
-    _lastupdate_mts100 = None
 
     def __init__(self, api, descriptor: MerossDeviceDescriptor, entry):
         super().__init__(api, descriptor, entry)
         self.subdevices: dict[object, MerossSubDevice] = {}
+        self._chunk_sizes = dict(CHUNK_SIZE_DEFAULT)
+        # we just ask for the subdevices state when something pops online
+        # relying on push (over MQTT) or base polling updates (only HTTP) for any other changes
+        # (see _polling_trigger)
+        self._subdevices_requests = {
+            mc.NS_APPLIANCE_HUB_SENSOR_ALL: self._async_request_sensor_all,
+            mc.NS_APPLIANCE_HUB_MTS100_ALL: self._async_request_mts100_all,
+        }
+        self.polling_policy_add(
+            mc.NS_APPLIANCE_HUB_BATTERY,
+            period=PARAM_HUBBATTERY_UPDATE_PERIOD,
+            skip_mqtt=False,
+            priority=POLLING_PRIORITY_LOW,
+        )
+        if mc.NS_APPLIANCE_HUB_TOGGLEX in descriptor.ability:
+            self.polling_policy_add(
+                mc.NS_APPLIANCE_HUB_TOGGLEX, async_request=self._async_request_togglex
+            )
         # invoke platform(s) async_setup_entry
         # in order to be able to eventually add entities when they 'pop up'
         # in the hub (see also self.async_add_sensors)
@@ -80,8 +108,7 @@ class MerossDeviceHub(MerossDevice):
             LOGGER.warning("MerossDeviceHub(%s) init exception:(%s)", self.device_id, str(e))
 
     def _handle_Appliance_Hub_Sensor_All(self, header: dict, payload: dict):
-        if self._subdevice_parse(payload, mc.KEY_ALL):
-            self._lastupdate_sensor = self.lastupdate
+        self._subdevice_parse(payload, mc.KEY_ALL)
 
     def _handle_Appliance_Hub_Sensor_TempHum(self, header: dict, payload: dict):
         self._subdevice_parse(payload, mc.KEY_TEMPHUM)
@@ -93,8 +120,7 @@ class MerossDeviceHub(MerossDevice):
         self._subdevice_parse(payload, mc.KEY_ADJUST)
 
     def _handle_Appliance_Hub_Mts100_All(self, header: dict, payload: dict):
-        if self._subdevice_parse(payload, mc.KEY_ALL):
-            self._lastupdate_mts100 = self.lastupdate
+        self._subdevice_parse(payload, mc.KEY_ALL)
 
     def _handle_Appliance_Hub_Mts100_Mode(self, header: dict, payload: dict):
         self._subdevice_parse(payload, mc.KEY_MODE)
@@ -112,7 +138,6 @@ class MerossDeviceHub(MerossDevice):
         self._subdevice_parse(payload, mc.KEY_TOGGLEX)
 
     def _handle_Appliance_Hub_Battery(self, header: dict, payload: dict):
-        self._lastupdate_battery = self.lastupdate
         self._subdevice_parse(payload, mc.KEY_BATTERY)
 
     def _handle_Appliance_Hub_Online(self, header: dict, payload: dict):
@@ -162,9 +187,9 @@ class MerossDeviceHub(MerossDevice):
                     if p_subdevice.get(mc.KEY_ONLINE, {}).get(mc.KEY_STATUS) == mc.STATUS_ONLINE:
                         self.request_get(mc.NS_APPLIANCE_SYSTEM_ALL)
                 else:
-                    method = getattr(subdevice, f"_parse_{key}", None)
+                    method = subdevice._parsers.get(key)
                     if method is not None:
-                        method(p_subdevice)
+                        method(subdevice, p_subdevice)
                         count += 1
         return count
 
@@ -175,6 +200,7 @@ class MerossDeviceHub(MerossDevice):
         # telling the caller to persist the changed configuration (self.needsave)
         if isinstance(p_subdevices := p_hub.get(mc.KEY_SUBDEVICE), list):
             subdevices_actual = set(self.subdevices.keys())
+            subdevices_added = False
             for p_digest in p_subdevices:
                 p_id = p_digest.get(mc.KEY_ID)
                 subdevice = self.subdevices.get(p_id)
@@ -183,10 +209,19 @@ class MerossDeviceHub(MerossDevice):
                     if subdevice is None:
                         continue
                     self.needsave = True
+                    subdevices_added = True
                 else:
                     subdevices_actual.remove(p_id)
+                    if p_digest == subdevice._digest:
+                        self._digest_skipped += 1
+                        continue
+                self._digest_parsed += 1
+                subdevice._digest = deepcopy(p_digest)
                 subdevice.update_digest(p_digest)
 
+            if subdevices_added and self._online:
+                self._negative_cache_check()
+
             if subdevices_actual:
                 # now we're left with non-existent (removed) subdevices
                 self.needsave = True
@@ -202,97 +237,167 @@ class MerossDeviceHub(MerossDevice):
                     await hass.config_entries.async_reload(self.entry_id)
                 async_call_later(hass, 15, setup_again)
 
-    def _build_subdevices_payload(self, types: tuple, count: int):
+    def _digest_invalidate(self, namespace: str):
+        super()._digest_invalidate(namespace)
+        if namespace.startswith("Appliance.Hub."):
+            for subdevice in self.subdevices.values():
+                subdevice._digest = None
+
+    def _digest_reset(self):
+        super()._digest_reset()
+        for subdevice in self.subdevices.values():
+            subdevice._digest = None
+
+    def _chunk_shrink(self, namespace: str, count: int):
+        chunk_size = max(count // 2, 1)
+        if chunk_size < self._chunk_sizes[namespace]:
+            self._chunk_sizes[namespace] = chunk_size
+            self.log(
+                WARNING,
+                0,
+                "MerossDeviceHub(%s) reducing %s request size to %d subdevices",
+                self.name,
+                namespace,
+                chunk_size,
+            )
+
+    def _chunk_grow(self, namespace: str, count: int):
+        # only grow when a 'full' chunk succeeded
+        if (count >= (chunk_size := self._chunk_sizes[namespace])) and (
+            chunk_size < PARAM_HUB_CHUNK_MAX
+        ):
+            self._chunk_sizes[namespace] = chunk_size + 1
+
+    async def _async_request_subdevices(self, namespace: str, key: str, types: tuple):
         """
-        This generator helps dealing with hubs hosting an high number
-        of subdevices: when queried, the response payload might became huge
-        with overflow issues likely on the device side (see #244).
-        If this is the case, we'll split the request for fewer
-        devices at a time. The count param allows some flexibility depending
-        on expected payload size but we might have no clue especially for
-        bigger payloads like NS_APPLIANCE_HUB_MTS100_SCHEDULEB
+        This helps dealing with hubs hosting an high number of subdevices:
+        when queried, the response payload might became huge with overflow
+        issues likely on the device side (see #244).
+        We'll split the request for fewer devices at a time and the size of
+        each chunk is learned (per namespace): it is halved when the hub
+        replies with a truncated list or doesn't reply at all and
+        slowly grows back on success. Chunks are requested concurrently
+        with at most PARAM_HUB_CHUNK_INFLIGHT requests in flight.
+        An ERROR reply is not size related: the hub doesn't support the
+        namespace so we're suspending it through the negative cache
         """
-        if len(subdevices := self.subdevices) > count:
-            payload = []
-            for subdevice in subdevices.values():
-                if subdevice.type in types:
-                    payload.append({ mc.KEY_ID: subdevice.id })
-                    if len(payload) == count:
-                        yield payload
-                        payload = []
-            if payload:
-                yield payload
-        else:
-            yield []
-
-    async def async_request_updates(self, epoch, namespace):
-        await super().async_request_updates(epoch, namespace)
-        # we just ask for updates when something pops online (_lastupdate_xxxx == 0)
-        # relying on push (over MQTT) or base polling updates (only HTTP) for any other changes
-        # if _lastupdate_xxxx is None then it means that device class is not present in the hub
-        # and we totally skip the request. This is especially true since I've discovered hubs
-        # don't expose the full set of namespaces until a real subdevice type is binded.
-        # If this is the case we would ask a namespace which is not supported at the moment
-        # (see #167).
-        # Also, we check here and there if the hub went offline while polling and we skip
-        # the rest of the sequence (see super().async_request_updates for the same logic)
-        if not self._online:
+        if (backoff := self.negative_cache.get(namespace)) and (time() < backoff[1]):
             return
-        if self._lastupdate_sensor is not None:
-            if (self._lastupdate_sensor == 0) or ((epoch - self.lastmqtt) > PARAM_HEARTBEAT_PERIOD):
-                await self.async_request_get(mc.NS_APPLIANCE_HUB_SENSOR_ADJUST)
-                for p in self._build_subdevices_payload(SENSOR_ALL_TYPESET, 8):
-                    await self.async_request(
-                        mc.NS_APPLIANCE_HUB_SENSOR_ALL,
-                        mc.METHOD_GET,
-                        { mc.KEY_ALL: p }
-                    )
-
-        if not self._online:
+        ids = [
+            subdevice.id
+            for subdevice in self.subdevices.values()
+            if subdevice.type in types
+        ]
+        if not ids:
             return
-        if self._lastupdate_mts100 is not None:
-            if (self._lastupdate_mts100 == 0) or ((epoch - self.lastmqtt) > PARAM_HEARTBEAT_PERIOD):
-                await self.async_request_get(mc.NS_APPLIANCE_HUB_MTS100_ADJUST)
-                for p in self._build_subdevices_payload(MTS100_ALL_TYPESET, 8):
-                    await self.async_request(
-                        mc.NS_APPLIANCE_HUB_MTS100_ALL,
-                        mc.METHOD_GET,
-                        { mc.KEY_ALL: p }
+        chunk_size = self._chunk_sizes[namespace]
+        if len(ids) <= chunk_size:
+            # an empty list will query them all
+            chunks = [([], len(ids))]
+        else:
+            chunks = []
+            for i in range(0, len(ids), chunk_size):
+                p = [{mc.KEY_ID: _id} for _id in ids[i : i + chunk_size]]
+                chunks.append((p, len(p)))
+        semaphore = asyncio.Semaphore(PARAM_HUB_CHUNK_INFLIGHT)
+        unsupported = False
+
+        async def _async_request_chunk(p: list, count: int):
+            nonlocal unsupported
+            async with semaphore:
+                if unsupported or not self._online:
+                    return
+                try:
+                    _, r_payload = await self.async_request_ack(
+                        namespace, mc.METHOD_GET, {key: p}
                     )
-                for p in self._build_subdevices_payload(MTS100_ALL_TYPESET, 4):
-                    if mc.NS_APPLIANCE_HUB_MTS100_SCHEDULEB in self.descriptor.ability:
-                        await self.async_request(
-                            mc.NS_APPLIANCE_HUB_MTS100_SCHEDULEB,
-                            mc.METHOD_GET,
-                            { mc.KEY_SCHEDULE: p }
-                        )
-
-        if not self._online:
-            return
-        if ((epoch - self._lastupdate_battery) >= PARAM_HUBBATTERY_UPDATE_PERIOD):
-            await self.async_request_get(mc.NS_APPLIANCE_HUB_BATTERY)
+                except asyncio.TimeoutError:
+                    # no reply: the hub likely choked on the response size
+                    self._chunk_shrink(namespace, count)
+                    return
+                except MerossProtocolError:
+                    if not unsupported:
+                        unsupported = True
+                        self._negative_cache_fail(namespace, time())
+                    return
+                except Exception as error:
+                    self.log(
+                        WARNING,
+                        14400,
+                        "MerossDeviceHub(%s) %s requesting %s: %s",
+                        self.name,
+                        type(error).__name__,
+                        namespace,
+                        str(error),
+                    )
+                    return
+                if len(r_payload.get(key) or ()) >= count:
+                    self._chunk_grow(namespace, count)
+                else:
+                    self._chunk_shrink(namespace, count)
+
+        await asyncio.gather(*(_async_request_chunk(p, count) for p, count in chunks))
+
+    def _polling_trigger(self, namespace: str):
+        """
+        request the subdevices 'class' namespace in the next polling cycle.
+        These policies are only registered when a subdevice of that class pops up
+        since hubs don't expose the full set of namespaces until a real subdevice
+        type is binded and we would ask a namespace which is not supported (see #167)
+        """
+        if (policy := self.polling_dictionary.get(namespace)) is None:
+            policy = self.polling_policy_add(
+                namespace, async_request=self._subdevices_requests[namespace]
+            )
+        policy.lastupdate = 0
+
+    async def _async_request_sensor_all(self):
+        await self.async_request_get(mc.NS_APPLIANCE_HUB_SENSOR_ADJUST)
+        await self._async_request_subdevices(
+            mc.NS_APPLIANCE_HUB_SENSOR_ALL, mc.KEY_ALL, SENSOR_ALL_TYPESET
+        )
+
+    async def _async_request_mts100_all(self):
+        await self.async_request_get(mc.NS_APPLIANCE_HUB_MTS100_ADJUST)
+        await self._async_request_subdevices(
+            mc.NS_APPLIANCE_HUB_MTS100_ALL, mc.KEY_ALL, MTS100_ALL_TYPESET
+        )
+        if mc.NS_APPLIANCE_HUB_MTS100_SCHEDULEB in self.descriptor.ability:
+            await self._async_request_subdevices(
+                mc.NS_APPLIANCE_HUB_MTS100_SCHEDULEB, mc.KEY_SCHEDULE, MTS100_ALL_TYPESET
+            )
 
+    async def _async_request_togglex(self):
         # we also need to check for TOGGLEX state in case but this is not always needed:
         # for example, if we just have mts100-likes devices, their 'togglex' state is already carried by
         # NS_APPLIANCE_HUB_MTS100_ALL, or we may know some subdevices dont actually have togglex
-        if not self._online:
-            return
-        if mc.NS_APPLIANCE_HUB_TOGGLEX in self.descriptor.ability:
-            if ((epoch - self.lastmqtt) > PARAM_HEARTBEAT_PERIOD):
-                _excluded = (mc.TYPE_MS100, mc.TYPE_MTS100, mc.TYPE_MTS100V3, mc.TYPE_MTS150)
-                for subdevice in self.subdevices.values():
-                    if subdevice.type not in _excluded:
-                        await self.async_request_get(mc.NS_APPLIANCE_HUB_TOGGLEX)
-                        break
+        _excluded = (mc.TYPE_MS100, mc.TYPE_MTS100, mc.TYPE_MTS100V3, mc.TYPE_MTS150)
+        for subdevice in self.subdevices.values():
+            if subdevice.type not in _excluded:
+                await self.async_request_get(mc.NS_APPLIANCE_HUB_TOGGLEX)
+                break
+
+    def get_diagnostics(self) -> dict:
+        diagnostics = super().get_diagnostics()
+        diagnostics["chunk_sizes"] = dict(self._chunk_sizes)
+        return diagnostics
 
 
 class MerossSubDevice:
 
+    # key -> _parse_xxx map used by the hub to dispatch payloads
+    _parsers: dict[str, typing.Callable]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._parsers = build_dispatch_table(cls, "_parse_")
+
     def __init__(self, hub: MerossDeviceHub, p_digest: dict, _type: str):
         self.hub = hub
         self.type = _type
         self.id = p_digest[mc.KEY_ID]
         self.p_digest = p_digest
+        self._digest = None  # last parsed digest (see MerossDeviceHub._parse_hub)
         self._online = False
         hub.subdevices[self.id] = self
         self.sensor_battery = self.build_sensor(DEVICE_CLASS_BATTERY)
@@ -322,7 +427,7 @@ class MerossSubDevice:
         # If instead this online status change is due to the single
         # subdevice coming online then we'll just wait for the next
         # polling cycle by setting the battery update trigger..
-        self.hub._lastupdate_battery = 0
+        self.hub._polling_trigger(mc.NS_APPLIANCE_HUB_BATTERY)
 
     def update_digest(self, p_digest: dict):
         self.p_digest = p_digest
@@ -402,6 +507,9 @@ class MerossSubDevice:
         self.switch_togglex._parse_togglex(p_togglex)
 
 
+MerossSubDevice._parsers = build_dispatch_table(MerossSubDevice, "_parse_")
+
+
 class MS100SubDevice(MerossSubDevice):
 
     def __init__(self, hub: MerossDeviceHub, p_digest: dict):
@@ -417,7 +525,7 @@ class MS100SubDevice(MerossSubDevice):
 
     def _setonline(self):
         super()._setonline()
-        self.hub._lastupdate_sensor = 0
+        self.hub._polling_trigger(mc.NS_APPLIANCE_HUB_SENSOR_ALL)
 
     def update_digest(self, p_digest: dict):
         super().update_digest(p_digest)
@@ -454,7 +562,7 @@ class MTS100SubDevice(MerossSubDevice):
 
     def _setonline(self):
         super()._setonline()
-        self.hub._lastupdate_mts100 = 0
+        self.hub._polling_trigger(mc.NS_APPLIANCE_HUB_MTS100_ALL)
 
     def _parse_all(self, p_all: dict):
         self._parse_online(p_all.get(mc.KEY_ONLINE, {}))
@@ -544,7 +652,7 @@ class SmokeAlarmSubDevice(MerossSubDevice):
 
     def _setonline(self):
         super()._setonline()
-        self.hub._lastupdate_sensor = 0
+        self.hub._polling_trigger(mc.NS_APPLIANCE_HUB_SENSOR_ALL)
 
     def update_digest(self, p_digest: dict):
         super().update_digest(p_digest)
@@ -8,6 +8,8 @@
  versioning
 """
 from __future__ import annotations
+import asyncio
+from logging import WARNING
 import typing
 
 from homeassistant.helpers.typing import StateType
@@ -26,16 +28,24 @@ except:
         DIAGNOSTIC = "diagnostic"
 
 
-from .merossclient import const as mc, get_namespacekey, get_productnameuuid
-from .helpers import LOGGER
+from .merossclient import (
+    const as mc,
+    MerossProtocolError,
+    get_namespacekey,
+    get_productnameuuid,
+)
+from .helpers import LOGGER, build_dispatch_table
 from .const import CONF_DEVICE_ID, DOMAIN
 
 if typing.TYPE_CHECKING:
     from homeassistant.core import HomeAssistant
     from homeassistant.config_entries import ConfigEntry
-    from .meross_device import MerossDevice
+    from .meross_device import MerossDevice, ResponseCallbackType
     from .meross_device_hub import MerossSubDevice
 
+# set in extra_state_attributes while an optimistic command awaits its ACK
+EXTRA_ATTR_PENDING = "pending"
+
 
 class MerossFakeEntity:
     """
@@ -54,6 +64,18 @@ class MerossEntity(Entity if typing.TYPE_CHECKING else object):
     _attr_device_class: str | None
     _attr_name: str | None = None
     _attr_entity_category: EntityCategory | str | None = None
+    # number of optimistic commands awaiting their ACK (see async_request_optimistic)
+    _pending_commands = 0
+    # state to restore when optimistic commands fail
+    _confirmed_state: StateType = None
+    # identifies the latest optimistic command: cleared when the device reports its state
+    _optimistic_token: object | None = None
+    # key -> _parse_xxx map used by the device to dispatch payloads
+    _parsers: dict[str, typing.Callable] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._parsers = build_dispatch_table(cls, "_parse_")
 
     def __init__(
         self,
@@ -164,6 +186,7 @@ class MerossEntity(Entity if typing.TYPE_CHECKING else object):
         return False
 
     def update_state(self, state: StateType):
+        self._state_reported(state)
         if self._attr_state != state:
             self._attr_state = state
             if self.hass and self.enabled:  # pylint: disable=no-member
@@ -172,6 +195,88 @@ class MerossEntity(Entity if typing.TYPE_CHECKING else object):
     def set_unavailable(self):
         self.update_state(None)
 
+    async def async_request_optimistic(
+        self,
+        namespace: str,
+        payload: dict,
+        state: StateType,
+        response_callback: ResponseCallbackType | None = None,
+        coalesce: bool = False,
+    ):
+        """
+        send a SET and show the expected state right away (flagged as 'pending')
+        instead of waiting for the device round-trip. The state is confirmed on
+        SETACK or rolled back on protocol ERROR or timeout. response_callback is
+        invoked (like in MerossDevice.request) when the device replies.
+        With coalesce, commands issued while one is still in flight are
+        last-write-wins (see MerossDevice.async_request_coalesced)
+        """
+        if not self._pending_commands:
+            self._confirmed_state = self._attr_state
+        self._attr_state = state
+        self._optimistic_token = token = object()
+        self._set_pending(1)
+        try:
+            if coalesce:
+                response = await self.device.async_request_coalesced(
+                    namespace, payload, self.id
+                )
+                if response is None:
+                    # superseded (never sent): the newer command owns the state
+                    self._set_pending(-1)
+                    return
+                header, r_payload = response
+            else:
+                header, r_payload = await self.device.async_request_ack(
+                    namespace, mc.METHOD_SET, payload
+                )
+            acknowledge = True
+        except MerossProtocolError as error:
+            header, r_payload = {}, error.reason
+            acknowledge = False
+        except asyncio.TimeoutError:
+            header = None
+            acknowledge = False
+        except Exception as error:
+            self.device.log(
+                WARNING,
+                14400,
+                "MerossEntity(%s) %s in async_request_optimistic: %s",
+                self.name,
+                type(error).__name__,
+                str(error),
+            )
+            header = None
+            acknowledge = False
+        if acknowledge:
+            self._confirmed_state = state
+        elif self._optimistic_token is token:
+            # rollback only if nothing (PUSH/poll or a later command)
+            # changed the state in the meantime
+            self._attr_state = self._confirmed_state
+        if self._optimistic_token is token:
+            self._optimistic_token = None
+        self._set_pending(-1)
+        if (response_callback is not None) and (header is not None):
+            response_callback(acknowledge, header, r_payload)  # type: ignore
+
+    def _state_reported(self, state: StateType):
+        """the device told us its state: pending optimistic commands will not roll back"""
+        self._confirmed_state = state
+        self._optimistic_token = None
+
+    def _set_pending(self, delta: int):
+        self._pending_commands += delta
+        attributes = getattr(self, "_attr_extra_state_attributes", None)
+        if self._pending_commands:
+            if attributes is None:
+                attributes = self._attr_extra_state_attributes = {}
+            attributes[EXTRA_ATTR_PENDING] = True
+        elif attributes:
+            attributes.pop(EXTRA_ATTR_PENDING, None)
+        if self.hass and self.enabled:  # pylint: disable=no-member
+            self.async_write_ha_state()  # pylint: disable=no-member
+
     # @property
     # def entryname(self): # ATTR friendly_name in HA api
     #    return (
@@ -237,15 +342,15 @@ class MerossToggle(MerossEntity):
             if acknowledge:
                 self.update_onoff(onoff)
 
-        await self.device.async_request(
+        await self.async_request_optimistic(
             self.namespace,
-            mc.METHOD_SET,
             {
                 self.key_namespace: {
                     self.key_channel: self.channel,
                     self.key_onoff: onoff,
                 }
             },
+            STATE_ON if onoff else STATE_OFF,
             _ack_callback,
         )
 
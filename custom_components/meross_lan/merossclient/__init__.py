@@ -2,9 +2,10 @@
     A collection of utilities to help managing the Meross device protocol
 """
 from typing import Union
-from uuid import uuid4
+from itertools import count
 from hashlib import md5
 from time import time
+import os
 
 from . import const as mc
 
@@ -43,6 +44,63 @@ class MerossSignatureError(MerossProtocolError):
         super().__init__("Signature error")
 
 
+class MerossSigner:
+    """
+    signing/verification helper for the protocol header:
+    sign = md5(messageId + key + timestamp).hexdigest()
+    - messageIds are generated from a random (per signer) prefix and a counter so
+    they keep the uuid4().hex format (32 hex chars) without the cost of uuid4
+    - the encoded 'key + timestamp' suffix is cached since it only changes
+    every second (or when the key changes)
+    - successful verifications are remembered (bounded) so duplicated messages
+    (retransmissions, echoes, multiple transports) are not hashed again
+    """
+    VERIFIED_CACHE_SIZE = 256
+
+    __slots__ = (
+        "_prefix",
+        "_counter",
+        "_suffix_key",
+        "_suffix_timestamp",
+        "_suffix",
+        "_verified",
+    )
+
+    def __init__(self):
+        self._prefix = os.urandom(12).hex()
+        self._counter = count(int.from_bytes(os.urandom(4), "big"))
+        self._suffix_key = None
+        self._suffix_timestamp = None
+        self._suffix = b""
+        self._verified: dict[str, tuple] = {}
+
+    def messageid(self) -> str:
+        return f"{self._prefix}{next(self._counter) & 0xFFFFFFFF:08x}"
+
+    def sign(self, messageid: str, key: str, timestamp: int) -> str:
+        if (key != self._suffix_key) or (timestamp != self._suffix_timestamp):
+            self._suffix = (key + str(timestamp)).encode("utf-8")
+            self._suffix_key = key
+            self._suffix_timestamp = timestamp
+        return md5(messageid.encode("utf-8") + self._suffix).hexdigest()
+
+    def verify(self, header: dict, key: str) -> bool:
+        sign = header[mc.KEY_SIGN]
+        messageid = header[mc.KEY_MESSAGEID]
+        timestamp = header[mc.KEY_TIMESTAMP]
+        if self._verified.get(sign) == (messageid, key, timestamp):
+            return True
+        if self.sign(messageid, key, timestamp) != sign:
+            return False
+        if len(self._verified) >= MerossSigner.VERIFIED_CACHE_SIZE:
+            self._verified.clear()
+        self._verified[sign] = (messageid, key, timestamp)
+        return True
+
+
+SIGNER = MerossSigner()
+
+
 def build_payload(
     namespace:str,
     method:str,
@@ -62,7 +120,7 @@ def build_payload(
         }
     else:
         if messageid is None:
-            messageid = uuid4().hex
+            messageid = SIGNER.messageid()
         timestamp = int(time())
         return {
             mc.KEY_HEADER: {
@@ -75,7 +133,7 @@ def build_payload(
                 #"from": "/appliance/9109182170548290882048e1e9522946/publish",
                 mc.KEY_TIMESTAMP: timestamp,
                 mc.KEY_TIMESTAMPMS: 0,
-                mc.KEY_SIGN: md5((messageid + (key or "") + str(timestamp)).encode('utf-8')).hexdigest()
+                mc.KEY_SIGN: SIGNER.sign(messageid, key or "", timestamp)
             },
             mc.KEY_PAYLOAD: payload
         }
@@ -112,10 +170,8 @@ def get_replykey(header: dict, key:KeyType = None) -> KeyType:
     the 'reply scheme' hack doesnt work on mqtt but works on http: this code will be left since it works if the key is correct
     anyway and could be reused in a future attempt
     """
-    if isinstance(key, str):
-        sign = md5((header[mc.KEY_MESSAGEID] + key + str(header[mc.KEY_TIMESTAMP])).encode('utf-8')).hexdigest()
-        if sign == header[mc.KEY_SIGN]:
-            return key
+    if isinstance(key, str) and SIGNER.verify(header, key):
+        return key
 
     return header
 
@@ -173,13 +229,76 @@ class MerossDeviceDescriptor:
         """
         self.all = payload.get(mc.KEY_ALL, self.all)
         self.digest = self.all.get(mc.KEY_DIGEST, {})
+        # these are lazily rebuilt (see __getattr__) so most of the time
+        # they're not even cached: avoid raising on delattr
+        _dict = self.__dict__
         for key in MerossDeviceDescriptor._dynamicattrs.keys():
-            try:
-                delattr(self, key)
-            except Exception:
-                continue
+            _dict.pop(key, None)
 
     def update_time(self, p_time: dict):
         self.system[mc.KEY_TIME] = p_time
         self.time = p_time
         self.timezone = p_time.get(mc.KEY_TIMEZONE)
+
+
+class RttEstimator:
+    """
+    TCP-like (RFC 6298) round trip time estimator: keeps the smoothed rtt
+    and its variance in order to tune the request timeout (rto) to the actual
+    device responsiveness. It also tracks a smoothed 'loss' ratio (timeouts
+    over requests) so that we'll give more retries to flaky devices.
+    rto_min is kept at 1 sec (as in RFC 6298) since these embedded servers
+    sometimes stall for a while even when healthy and always allowing a retry
+    avoids flagging them offline on a single hiccup
+    """
+    ALPHA = 0.125
+    BETA = 0.25
+    K = 4
+
+    def __init__(self, rto_init: float = 1, rto_min: float = 1, rto_max: float = 5):
+        self.rto_min = rto_min
+        self.rto_max = rto_max
+        self.rto = rto_init
+        self.srtt: float | None = None
+        self.rttvar: float = 0
+        self.loss: float = 0
+        self.samples = 0
+        self.timeouts = 0
+
+    @property
+    def attempts(self) -> int:
+        """
+        number of attempts (timeout retries included) we should try
+        before considering the device unreachable
+        """
+        if self.srtt is None:
+            return 3 # no knowledge yet: be generous
+        return 2 if self.loss < 0.1 else 3
+
+    def sample(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.rto = min(max(self.srtt + self.K * self.rttvar, self.rto_min), self.rto_max)
+        self.loss = (1 - self.ALPHA) * self.loss
+        self.samples += 1
+
+    def timeout(self):
+        # Karn's algorithm: backoff the rto until we get a fresh sample
+        self.rto = min(self.rto * 2, self.rto_max)
+        self.loss = (1 - self.ALPHA) * self.loss + self.ALPHA
+        self.timeouts += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "rto": self.rto,
+            "loss": self.loss,
+            "attempts": self.attempts,
+            "samples": self.samples,
+            "timeouts": self.timeouts,
+        }
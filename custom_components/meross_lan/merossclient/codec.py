@@ -0,0 +1,63 @@
+"""
+    json codec for the protocol layer: we'll use the fastest
+    implementation available (orjson -> ujson -> stdlib json)
+
+    json_dumps(obj) -> str
+    json_dumpb(obj) -> bytes (ready for the wire)
+    json_loads(str | bytes) -> object
+"""
+from __future__ import annotations
+from typing import Any, Callable, NamedTuple
+import json as _json
+
+
+class Codec(NamedTuple):
+    name: str
+    dumps: Callable[[Any], str]
+    dumpb: Callable[[Any], bytes]
+    loads: Callable[[str | bytes], Any]
+
+
+def _build_codecs() -> dict[str, Codec]:
+    codecs = {}
+    try:
+        import orjson
+
+        _orjson_dumps = orjson.dumps
+        codecs["orjson"] = Codec(
+            "orjson",
+            lambda obj: _orjson_dumps(obj).decode("utf-8"),
+            _orjson_dumps,
+            orjson.loads,
+        )
+    except ImportError:
+        pass
+    try:
+        import ujson
+
+        _ujson_dumps = ujson.dumps
+        codecs["ujson"] = Codec(
+            "ujson",
+            lambda obj: _ujson_dumps(obj, escape_forward_slashes=False),
+            lambda obj: _ujson_dumps(obj, escape_forward_slashes=False).encode("utf-8"),
+            ujson.loads,
+        )
+    except ImportError:
+        pass
+    _stdlib_dumps = _json.dumps
+    codecs["json"] = Codec(
+        "json",
+        _stdlib_dumps,
+        lambda obj: _stdlib_dumps(obj).encode("utf-8"),
+        _json.loads,
+    )
+    return codecs
+
+
+CODECS = _build_codecs()
+# the first one (in order of preference) is the default
+CODEC = next(iter(CODECS.values()))
+
+json_dumps = CODEC.dumps
+json_dumpb = CODEC.dumpb
+json_loads = CODEC.loads
@@ -260,6 +260,8 @@ KEY_KEY = 'key'
 KEY_DATA = 'data'
 KEY_PARAMS = 'params'
 KEY_APISTATUS = 'apiStatus'
+KEY_MULTIPLE = 'multiple'
+KEY_MAXCMDNUM = 'maxCmdNum'
 
 # 'well-know' syntax for METHOD_GET
 PAYLOAD_GET = {
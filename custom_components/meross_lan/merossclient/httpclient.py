@@ -3,10 +3,7 @@
     for Meross devices.
 """
 from logging import Logger, getLogger, DEBUG
-from json import (
-    dumps as json_dumps,
-    loads as json_loads,
-)
+from time import monotonic
 import asyncio
 import async_timeout
 import aiohttp
@@ -17,14 +14,18 @@ from . import (
     KeyType,
     MerossKeyError,
     MerossProtocolError,
+    RttEstimator,
     build_payload,
     get_replykey,
     build_default_payload_get,
 )
+from .codec import json_dumpb, json_loads
+
+_HEADERS_CONNECTION_CLOSE = {aiohttp.hdrs.CONNECTION: "close"}
 
 class MerossHttpClient:
 
-    timeout = 5 # total timeout will be 1+2+4: check relaxation algorithm
+    timeout = 5 # max timeout for a single attempt: see RttEstimator
 
     def __init__(
         self,
@@ -43,6 +44,12 @@ class MerossHttpClient:
         self._requesturl = URL(f"http://{host}/config")
         self.key = key # key == None for hack-mode
         self.replykey = None
+        # keepalive is None until we know how the device behaves:
+        # some firmwares close the connection after every request (or just drop
+        # idle connections silently) so we'll stop trying to reuse connections for them
+        self.keepalive: bool | None = None
+        # the estimator will tune timeouts/retries on the actual device responsiveness
+        self.rtt = RttEstimator(rto_max=self.timeout)
         self._session = session or aiohttp.ClientSession()
         self._logger = logger or getLogger(__name__)
 
@@ -56,37 +63,57 @@ class MerossHttpClient:
         self._requesturl = URL(f"http://{value}/config")
 
     async def async_request_raw(self, request: dict) -> dict:
-        timeout = 1
+        rtt = self.rtt
+        attempts = rtt.attempts
         debugid = None
         try:
             if self._logger.isEnabledFor(DEBUG):
                 debugid = f"{self._host}:{id(request)}"
-                request_data = json_dumps(request)
-                self._logger.debug("MerossHttpClient(%s): HTTP Request (%s)", debugid, request_data)
+                request_data = json_dumpb(request)
+                self._logger.debug("MerossHttpClient(%s): HTTP Request (%s)", debugid, request_data.decode("utf-8"))
             else:
-                request_data = json_dumps(request)
+                request_data = json_dumpb(request)
             # since device HTTP service sometimes timeouts with no apparent
             # reason we're using an increasing timeout loop to try recover
-            # when this timeout is transient
+            # when this timeout is transient. Both the timeout and the number
+            # of attempts are tuned by the rtt estimator
             while True:
                 try:
-                    with async_timeout.timeout(timeout):
+                    request_time = monotonic()
+                    with async_timeout.timeout(rtt.rto):
                         response = await self._session.post(
                             url=self._requesturl,
-                            data=request_data
+                            data=request_data,
+                            headers=None if self.keepalive is not False else _HEADERS_CONNECTION_CLOSE,
                         )
+                    rtt.sample(monotonic() - request_time)
                     break
                 except asyncio.TimeoutError as e:
-                    if timeout < self.timeout:
-                        timeout = timeout * 2
-                    else:
+                    rtt.timeout() # this will also backoff rtt.rto
+                    attempts -= 1
+                    if attempts <= 0:
                         raise e
+                except aiohttp.ClientConnectorError as e:
+                    # couldn't connect at all: this has nothing to do with keep-alive
+                    raise e
+                except (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError) as e:
+                    # the request failed on an established (likely pooled) connection
+                    # the device silently dropped: stop reusing connections with
+                    # this device and retry right away
+                    if self.keepalive is False:
+                        raise e
+                    self.keepalive = False
+
+            if self.keepalive is None:
+                self.keepalive = (response.version >= aiohttp.HttpVersion11) and (
+                    response.headers.get(aiohttp.hdrs.CONNECTION, "").lower() != "close"
+                )
 
             response.raise_for_status()
-            text_body = await response.text()
+            body = await response.read()
             if debugid is not None:
-                self._logger.debug("MerossHttpClient(%s): HTTP Response (%s)", debugid, text_body)
-            json_body:dict = json_loads(text_body)
+                self._logger.debug("MerossHttpClient(%s): HTTP Response (%s)", debugid, body.decode("utf-8", "replace"))
+            json_body:dict = json_loads(body)
             if self.key is None:
                 self.replykey = get_replykey(json_body[mc.KEY_HEADER], self.key)
         except Exception as e:
@@ -97,10 +124,10 @@ class MerossHttpClient:
 
         return json_body
 
-    async def async_request(self, namespace: str, method: str, payload: dict) -> dict:
+    async def async_request(self, namespace: str, method: str, payload: dict, messageid: str | None = None) -> dict:
         key = self.key
         request: dict = build_payload(
-            namespace, method, payload, self.replykey if key is None else key, mc.MANUFACTURER)
+            namespace, method, payload, self.replykey if key is None else key, mc.MANUFACTURER, messageid)
         response: dict = await self.async_request_raw(request)
         if response.get(mc.KEY_PAYLOAD, {}).get(mc.KEY_ERROR, {}).get(mc.KEY_CODE) == mc.ERROR_INVALIDKEY:
             if key is not None:
@@ -0,0 +1,371 @@
+"""
+    A minimal asyncio MQTT (3.1.1) client
+
+    We only need plain publish/subscribe to talk with Meross devices so this is
+    a lot lighter than a full featured client. A single connection is kept open
+    (and shared among all of the devices), re-established with backoff when lost
+    and kept alive with PINGREQ whenever we didn't send anything for a while
+    (the broker only cares about what it receives from us).
+    Publishes are pipelined: they're just appended to the transport buffer
+    without waiting for the broker.
+"""
+from __future__ import annotations
+from typing import Callable, NamedTuple
+from logging import Logger, getLogger, DEBUG
+import asyncio
+import struct
+import os
+
+CONNECT = 0x10
+CONNACK = 0x20
+PUBLISH = 0x30
+PUBACK = 0x40
+PUBREC = 0x50
+PUBREL = 0x60
+PUBCOMP = 0x70
+SUBSCRIBE = 0x80
+SUBACK = 0x90
+UNSUBSCRIBE = 0xA0
+UNSUBACK = 0xB0
+PINGREQ = 0xC0
+PINGRESP = 0xD0
+DISCONNECT = 0xE0
+
+CONNECT_TIMEOUT = 10
+RECONNECT_BACKOFF_MAX = 60
+
+
+class MQTTMessage(NamedTuple):
+    topic: str
+    payload: bytes
+
+
+def encode_length(length: int) -> bytes:
+    data = bytearray()
+    while True:
+        digit = length % 128
+        length //= 128
+        if length:
+            data.append(digit | 0x80)
+        else:
+            data.append(digit)
+            return bytes(data)
+
+
+def encode_string(value: str | bytes) -> bytes:
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return struct.pack("!H", len(value)) + value
+
+
+def encode_packet(header: int, body: bytes = b"") -> bytes:
+    return bytes((header,)) + encode_length(len(body)) + body
+
+
+def encode_publish(topic: str, payload: bytes) -> bytes:
+    return encode_packet(PUBLISH, encode_string(topic) + payload)
+
+
+async def async_read_packet(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    header = (await reader.readexactly(1))[0]
+    length = 0
+    multiplier = 1
+    while True:
+        digit = (await reader.readexactly(1))[0]
+        length += (digit & 0x7F) * multiplier
+        if not (digit & 0x80):
+            break
+        multiplier *= 128
+    return header, (await reader.readexactly(length)) if length else b""
+
+
+def decode_publish(header: int, data: bytes) -> tuple[MQTTMessage, int, bytes]:
+    """returns the message, its qos and the packet identifier (if qos > 0)"""
+    topic_len = struct.unpack_from("!H", data)[0]
+    pos = 2 + topic_len
+    topic = data[2:pos].decode("utf-8")
+    qos = (header >> 1) & 0x03
+    if qos:
+        packet_id = data[pos : pos + 2]
+        pos += 2
+    else:
+        packet_id = b""
+    return MQTTMessage(topic, data[pos:]), qos, packet_id
+
+
+class MerossMQTTClient:
+    """
+    asyncio MQTT client: call start() to have it connect (and keep reconnecting)
+    in the background. Subscriptions are remembered and renewed on every connection
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 1883,
+        username: str | None = None,
+        password: str | None = None,
+        client_id: str | None = None,
+        keepalive: int = 60,
+        ssl=None,
+        logger: Logger | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.client_id = client_id or f"meross_lan_{os.urandom(4).hex()}"
+        self.keepalive = keepalive
+        self.ssl = ssl
+        self.logger = logger or getLogger(__name__)
+        self.on_message: Callable[[MQTTMessage], None] | None = None
+        self.on_connect: Callable[[], None] | None = None
+        self.on_disconnect: Callable[[], None] | None = None
+        self.subscriptions: dict[str, int] = {}
+        self.published = 0
+        self.received = 0
+        self.connections = 0
+        self._connected = False
+        self._writer: asyncio.StreamWriter | None = None
+        self._task: asyncio.Task | None = None
+        self._packet_id = 0
+        self._write_time = 0.0  # loop time of the last packet sent
+        self._ping_time = 0.0  # loop time of the PINGREQ waiting a PINGRESP (if any)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._connected_event = asyncio.Event()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._async_run())
+
+    async def async_stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def async_wait_connected(self, timeout: float = CONNECT_TIMEOUT) -> bool:
+        try:
+            await asyncio.wait_for(self._connected_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._connected
+
+    async def async_subscribe(self, topic: str, qos: int = 0):
+        self.subscriptions[topic] = qos
+        if self._connected:
+            await self._async_send_subscribe(topic, qos)
+
+    def publish(self, topic: str, payload: bytes) -> bool:
+        """QoS 0 publish: returns False if not connected"""
+        if not self._connected:
+            return False
+        self._write(encode_publish(topic, payload))
+        self.published += 1
+        return True
+
+    def get_diagnostics(self) -> dict:
+        return {
+            "connected": self._connected,
+            "connections": self.connections,
+            "published": self.published,
+            "received": self.received,
+            "write_buffer": self._writer.transport.get_write_buffer_size()
+            if self._writer is not None
+            else None,
+        }
+
+    def _next_packet_id(self) -> int:
+        self._packet_id = (self._packet_id % 65535) + 1
+        return self._packet_id
+
+    async def _async_send_subscribe(self, topic: str, qos: int):
+        packet_id = self._next_packet_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[packet_id] = future
+        self._write(
+            encode_packet(
+                SUBSCRIBE | 0x02,
+                struct.pack("!H", packet_id) + encode_string(topic) + bytes((qos,)),
+            )
+        )
+        try:
+            await asyncio.wait_for(future, CONNECT_TIMEOUT)
+        finally:
+            self._pending.pop(packet_id, None)
+
+    def _write(self, data: bytes):
+        self._writer.write(data)  # type: ignore
+        self._write_time = asyncio.get_running_loop().time()
+
+    async def _async_run(self):
+        backoff = 1
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                reader = await self._async_connect()
+                backoff = 1
+                tasks = [loop.create_task(self._async_receive(reader))]
+                if self.keepalive:
+                    # keepalive == 0 turns off the mechanism altogether
+                    tasks.append(loop.create_task(self._async_keepalive()))
+                try:
+                    done, _ = await asyncio.wait(
+                        tasks, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        task.result()  # raises whatever ended the connection
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+            except asyncio.CancelledError:
+                self._disconnect(True)
+                raise
+            except Exception as error:
+                self.logger.warning(
+                    "MerossMQTTClient(%s:%s) %s: %s",
+                    self.host,
+                    self.port,
+                    type(error).__name__,
+                    str(error),
+                )
+            self._disconnect(False)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+
+    async def _async_connect(self) -> asyncio.StreamReader:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl),
+            CONNECT_TIMEOUT,
+        )
+        flags = 0x02  # clean session
+        payload = encode_string(self.client_id)
+        if self.username is not None:
+            flags |= 0x80
+            payload += encode_string(self.username)
+            if self.password is not None:
+                flags |= 0x40
+                payload += encode_string(self.password)
+        writer.write(
+            encode_packet(
+                CONNECT,
+                encode_string("MQTT")
+                + bytes((4, flags))  # protocol level 4 (3.1.1)
+                + struct.pack("!H", self.keepalive)
+                + payload,
+            )
+        )
+        try:
+            header, data = await asyncio.wait_for(
+                async_read_packet(reader), CONNECT_TIMEOUT
+            )
+            if (header & 0xF0) != CONNACK:
+                raise ConnectionError("unexpected packet in place of CONNACK")
+            if data[1]:
+                raise ConnectionRefusedError(f"CONNACK return code {data[1]}")
+        except Exception:
+            writer.close()
+            raise
+        self._writer = writer
+        self._write_time = asyncio.get_running_loop().time()
+        self._ping_time = 0.0
+        self._connected = True
+        self._connected_event.set()
+        self.connections += 1
+        self.logger.log(
+            DEBUG, "MerossMQTTClient(%s:%s) connected", self.host, self.port
+        )
+        # renew subscriptions: SUBACKs are processed in _async_receive
+        for topic, qos in self.subscriptions.items():
+            packet_id = self._next_packet_id()
+            self._write(
+                encode_packet(
+                    SUBSCRIBE | 0x02,
+                    struct.pack("!H", packet_id) + encode_string(topic) + bytes((qos,)),
+                )
+            )
+        if self.on_connect is not None:
+            self.on_connect()
+        return reader
+
+    async def _async_keepalive(self):
+        """
+        The broker drops us if it doesn't hear from us within keepalive so we
+        PINGREQ once our outbound traffic has been idle for keepalive / 2. This
+        is independent of what we receive: a busy broker flooding us with
+        publishes doesn't count as activity on our side.
+        """
+        loop = asyncio.get_running_loop()
+        interval = self.keepalive / 2
+        while True:
+            now = loop.time()
+            if self._ping_time:
+                if (now - self._ping_time) >= interval:
+                    raise ConnectionError("PINGRESP timeout")
+                wakeup = self._ping_time + interval
+            elif (now - self._write_time) >= interval:
+                self._write(encode_packet(PINGREQ))
+                self._ping_time = now
+                wakeup = now + interval
+            else:
+                wakeup = self._write_time + interval
+            await asyncio.sleep(wakeup - now)
+
+    async def _async_receive(self, reader: asyncio.StreamReader):
+        while True:
+            header, data = await async_read_packet(reader)
+            packet_type = header & 0xF0
+            if packet_type == PUBLISH:
+                message, qos, packet_id = decode_publish(header, data)
+                if qos == 1:
+                    self._write(encode_packet(PUBACK, packet_id))
+                elif qos == 2:
+                    self._write(encode_packet(PUBREC, packet_id))
+                self.received += 1
+                if self.on_message is not None:
+                    try:
+                        self.on_message(message)
+                    except Exception as error:
+                        self.logger.warning(
+                            "MerossMQTTClient(%s:%s) %s in on_message: %s",
+                            self.host,
+                            self.port,
+                            type(error).__name__,
+                            str(error),
+                        )
+            elif packet_type == PINGRESP:
+                self._ping_time = 0.0
+            elif packet_type == SUBACK:
+                packet_id = struct.unpack_from("!H", data)[0]
+                if (future := self._pending.get(packet_id)) is not None:
+                    if not future.done():
+                        future.set_result(data[2:])
+            elif packet_type == PUBREL:
+                self._write(encode_packet(PUBCOMP, data[:2]))
+
+    def _disconnect(self, graceful: bool):
+        self._connected_event.clear()
+        if (writer := self._writer) is not None:
+            self._writer = None
+            try:
+                if graceful:
+                    writer.write(encode_packet(DISCONNECT))
+                writer.close()
+            except Exception:
+                pass
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+        if self._connected:
+            self._connected = False
+            if self.on_disconnect is not None:
+                self.on_disconnect()
@@ -123,20 +123,15 @@ class MLConfigNumber(me.MerossEntity, PatchedNumberEntity):
     async def async_set_native_value(self, value: float):
 
         device_value = int(value * self.multiplier)
-
-        def _ack_callback(acknowledge: bool, header: dict, payload: dict):
-            if acknowledge:
-                self.update_native_value(device_value)
-
-        await self.device.async_request(
+        await self.async_request_optimistic(
             self.namespace,
-            mc.METHOD_SET,
             {
                 self.key_namespace: [
                     {self.key_channel: self.channel, self.key_value: device_value}
                 ]
             },
-            _ack_callback,
+            device_value / self.multiplier,
+            coalesce=True,
         )
 
 
@@ -194,16 +189,11 @@ class MLScreenBrightnessNumber(MLConfigNumber):
             mc.KEY_STANDBY: self.device._number_brightness_standby.native_value,
         }
         brightness[self.key_value] = value
-
-        def _ack_callback(acknowledge: bool, header: dict, payload: dict):
-            if acknowledge:
-                self.update_native_value(value)
-
-        await self.device.async_request(
+        await self.async_request_optimistic(
             mc.NS_APPLIANCE_CONTROL_SCREEN_BRIGHTNESS,
-            mc.METHOD_SET,
             {mc.KEY_BRIGHTNESS: [brightness]},
-            _ack_callback,
+            value / self.multiplier,
+            coalesce=True,
         )
 
 
@@ -225,9 +215,7 @@ class ScreenBrightnessMixin(
             self._number_brightness_standby = MLScreenBrightnessNumber(
                 self, 0, mc.KEY_STANDBY
             )
-            self.polling_dictionary[
-                mc.NS_APPLIANCE_CONTROL_SCREEN_BRIGHTNESS
-            ] = mc.PAYLOAD_GET[mc.NS_APPLIANCE_CONTROL_SCREEN_BRIGHTNESS]
+            self.polling_policy_add(mc.NS_APPLIANCE_CONTROL_SCREEN_BRIGHTNESS)
 
         except Exception as e:
             LOGGER.warning(
@@ -13,7 +13,7 @@ from .helpers import LOGGER
 if typing.TYPE_CHECKING:
     from homeassistant.core import HomeAssistant
     from homeassistant.config_entries import ConfigEntry
-    from .meross_device import MerossDevice, ResponseCallbackType
+    from .meross_device import MerossDevice
 
 try:
     from homeassistant.components.humidifier.const import (
@@ -81,12 +81,11 @@ class MLSpray(me.MerossEntity, SelectEntity): # type: ignore
         else:
             raise NotImplementedError()
 
-        def _ack_callback(acknowledge: bool, header: dict, payload: dict):
-            if acknowledge:
-                self.update_state(option)
-
-        await self.device.async_request_spray(
-            {mc.KEY_CHANNEL: self.channel, mc.KEY_MODE: mode}, _ack_callback
+        await self.async_request_optimistic(
+            *self.device.build_request_spray(
+                {mc.KEY_CHANNEL: self.channel, mc.KEY_MODE: mode}
+            ),
+            option,
         )
 
     async def async_turn_on(self, **kwargs):
@@ -138,10 +137,6 @@ class SprayMixin(
     def _parse_spray(self, payload):
         self._parse__generic(mc.KEY_SPRAY, payload, mc.KEY_SPRAY)
 
-    async def async_request_spray(self, payload, callback: ResponseCallbackType):
-        await self.async_request(
-            mc.NS_APPLIANCE_CONTROL_SPRAY,
-            mc.METHOD_SET,
-            {mc.KEY_SPRAY: payload},
-            callback,
-        )
+    def build_request_spray(self, payload) -> tuple[str, dict]:
+        """returns the (namespace, payload) of the SET request for the spray"""
+        return mc.NS_APPLIANCE_CONTROL_SPRAY, {mc.KEY_SPRAY: payload}
@@ -63,6 +63,7 @@ from . import meross_entity as me
 from .const import (
     PARAM_ENERGY_UPDATE_PERIOD,
     PARAM_SIGNAL_UPDATE_PERIOD,
+    POLLING_PRIORITY_LOW,
 )
 
 if typing.TYPE_CHECKING:
@@ -158,6 +159,11 @@ class ElectricityMixin(
         self._sensor_power = MLSensor.build_for_device(self, DEVICE_CLASS_POWER)
         self._sensor_current = MLSensor.build_for_device(self, DEVICE_CLASS_CURRENT)
         self._sensor_voltage = MLSensor.build_for_device(self, DEVICE_CLASS_VOLTAGE)
+        self.polling_policy_add(
+            mc.NS_APPLIANCE_CONTROL_ELECTRICITY,
+            entities=(self._sensor_power, self._sensor_current, self._sensor_voltage),
+            skip_mqtt=False,
+        )
 
     def _handle_Appliance_Control_Electricity(self, header: dict, payload: dict):
         electricity = payload.get(mc.KEY_ELECTRICITY)
@@ -165,23 +171,11 @@ class ElectricityMixin(
         self._sensor_current.update_state(electricity.get(mc.KEY_CURRENT) / 1000)  # type: ignore
         self._sensor_voltage.update_state(electricity.get(mc.KEY_VOLTAGE) / 10)  # type: ignore
 
-    async def async_request_updates(self, epoch, namespace):
-        await super().async_request_updates(epoch, namespace)
-        # we're not checking context namespace since it should be very unusual
-        # to enter here with one of those following
-        if (
-            self._sensor_power.enabled
-            or self._sensor_voltage.enabled
-            or self._sensor_current.enabled
-        ):
-            await self.async_request_get(mc.NS_APPLIANCE_CONTROL_ELECTRICITY)
-
 
 class ConsumptionMixin(
     MerossDevice if typing.TYPE_CHECKING else object
 ):  # pylint: disable=used-before-assignment
 
-    _lastupdate_energy = 0
     _lastreset_energy = (
         0  # store the last 'device time' we passed onto to _attr_last_reset
     )
@@ -190,9 +184,14 @@ class ConsumptionMixin(
         super().__init__(api, descriptor, entry)
         self._sensor_energy = MLSensor.build_for_device(self, DEVICE_CLASS_ENERGY)
         self._sensor_energy._attr_state_class = STATE_CLASS_TOTAL_INCREASING
+        self.polling_policy_add(
+            mc.NS_APPLIANCE_CONTROL_CONSUMPTIONX,
+            period=PARAM_ENERGY_UPDATE_PERIOD,
+            entities=(self._sensor_energy,),
+            skip_mqtt=False,
+        )
 
     def _handle_Appliance_Control_ConsumptionX(self, header: dict, payload: dict):
-        self._lastupdate_energy = self.lastupdate
         days: list = payload.get(mc.KEY_CONSUMPTIONX)  # type: ignore
         days_len = len(days)
         if days_len < 1:
@@ -253,26 +252,11 @@ class ConsumptionMixin(
                 )
         self._sensor_energy.update_state(day_last.get(mc.KEY_VALUE))
 
-    async def async_request_updates(self, epoch, namespace):
-        await super().async_request_updates(epoch, namespace)
-        if self._sensor_energy.enabled and (
-            ((epoch - self._lastupdate_energy) > PARAM_ENERGY_UPDATE_PERIOD)
-            or (
-                (namespace is not None)
-                and (  # namespace is not None when coming online
-                    namespace != mc.NS_APPLIANCE_CONTROL_CONSUMPTIONX
-                )
-            )
-        ):
-            await self.async_request_get(mc.NS_APPLIANCE_CONTROL_CONSUMPTIONX)
-
 
 class RuntimeMixin(
     MerossDevice if typing.TYPE_CHECKING else object
 ):  # pylint: disable=used-before-assignment
 
-    _lastupdate_runtime = 0
-
     def __init__(self, api, descriptor: MerossDeviceDescriptor, entry):
         super().__init__(api, descriptor, entry)
         # DEVICE_CLASS_SIGNAL_STRENGTH is now 'forcing' dB or dBm as unit
@@ -284,21 +268,14 @@ class RuntimeMixin(
         self._sensor_runtime._attr_entity_category = me.EntityCategory.DIAGNOSTIC
         self._sensor_runtime._attr_native_unit_of_measurement = PERCENTAGE
         self._sensor_runtime._attr_icon = "mdi:wifi"
+        self.polling_policy_add(
+            mc.NS_APPLIANCE_SYSTEM_RUNTIME,
+            period=PARAM_SIGNAL_UPDATE_PERIOD,
+            entities=(self._sensor_runtime,),
+            skip_mqtt=False,
+            priority=POLLING_PRIORITY_LOW,
+        )
 
     def _handle_Appliance_System_Runtime(self, header: dict, payload: dict):
-        self._lastupdate_runtime = self.lastupdate
         if isinstance(runtime := payload.get(mc.KEY_RUNTIME), dict):
             self._sensor_runtime.update_state(runtime.get(mc.KEY_SIGNAL))
-
-    async def async_request_updates(self, epoch, namespace):
-        await super().async_request_updates(epoch, namespace)
-        if self._sensor_runtime.enabled and (
-            ((epoch - self._lastupdate_runtime) > PARAM_SIGNAL_UPDATE_PERIOD)
-            or (
-                (namespace is not None)
-                and (  # namespace is not None when coming online
-                    namespace != mc.NS_APPLIANCE_SYSTEM_RUNTIME
-                )
-            )
-        ):
-            await self.async_request_get(mc.NS_APPLIANCE_SYSTEM_RUNTIME)
@@ -20,6 +20,27 @@ import pytest
 
 pytest_plugins = "pytest_homeassistant_custom_component"
 
+
+# micro-benchmarks (tests marked 'benchmark') don't assert anything on timings
+# and are only run on demand: 'pytest --benchmark -m benchmark'
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark", action="store_true", default=False, help="run the micro-benchmarks"
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: micro-benchmark (needs --benchmark)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="needs --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
 # This fixture enables loading custom integrations in all tests.
 # Remove to enable selective use of this fixture
 @pytest.fixture(autouse=True)
@@ -0,0 +1,79 @@
+"""Helpers to build (and dispose) devices in tests without setting up their platforms."""
+import asyncio
+from contextlib import contextmanager
+from copy import deepcopy
+from unittest.mock import PropertyMock, patch
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.meross_lan import MerossApi
+from custom_components.meross_lan.const import CONF_DEVICE_ID, DOMAIN
+from custom_components.meross_lan.meross_device import MerossDevice
+from custom_components.meross_lan.merossclient import const as mc, build_payload
+
+from .const import MOCK_DEVICE_CONFIG
+
+
+def build_device(hass, config: dict = MOCK_DEVICE_CONFIG, **data) -> MerossDevice:
+    """
+    build the device out of a MockConfigEntry (data overrides config keys).
+    The device is unscheduled from the polling wheel so that tests can drive
+    its polling cycle
+    """
+    data = dict(deepcopy(config), **data)
+    device_id = data[CONF_DEVICE_ID]
+    entry = MockConfigEntry(domain=DOMAIN, data=data, unique_id=device_id)
+    entry.add_to_hass(hass)
+    api = MerossApi.get(hass)
+    device = api.build_device(device_id, entry)
+    api.polling_unschedule(device)
+    return device
+
+
+async def destroy_device(hass, device: MerossDevice):
+    api = device.api
+    api.devices.pop(device.device_id, None)
+    device.shutdown()
+    api.shutdown()
+    await hass.async_block_till_done()
+
+
+@contextmanager
+def mqtt_connected(api: MerossApi):
+    """pretend MQTT is connected: yields the mock of MerossApi.mqtt_publish"""
+    with patch.object(
+        MerossApi, "mqtt_connected", new_callable=PropertyMock, return_value=True
+    ), patch.object(api, "mqtt_publish") as mqtt_publish:
+        yield mqtt_publish
+
+
+class AckMock:
+    """
+    replaces MerossDevice.async_request_ack: every request is recorded
+    (namespace, method, payload, future) and awaits its future so that
+    tests can reply (set_result), fail (set_exception) or leave it pending
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    async def __call__(self, namespace: str, method: str, payload: dict):
+        future = asyncio.get_running_loop().create_future()
+        self.requests.append((namespace, method, payload, future))
+        return await future
+
+
+def mqtt_receive_reply(
+    device: MerossDevice, messageid: str, method: str, payload: dict | None = None
+):
+    """(fake) device reply to the MQTT transaction"""
+    transaction = device._mqtt_transactions[messageid]
+    message = build_payload(
+        transaction.namespace,
+        method,
+        payload or {},
+        device.key,
+        mc.MANUFACTURER,
+        messageid,
+    )
+    device.mqtt_receive(message[mc.KEY_HEADER], message[mc.KEY_PAYLOAD])
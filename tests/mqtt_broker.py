@@ -0,0 +1,88 @@
+"""A tiny in-process MQTT 3.1.1 broker stand-in (QoS 0 only) for tests."""
+import asyncio
+import struct
+
+from custom_components.meross_lan.merossclient.mqttclient import (
+    CONNACK,
+    DISCONNECT,
+    PINGREQ,
+    PINGRESP,
+    PUBLISH,
+    SUBACK,
+    SUBSCRIBE,
+    async_read_packet,
+    decode_publish,
+    encode_packet,
+    encode_publish,
+)
+
+
+def topic_matches(subscription: str, topic: str) -> bool:
+    sub_levels = subscription.split("/")
+    topic_levels = topic.split("/")
+    for i, sub_level in enumerate(sub_levels):
+        if sub_level == "#":
+            return True
+        if i >= len(topic_levels):
+            return False
+        if sub_level not in ("+", topic_levels[i]):
+            return False
+    return len(sub_levels) == len(topic_levels)
+
+
+class MQTTBroker:
+    def __init__(self):
+        self.server: asyncio.AbstractServer | None = None
+        self.port = 0
+        self.clients: dict[asyncio.StreamWriter, set[str]] = {}
+        self.messages: list = []
+        self.pingreqs = 0
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle_client, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *args):
+        for writer in list(self.clients):
+            writer.close()
+        self.server.close()  # type: ignore
+        await self.server.wait_closed()  # type: ignore
+
+    def publish(self, topic: str, payload: bytes):
+        packet = encode_publish(topic, payload)
+        for writer, subscriptions in self.clients.items():
+            if any(topic_matches(subscription, topic) for subscription in subscriptions):
+                writer.write(packet)
+
+    def disconnect_all(self):
+        for writer in list(self.clients):
+            writer.close()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await async_read_packet(reader)  # CONNECT
+            writer.write(encode_packet(CONNACK, b"\x00\x00"))
+            self.clients[writer] = subscriptions = set()
+            while True:
+                header, data = await async_read_packet(reader)
+                packet_type = header & 0xF0
+                if packet_type == PUBLISH:
+                    message, _, _ = decode_publish(header, data)
+                    self.messages.append(message)
+                    self.publish(message.topic, message.payload)
+                elif packet_type == SUBSCRIBE:
+                    packet_id = data[:2]
+                    topic_len = struct.unpack_from("!H", data, 2)[0]
+                    subscriptions.add(data[4 : 4 + topic_len].decode("utf-8"))
+                    writer.write(encode_packet(SUBACK, packet_id + b"\x00"))
+                elif packet_type == PINGREQ:
+                    self.pingreqs += 1
+                    writer.write(encode_packet(PINGRESP))
+                elif packet_type == DISCONNECT:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
@@ -0,0 +1,82 @@
+"""Test the last-write-wins (coalesced) commands."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.meross_lan.meross_entity import EXTRA_ATTR_PENDING
+from custom_components.meross_lan.merossclient import const as mc
+
+from .helpers import AckMock, build_device, destroy_device
+
+NAMESPACE = mc.NS_APPLIANCE_HUB_MTS100_ADJUST
+
+
+async def test_coalesced_commands(hass):
+    device = build_device(hass)
+    ack = AckMock()
+    with patch.object(device, "async_request_ack", ack):
+        task_1 = hass.async_create_task(device.async_request_coalesced(NAMESPACE, {"v": 1}, "k"))
+        await asyncio.sleep(0)
+        task_2 = hass.async_create_task(device.async_request_coalesced(NAMESPACE, {"v": 2}, "k"))
+        task_3 = hass.async_create_task(device.async_request_coalesced(NAMESPACE, {"v": 3}, "k"))
+        await asyncio.sleep(0)
+        # 2 was superseded by 3 before being sent
+        assert await task_2 is None
+        assert len(ack.requests) == 1
+        ack.requests[0][3].set_result(({"h": 1}, {}))
+        assert await task_1 == ({"h": 1}, {})
+        await asyncio.sleep(0)
+        assert len(ack.requests) == 2
+        assert ack.requests[1][2] == {"v": 3}
+        # a failure is raised to its own caller only
+        ack.requests[1][3].set_exception(asyncio.TimeoutError())
+        with pytest.raises(asyncio.TimeoutError):
+            await task_3
+    assert device._commands_coalesced == 1
+    assert not device._commands_pending
+    await destroy_device(hass, device)
+
+
+async def test_coalesced_keys(hass):
+    device = build_device(hass)
+    ack = AckMock()
+    with patch.object(device, "async_request_ack", ack):
+        task_1 = hass.async_create_task(device.async_request_coalesced(NAMESPACE, {"v": 1}, 1))
+        task_2 = hass.async_create_task(device.async_request_coalesced(NAMESPACE, {"v": 2}, 2))
+        await asyncio.sleep(0)
+        # different keys are not coalesced
+        assert len(ack.requests) == 2
+        for request in ack.requests:
+            request[3].set_result(({}, {}))
+        await asyncio.gather(task_1, task_2)
+    assert not device._commands_pending
+    await destroy_device(hass, device)
+
+
+async def test_coalesced_number(hass):
+    device = build_device(hass)
+    number = device.subdevices["01008C11"].number_adjust_temperature
+    number._attr_state = 0
+    ack = AckMock()
+    with patch.object(device, "async_request_ack", ack):
+        task_1 = hass.async_create_task(number.async_set_native_value(1))
+        await asyncio.sleep(0)
+        task_2 = hass.async_create_task(number.async_set_native_value(2))
+        task_3 = hass.async_create_task(number.async_set_native_value(3))
+        await asyncio.sleep(0)
+        # the UI shows the latest value (pending) while only the first is sent
+        assert number.native_value == 3
+        assert number.extra_state_attributes[EXTRA_ATTR_PENDING]
+        assert len(ack.requests) == 1
+        ack.requests[0][3].set_result(({}, {}))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(ack.requests) == 2
+        assert ack.requests[1][2][mc.KEY_ADJUST][0][mc.KEY_TEMPERATURE] == 300
+        # the latest command times out: the state goes back to the last acknowledged
+        ack.requests[1][3].set_exception(asyncio.TimeoutError())
+        await asyncio.gather(task_1, task_2, task_3)
+    assert number.native_value == 1
+    assert EXTRA_ATTR_PENDING not in number.extra_state_attributes
+    await destroy_device(hass, device)
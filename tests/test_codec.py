@@ -0,0 +1,60 @@
+"""Test (and micro-benchmark) the protocol json codecs."""
+from timeit import timeit
+
+import pytest
+
+from custom_components.meross_lan.const import CONF_PAYLOAD
+from custom_components.meross_lan.merossclient import const as mc, build_payload
+from custom_components.meross_lan.merossclient.codec import CODECS, CODEC
+
+from .const import MOCK_DEVICE_CONFIG, MOCK_KEY
+
+BENCHMARK_LOOPS = 1000
+
+
+def _build_message():
+    # a GETACK for Appliance.System.All as it would come from the device (msh300 trace)
+    return build_payload(
+        mc.NS_APPLIANCE_SYSTEM_ALL,
+        mc.METHOD_GETACK,
+        {mc.KEY_ALL: MOCK_DEVICE_CONFIG[CONF_PAYLOAD][mc.KEY_ALL]},
+        MOCK_KEY,
+        mc.MANUFACTURER,
+    )
+
+
+def test_codec_roundtrip():
+    message = _build_message()
+    for codec in CODECS.values():
+        assert codec.loads(codec.dumps(message)) == message, codec.name
+        assert codec.loads(codec.dumpb(message)) == message, codec.name
+        # interoperability: any codec must decode anyone else output
+        assert CODEC.loads(codec.dumpb(message)) == message, codec.name
+
+
+def test_codec_wire_format():
+    message = _build_message()
+    for codec in CODECS.values():
+        data = codec.dumpb(message)
+        assert isinstance(data, bytes), codec.name
+        # dumpb is just the utf-8 'wire' version of dumps
+        assert data == codec.dumps(message).encode("utf-8"), codec.name
+    # stdlib json is always available as the last resort
+    assert next(reversed(CODECS)) == "json"
+    assert CODEC is next(iter(CODECS.values()))
+
+
+@pytest.mark.benchmark
+def test_codec_benchmark(capsys):
+    message = _build_message()
+    results = {}
+    for codec in CODECS.values():
+        data = codec.dumpb(message)
+        results[codec.name] = (
+            timeit(lambda: codec.dumpb(message), number=BENCHMARK_LOOPS),
+            timeit(lambda: codec.loads(data), number=BENCHMARK_LOOPS),
+        )
+    with capsys.disabled():
+        print(f"\nAppliance.System.All ({len(CODEC.dumpb(message))} bytes) x {BENCHMARK_LOOPS}")
+        for name, (t_dump, t_load) in results.items():
+            print(f"{name:>8}: dumpb {t_dump * 1000:.2f} ms - loads {t_load * 1000:.2f} ms")
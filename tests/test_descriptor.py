@@ -0,0 +1,65 @@
+"""Descriptor refresh and change detection on the NS_ALL digest."""
+from copy import deepcopy
+
+from custom_components.meross_lan.const import CONF_PAYLOAD
+from custom_components.meross_lan.merossclient import (
+    const as mc,
+    MerossDeviceDescriptor,
+    build_payload,
+)
+
+from .const import MOCK_DEVICE_CONFIG
+from .helpers import build_device, destroy_device
+
+
+def test_descriptor_update():
+    payload = deepcopy(MOCK_DEVICE_CONFIG[CONF_PAYLOAD])
+    descriptor = MerossDeviceDescriptor(payload)
+    assert descriptor.innerIp == "10.0.0.1"
+    p_all = deepcopy(payload[mc.KEY_ALL])
+    p_all[mc.KEY_SYSTEM][mc.KEY_FIRMWARE][mc.KEY_INNERIP] = "10.0.0.2"
+    descriptor.update({mc.KEY_ALL: p_all})
+    assert descriptor.innerIp == "10.0.0.2"
+    assert descriptor.digest is p_all[mc.KEY_DIGEST]
+
+
+async def test_digest_change_detection(hass):
+    device = build_device(hass)
+    p_all = deepcopy(MOCK_DEVICE_CONFIG[CONF_PAYLOAD][mc.KEY_ALL])
+    device._parse_all({mc.KEY_ALL: p_all})
+    parsed = device._digest_parsed
+    skipped = device._digest_skipped
+    # an identical digest is not parsed again
+    device._parse_all({mc.KEY_ALL: deepcopy(p_all)})
+    assert device._digest_parsed == parsed
+    assert device._digest_skipped == skipped + 1
+    # the cache doesn't share the (mutable) payload: an in-place change is detected
+    # both on the hub digest and on the subdevice one
+    p_subdevice = p_all[mc.KEY_DIGEST][mc.KEY_HUB][mc.KEY_SUBDEVICE][1]
+    assert p_subdevice[mc.KEY_ID] == "01008C11"
+    p_subdevice[mc.KEY_ONOFF] = 0
+    device._parse_all({mc.KEY_ALL: p_all})
+    assert device._digest_parsed == parsed + 2
+    assert device.subdevices["01008C11"]._digest is not p_subdevice
+    await destroy_device(hass, device)
+
+
+async def test_digest_invalidate(hass):
+    """a polled (GETACK) namespace invalidates the related digest"""
+    device = build_device(hass)
+    device._online = True
+    device.hasmqtt = False  # skip the time/timezone setup requests in _parse_all
+    p_all = deepcopy(MOCK_DEVICE_CONFIG[CONF_PAYLOAD][mc.KEY_ALL])
+    device._parse_all({mc.KEY_ALL: p_all})
+    parsed = device._digest_parsed
+    message = build_payload(
+        mc.NS_APPLIANCE_HUB_TOGGLEX,
+        mc.METHOD_GETACK,
+        {mc.KEY_TOGGLEX: []},
+        device.key,
+        mc.MANUFACTURER,
+    )
+    device.receive(message[mc.KEY_HEADER], message[mc.KEY_PAYLOAD], None)
+    device._parse_all({mc.KEY_ALL: deepcopy(p_all)})
+    assert device._digest_parsed > parsed
+    await destroy_device(hass, device)
@@ -0,0 +1,83 @@
+"""Test the (per class) message dispatch tables."""
+from custom_components.meross_lan.helpers import build_dispatch_table
+from custom_components.meross_lan.meross_device import MerossDevice
+from custom_components.meross_lan.meross_device_hub import (
+    MerossDeviceHub,
+    MerossSubDevice,
+    MTS100SubDevice,
+    MTS100V3SubDevice,
+)
+from custom_components.meross_lan.merossclient import const as mc, build_payload
+from custom_components.meross_lan.sensor import RuntimeMixin
+
+from .helpers import build_device, destroy_device
+
+
+def test_dispatch_table():
+    class _Base:
+        def _parse_a(self):
+            pass
+
+        def _parse_b(self):
+            pass
+
+    class _Derived(_Base):
+        def _parse_b(self):
+            pass
+
+    assert build_dispatch_table(_Derived, "_parse_") == {
+        "a": _Base._parse_a,
+        "b": _Derived._parse_b,
+    }
+
+
+async def test_dispatch_device(hass):
+    device = build_device(hass)
+    device_class = type(device)
+    # the mixin class is built (and its tables) once
+    assert device_class in device.api.deviceclasses.values()
+    handlers = device_class._handlers
+    assert handlers[mc.NS_APPLIANCE_SYSTEM_ALL] is MerossDevice._handle_Appliance_System_All
+    assert handlers[mc.NS_APPLIANCE_SYSTEM_RUNTIME] is RuntimeMixin._handle_Appliance_System_Runtime
+    assert handlers[mc.NS_APPLIANCE_HUB_MTS100_ALL] is MerossDeviceHub._handle_Appliance_Hub_Mts100_All
+    # the base tables are left untouched
+    assert mc.NS_APPLIANCE_SYSTEM_RUNTIME not in MerossDevice._handlers
+    parsers = device_class._parsers
+    assert parsers[mc.KEY_HUB] is MerossDeviceHub._parse_hub
+
+    # overrides in a subclass are picked up
+    class _OverrideDevice(device_class):
+        def _handle_Appliance_System_Runtime(self, header: dict, payload: dict):
+            pass
+
+    _OverrideDevice.build_dispatch_tables()
+    assert (
+        _OverrideDevice._handlers[mc.NS_APPLIANCE_SYSTEM_RUNTIME]
+        is _OverrideDevice._handle_Appliance_System_Runtime
+    )
+    assert handlers[mc.NS_APPLIANCE_SYSTEM_RUNTIME] is RuntimeMixin._handle_Appliance_System_Runtime
+
+    # unknown namespaces are just ignored
+    device._online = True
+    message = build_payload("Appliance.Unknown.Namespace", mc.METHOD_PUSH, {}, device.key, mc.MANUFACTURER)
+    assert not device.receive(message[mc.KEY_HEADER], message[mc.KEY_PAYLOAD], None)
+    await destroy_device(hass, device)
+
+
+async def test_dispatch_subdevice(hass):
+    # subdevice classes build their own table when defined (__init_subclass__)
+    parsers = MTS100V3SubDevice._parsers
+    assert parsers["all"] is MTS100SubDevice._parse_all
+    assert parsers["battery"] is MerossSubDevice._parse_battery
+    assert "tempHum" not in parsers
+    assert MerossSubDevice._parsers["all"] is MerossSubDevice._parse_all
+
+    device = build_device(hass)
+    subdevice = device.subdevices["01008C11"]
+    assert type(subdevice) is MTS100V3SubDevice
+    # unknown keys (or subdevices) in hub payloads are just ignored
+    assert device._subdevice_parse({"unknown": [{mc.KEY_ID: "01008C11"}]}, "unknown") == 0
+    assert device._subdevice_parse({mc.KEY_BATTERY: [{mc.KEY_ID: "FFFFFFFF"}]}, mc.KEY_BATTERY) == 0
+    p_battery = {mc.KEY_BATTERY: [{mc.KEY_ID: "01008C11", mc.KEY_VALUE: 90}]}
+    assert device._subdevice_parse(p_battery, mc.KEY_BATTERY) == 1
+    await destroy_device(hass, device)
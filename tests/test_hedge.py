@@ -0,0 +1,94 @@
+"""Test hedged SETs go through the transports flow-control."""
+from time import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from custom_components.meross_lan.const import (
+    CONF_MQTT_WINDOW,
+    CONF_PROTOCOL,
+    CONF_PROTOCOL_AUTO,
+    CONF_PROTOCOL_HTTP,
+    CONF_PROTOCOL_MQTT,
+    PARAM_OFFLINE_PROBE_TIMEOUT,
+)
+from custom_components.meross_lan.merossclient import const as mc
+
+from .helpers import build_device, destroy_device, mqtt_connected
+
+SETACK = ({mc.KEY_METHOD: mc.METHOD_SETACK}, {})
+
+
+def _build_device(hass):
+    device = build_device(
+        hass, **{CONF_PROTOCOL: CONF_PROTOCOL_AUTO, CONF_MQTT_WINDOW: 1}
+    )
+    device._online = True
+    device.hedge = True
+    device._host = "10.0.0.1"
+    device.lastmqtt = time()
+    device.curr_protocol = CONF_PROTOCOL_MQTT
+    device._mqtt_latencies.append(0)  # shortest hedge delay
+    return device
+
+
+# hedged messageids are guarded for a while after the request
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_hedge_mqtt_queued(hass, expected_lingering_timers):
+    """the MQTT leg waits for the window and is released when HTTP wins"""
+    device = _build_device(hass)
+    acks = []
+    with mqtt_connected(device.api) as mqtt_publish, patch.object(
+        device, "_async_http_request_strict", AsyncMock(return_value=SETACK)
+    ) as http_mock:
+        device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        await device._async_request_hedged(
+            mc.NS_APPLIANCE_CONTROL_TOGGLEX,
+            {},
+            lambda acknowledge, header, payload: acks.append(acknowledge),
+        )
+        # the window is busy with the GET so the SET never made it to MQTT..
+        assert mqtt_publish.call_count == 1
+        # ..while the HTTP leg was served by the HTTP queue
+        assert http_mock.call_count == 1
+        assert device._http_queue_served == 1
+        assert acks == [True]
+        assert device._hedge_won == 1
+        await hass.async_block_till_done()
+        # the cancelled MQTT leg doesn't linger in the queue
+        assert not device._mqtt_queue
+        assert len(device._mqtt_transactions) == 1
+    await destroy_device(hass, device)
+
+
+# hedged messageids are guarded for a while after the request
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_hedge_mqtt_released(hass, expected_lingering_timers):
+    """a cancelled MQTT leg frees its window slot right away"""
+    device = _build_device(hass)
+    with mqtt_connected(device.api) as mqtt_publish, patch.object(
+        device, "_async_http_request_strict", AsyncMock(return_value=SETACK)
+    ):
+        await device._async_request_hedged(mc.NS_APPLIANCE_CONTROL_TOGGLEX, {}, None)
+        await hass.async_block_till_done()
+        assert mqtt_publish.call_count == 1
+        assert device._hedge_won == 1
+        assert not device._mqtt_transactions
+        # so that the next request is not held in the queue
+        device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        assert mqtt_publish.call_count == 2
+        assert not device._mqtt_queue
+    await destroy_device(hass, device)
+
+
+async def test_offline_probe_queued(hass):
+    device = build_device(hass, **{CONF_PROTOCOL: CONF_PROTOCOL_HTTP})
+    device._host = "10.0.0.1"
+    with patch.object(
+        device, "_async_http_request_strict", AsyncMock(side_effect=TimeoutError)
+    ) as http_mock:
+        await device._async_request_offline()
+    assert http_mock.call_args.args[4] == PARAM_OFFLINE_PROBE_TIMEOUT
+    assert device._http_queue_served == 1
+    assert not device.online
+    await destroy_device(hass, device)
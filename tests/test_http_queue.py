@@ -0,0 +1,51 @@
+"""Test the (per device) HTTP priority queue."""
+from unittest.mock import AsyncMock, patch
+
+from custom_components.meross_lan.const import (
+    CONF_PROTOCOL,
+    CONF_PROTOCOL_HTTP,
+    PARAM_HTTP_QUEUE_SIZE,
+)
+from custom_components.meross_lan.merossclient import const as mc
+
+from .helpers import build_device, destroy_device
+
+
+async def test_http_queue_priority(hass):
+    device = build_device(hass, **{CONF_PROTOCOL: CONF_PROTOCOL_HTTP})
+    with patch.object(device, "async_http_request", AsyncMock()) as mock:
+        # all queued before the worker gets the chance to run
+        assert device._http_enqueue(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {}, None, None)
+        assert device._http_enqueue(mc.NS_APPLIANCE_CONTROL_MULTIPLE, mc.METHOD_SET, {}, None, None)
+        assert device._http_enqueue(mc.NS_APPLIANCE_SYSTEM_TIME, mc.METHOD_PUSH, {}, None, None)
+        assert device._http_enqueue(mc.NS_APPLIANCE_CONTROL_TOGGLEX, mc.METHOD_SET, {}, None, None)
+        assert device._http_queue_maxdepth == 4
+        await hass.async_block_till_done()
+    assert [call.args[0] for call in mock.call_args_list] == [
+        mc.NS_APPLIANCE_CONTROL_TOGGLEX,  # command
+        mc.NS_APPLIANCE_SYSTEM_TIME,  # push
+        mc.NS_APPLIANCE_SYSTEM_ALL,  # polls in FIFO order
+        mc.NS_APPLIANCE_CONTROL_MULTIPLE,
+    ]
+    assert device._http_queue_served == 4
+    assert device._http_queue_dropped == 0
+    assert device._http_worker is None
+    await destroy_device(hass, device)
+
+
+async def test_http_queue_full(hass):
+    device = build_device(hass, **{CONF_PROTOCOL: CONF_PROTOCOL_HTTP})
+    with patch.object(device, "async_http_request", AsyncMock()) as mock:
+        for _ in range(PARAM_HTTP_QUEUE_SIZE):
+            assert device._http_enqueue(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {}, None, None)
+        # polls (packed ones included) are dropped when the queue is full..
+        assert not device._http_enqueue(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {}, None, None)
+        assert not device._http_enqueue(mc.NS_APPLIANCE_CONTROL_MULTIPLE, mc.METHOD_SET, {}, None, None)
+        # ..commands are not
+        assert device._http_enqueue(mc.NS_APPLIANCE_CONTROL_TOGGLEX, mc.METHOD_SET, {}, None, None)
+        await hass.async_block_till_done()
+    assert mock.call_args_list[0].args[0] == mc.NS_APPLIANCE_CONTROL_TOGGLEX
+    assert device._http_queue_dropped == 2
+    assert device._http_queue_served == PARAM_HTTP_QUEUE_SIZE + 1
+    assert device._http_queue_maxdepth == PARAM_HTTP_QUEUE_SIZE + 1
+    await destroy_device(hass, device)
@@ -0,0 +1,40 @@
+"""Test the HTTP client handling of (kept alive) connections."""
+from unittest.mock import AsyncMock, MagicMock
+
+import aiohttp
+import pytest
+
+from custom_components.meross_lan.merossclient import const as mc
+from custom_components.meross_lan.merossclient.httpclient import MerossHttpClient
+
+from .const import MOCK_DEVICE_IP, MOCK_KEY
+
+
+def _build_client(post: AsyncMock) -> MerossHttpClient:
+    session = MagicMock()
+    session.post = post
+    return MerossHttpClient(MOCK_DEVICE_IP, MOCK_KEY, session)
+
+
+async def test_httpclient_connect_error():
+    post = AsyncMock(
+        side_effect=aiohttp.ClientConnectorError(MagicMock(), OSError(113, "No route to host"))
+    )
+    client = _build_client(post)
+    with pytest.raises(aiohttp.ClientConnectorError):
+        await client.async_request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+    # no retry and keep-alive still to be discovered
+    assert post.await_count == 1
+    assert client.keepalive is None
+
+
+async def test_httpclient_keepalive_dropped():
+    post = AsyncMock(side_effect=aiohttp.ServerDisconnectedError())
+    client = _build_client(post)
+    with pytest.raises(aiohttp.ServerDisconnectedError):
+        await client.async_request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+    # retried once asking the device to close the connection
+    assert post.await_count == 2
+    assert post.await_args_list[0].kwargs["headers"] is None
+    assert post.await_args_list[1].kwargs["headers"] == {aiohttp.hdrs.CONNECTION: "close"}
+    assert client.keepalive is False
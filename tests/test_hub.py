@@ -0,0 +1,61 @@
+"""Test the hub subdevices (chunked) requests."""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from custom_components.meross_lan.meross_device_hub import MTS100_ALL_TYPESET
+from custom_components.meross_lan.merossclient import const as mc, MerossProtocolError
+
+from .helpers import build_device, destroy_device
+
+NAMESPACE = mc.NS_APPLIANCE_HUB_MTS100_ALL
+
+
+async def _request_subdevices(device, side_effect):
+    with patch.object(
+        device, "async_request_ack", AsyncMock(side_effect=side_effect)
+    ) as mock:
+        await device._async_request_subdevices(NAMESPACE, mc.KEY_ALL, MTS100_ALL_TYPESET)
+    return mock
+
+
+async def test_hub_chunk_timeout(hass):
+    device = build_device(hass)
+    device._online = True
+    # 2 mts100 in the mock hub: they're requested all at once (empty list)
+    mock = await _request_subdevices(device, asyncio.TimeoutError)
+    assert mock.call_count == 1
+    assert mock.call_args.args == (NAMESPACE, mc.METHOD_GET, {mc.KEY_ALL: []})
+    assert device._chunk_sizes[NAMESPACE] == 1
+    assert NAMESPACE not in device.negative_cache
+    # now they're split
+    mock = await _request_subdevices(device, asyncio.TimeoutError)
+    assert mock.call_count == 2
+    await destroy_device(hass, device)
+
+
+async def test_hub_chunk_truncated(hass):
+    device = build_device(hass)
+    device._online = True
+    reply = ({}, {mc.KEY_ALL: [{mc.KEY_ID: "01008C11"}]})
+    await _request_subdevices(device, (reply,))
+    assert device._chunk_sizes[NAMESPACE] == 1
+    # a full reply grows the chunk back
+    reply = ({}, {mc.KEY_ALL: [{mc.KEY_ID: "01008C11"}]})
+    await _request_subdevices(device, (reply, reply))
+    assert device._chunk_sizes[NAMESPACE] == 2
+    await destroy_device(hass, device)
+
+
+async def test_hub_chunk_error(hass):
+    device = build_device(hass)
+    device._online = True
+    device._chunk_sizes[NAMESPACE] = 1
+    mock = await _request_subdevices(device, MerossProtocolError({}))
+    # the ERROR is not size related: no shrink and the remaining chunks are skipped
+    assert mock.call_count == 1
+    assert device._chunk_sizes[NAMESPACE] == 1
+    assert device.negative_cache[NAMESPACE][0] == 1
+    # the namespace is suspended
+    mock = await _request_subdevices(device, MerossProtocolError({}))
+    assert mock.call_count == 0
+    await destroy_device(hass, device)
@@ -0,0 +1,55 @@
+"""Test the MQTT Hub options (own MQTT broker configuration)."""
+from homeassistant import data_entry_flow
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.meross_lan.config_flow import (
+    ERR_BASE,
+    ERR_INVALID_MQTT_BROKER,
+    OptionsFlowHandler,
+)
+from custom_components.meross_lan.const import (
+    CONF_KEY,
+    CONF_MQTT_BROKER,
+    DOMAIN,
+)
+from custom_components.meross_lan.helpers import parse_host_port
+
+from .const import MOCK_HUB_CONFIG, MOCK_KEY
+
+
+def test_parse_host_port():
+    assert parse_host_port("broker.local", 1883) == ("broker.local", 1883)
+    assert parse_host_port(" 10.0.0.7:8883 ", 1883) == ("10.0.0.7", 8883)
+    assert parse_host_port("fe80::1", 1883) == ("fe80::1", 1883)
+    assert parse_host_port("[fe80::1]", 1883) == ("fe80::1", 1883)
+    assert parse_host_port("[fe80::1]:8883", 1883) == ("fe80::1", 8883)
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["", ":1883", "broker.local:abc", "broker.local:0", "broker.local:65536", "[fe80::1", "[fe80::1]8883"],
+)
+def test_parse_host_port_invalid(value):
+    with pytest.raises(ValueError):
+        parse_host_port(value, 1883)
+
+
+async def test_hub_options_mqtt_broker(hass):
+    entry = MockConfigEntry(domain=DOMAIN, data=MOCK_HUB_CONFIG, unique_id=DOMAIN)
+    entry.add_to_hass(hass)
+    # (not going through the flow manager which would setup the integration)
+    flow = OptionsFlowHandler(entry)
+    flow.hass = hass
+    result = await flow.async_step_init()
+    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+    assert result["step_id"] == "hub"
+
+    result = await flow.async_step_hub({CONF_KEY: MOCK_KEY, CONF_MQTT_BROKER: "broker.local:port"})
+    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+    assert result["errors"] == {ERR_BASE: ERR_INVALID_MQTT_BROKER}
+    assert CONF_MQTT_BROKER not in entry.data
+
+    result = await flow.async_step_hub({CONF_KEY: MOCK_KEY, CONF_MQTT_BROKER: "[fe80::1]:8883"})
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    assert entry.data[CONF_MQTT_BROKER] == "[fe80::1]:8883"
@@ -0,0 +1,34 @@
+"""Test the integration import doesn't load modules it only needs later on."""
+import subprocess
+import sys
+
+# heavy modules which should only be loaded when a device really needs them
+LAZY_MODULES = (
+    "homeassistant.components.recorder",
+    "homeassistant.components.mqtt",
+    "custom_components.meross_lan.meross_device",
+)
+
+
+def _imported_modules(module: str) -> set[str]:
+    """returns the modules loaded by 'import module' (as reported by python -X importtime)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        modules.add(line[12:].split("|")[2].strip())
+    return modules
+
+
+def test_importtime():
+    modules = _imported_modules("custom_components.meross_lan")
+    assert "custom_components.meross_lan" in modules
+    for lazy_module in LAZY_MODULES:
+        assert lazy_module not in modules, lazy_module
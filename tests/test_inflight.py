@@ -0,0 +1,51 @@
+"""Test the single-flight GETs."""
+from custom_components.meross_lan.const import CONF_PROTOCOL, CONF_PROTOCOL_MQTT
+from custom_components.meross_lan.merossclient import const as mc
+
+from .helpers import build_device, destroy_device, mqtt_connected
+
+
+async def test_inflight_mqtt(hass):
+    device = build_device(hass, **{CONF_PROTOCOL: CONF_PROTOCOL_MQTT})
+    device._online = True
+    with mqtt_connected(device.api) as mqtt_publish:
+        device.request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        device.request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        assert mqtt_publish.call_count == 1
+        assert device._inflight_duplicates == 1
+        # the reply is overdue: don't wait for the transaction to expire
+        device.mqtt_rtt.rto = 0
+        device.request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        assert mqtt_publish.call_count == 2
+        assert device._inflight_duplicates == 1
+    await destroy_device(hass, device)
+
+
+async def test_inflight_offline(hass):
+    device = build_device(hass, **{CONF_PROTOCOL: CONF_PROTOCOL_MQTT})
+    device._online = True
+    with mqtt_connected(device.api) as mqtt_publish:
+        device.request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        assert device._inflight_gets
+        device._set_offline()
+        assert not device._inflight_gets
+        device.request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        assert mqtt_publish.call_count == 2
+    await destroy_device(hass, device)
+
+
+async def test_inflight_transaction_timeout(hass):
+    device = build_device(hass, **{CONF_PROTOCOL: CONF_PROTOCOL_MQTT})
+    device._online = True
+    with mqtt_connected(device.api):
+        device.request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        # expire every transaction
+        device._mqtt_transactions_timer.cancel()
+        device._mqtt_transactions_timeouts[:] = [
+            (0, messageid) for _, messageid in device._mqtt_transactions_timeouts
+        ]
+        device._mqtt_transactions_timeout()
+        await hass.async_block_till_done()
+        assert not device._mqtt_transactions
+        assert not device._inflight_gets
+    await destroy_device(hass, device)
@@ -0,0 +1,37 @@
+"""Bytes on the wire of a heartbeat for the liveness strategies."""
+from custom_components.meross_lan.const import CONF_PAYLOAD
+from custom_components.meross_lan.merossclient import (
+    const as mc,
+    build_default_payload_get,
+    build_payload,
+)
+from custom_components.meross_lan.merossclient.codec import CODEC
+
+from .const import MOCK_DEVICE_CONFIG, MOCK_KEY
+
+
+def _heartbeat(namespace: str, response_payload: dict) -> int:
+    request = build_payload(
+        namespace,
+        mc.METHOD_GET,
+        build_default_payload_get(namespace),
+        MOCK_KEY,
+        mc.MANUFACTURER,
+    )
+    response = build_payload(
+        namespace, mc.METHOD_GETACK, response_payload, MOCK_KEY, mc.MANUFACTURER
+    )
+    return len(CODEC.dumpb(request)) + len(CODEC.dumpb(response))
+
+
+def test_liveness_size():
+    size_all = _heartbeat(
+        mc.NS_APPLIANCE_SYSTEM_ALL,
+        {mc.KEY_ALL: MOCK_DEVICE_CONFIG[CONF_PAYLOAD][mc.KEY_ALL]},
+    )
+    size_namespace = _heartbeat(
+        mc.NS_APPLIANCE_SYSTEM_ONLINE,
+        {mc.KEY_ONLINE: {mc.KEY_STATUS: 1}},
+    )
+    # the (tcp) probe carries no payload at all
+    assert 0 < size_namespace < size_all
@@ -0,0 +1,93 @@
+"""Test the MQTT flow-control (window and bounded queue)."""
+import asyncio
+
+import pytest
+
+from custom_components.meross_lan.const import (
+    CONF_MQTT_WINDOW,
+    CONF_PROTOCOL,
+    CONF_PROTOCOL_MQTT,
+    PARAM_MQTT_QUEUE_SIZE,
+)
+from custom_components.meross_lan.merossclient import const as mc
+
+from .helpers import build_device, destroy_device, mqtt_connected, mqtt_receive_reply
+
+
+def _build_device(hass):
+    device = build_device(hass, **{CONF_PROTOCOL: CONF_PROTOCOL_MQTT, CONF_MQTT_WINDOW: 1})
+    device._online = True
+    return device
+
+
+async def test_mqtt_window_coalesce(hass):
+    device = _build_device(hass)
+    with mqtt_connected(device.api) as mqtt_publish:
+        device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_RUNTIME, mc.METHOD_GET, {})
+        # an identical plain GET is already waiting
+        device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_RUNTIME, mc.METHOD_GET, {})
+        assert mqtt_publish.call_count == 1
+        assert len(device._mqtt_queue) == 1
+        # (fake) reply to the first
+        mqtt_receive_reply(device, next(iter(device._mqtt_transactions)), mc.METHOD_ERROR)
+        assert mqtt_publish.call_count == 2
+        assert not device._mqtt_queue
+    await destroy_device(hass, device)
+
+
+async def test_mqtt_window_full(hass):
+    device = _build_device(hass)
+    loop = hass.loop
+    with mqtt_connected(device.api):
+        device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        get_future = loop.create_future()
+        device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_RUNTIME, mc.METHOD_GET, {}, None, None, get_future)
+        set_futures = [loop.create_future() for _ in range(PARAM_MQTT_QUEUE_SIZE)]
+        for set_future in set_futures:
+            device.mqtt_request(mc.NS_APPLIANCE_CONTROL_TOGGLEX, mc.METHOD_SET, {}, None, None, set_future)
+        # the GET was dropped first..
+        assert len(device._mqtt_queue) == PARAM_MQTT_QUEUE_SIZE
+        with pytest.raises(asyncio.TimeoutError):
+            await get_future
+        # ..then the oldest request
+        device.mqtt_request(mc.NS_APPLIANCE_CONTROL_TOGGLEX, mc.METHOD_SET, {})
+        assert len(device._mqtt_queue) == PARAM_MQTT_QUEUE_SIZE
+        with pytest.raises(asyncio.TimeoutError):
+            await set_futures[0]
+        assert not set_futures[1].done()
+        assert device._mqtt_queue_dropped == 2
+    await destroy_device(hass, device)
+
+
+async def test_mqtt_window_stale(hass):
+    device = _build_device(hass)
+    with mqtt_connected(device.api) as mqtt_publish:
+        device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_RUNTIME, mc.METHOD_GET, {})
+        device.mqtt_request(mc.NS_APPLIANCE_CONTROL_TOGGLEX, mc.METHOD_SET, {})
+        # age the queued requests past the transaction timeout
+        device._mqtt_queue = type(device._mqtt_queue)(
+            mqtt_request[:6] + (0,) for mqtt_request in device._mqtt_queue
+        )
+        device._mqtt_transactions.clear()
+        device._mqtt_queue_flush()
+        # the stale GET is dropped while the SET is still sent
+        assert mqtt_publish.call_count == 2
+        assert mqtt_publish.call_args.args[2] == mc.METHOD_SET
+        assert device._mqtt_queue_dropped == 1
+    await destroy_device(hass, device)
+
+
+async def test_mqtt_publish_failed(hass):
+    device = _build_device(hass)
+    with mqtt_connected(device.api) as mqtt_publish:
+        # the broker went away in the meantime
+        mqtt_publish.return_value = False
+        with pytest.raises(ConnectionError):
+            await device.async_mqtt_request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        # the window slot is free again
+        assert not device._mqtt_transactions
+        assert not device.mqtt_request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        assert not device._mqtt_transactions
+    await destroy_device(hass, device)
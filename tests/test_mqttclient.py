@@ -0,0 +1,118 @@
+"""Test the standalone MQTT client against the local broker stand-in."""
+import asyncio
+
+from custom_components.meross_lan.merossclient import const as mc
+from custom_components.meross_lan.merossclient.mqttclient import MerossMQTTClient
+
+from .mqtt_broker import MQTTBroker, topic_matches
+
+DEVICE_ID = "9109182170548290880048b1a9522933"
+PIPELINE_MESSAGES = 1000
+
+
+def test_topic_matches():
+    assert topic_matches(mc.TOPIC_DISCOVERY, f"/appliance/{DEVICE_ID}/publish")
+    assert not topic_matches(mc.TOPIC_DISCOVERY, f"/appliance/{DEVICE_ID}/subscribe")
+    assert topic_matches("/appliance/#", f"/appliance/{DEVICE_ID}/subscribe")
+
+
+def test_mqttclient_pubsub(socket_enabled):
+    async def _test():
+        async with MQTTBroker() as broker:
+            client = MerossMQTTClient("127.0.0.1", broker.port, keepalive=2)
+            received = []
+            client.on_message = received.append
+            client.start()
+            assert await client.async_wait_connected()
+            await client.async_subscribe(mc.TOPIC_DISCOVERY)
+
+            topic = f"/appliance/{DEVICE_ID}/publish"
+            # pipelined: we're not waiting for anything in between
+            for i in range(PIPELINE_MESSAGES):
+                assert client.publish(topic, str(i).encode())
+            client.publish(mc.TOPIC_REQUEST.format(DEVICE_ID), b"{}")  # not subscribed
+            for _ in range(100):
+                if len(received) == PIPELINE_MESSAGES:
+                    break
+                await asyncio.sleep(0.05)
+            assert len(received) == PIPELINE_MESSAGES
+            assert [int(m.payload) for m in received] == list(range(PIPELINE_MESSAGES))
+            assert all(m.topic == topic for m in received)
+            assert len(broker.messages) == PIPELINE_MESSAGES + 1
+
+            # keepalive (PINGREQ) must keep the connection up
+            await asyncio.sleep(2.5)
+            assert client.connected
+            await client.async_stop()
+            assert not client.connected
+
+    asyncio.run(_test())
+
+
+def test_mqttclient_reconnect(socket_enabled):
+    async def _test():
+        async with MQTTBroker() as broker:
+            client = MerossMQTTClient("127.0.0.1", broker.port)
+            disconnections = []
+            client.on_disconnect = lambda: disconnections.append(True)
+            client.start()
+            assert await client.async_wait_connected()
+            await client.async_subscribe(mc.TOPIC_DISCOVERY)
+            broker.disconnect_all()
+            await asyncio.sleep(0.1)
+            assert disconnections
+            # reconnects (backoff starts at 1 sec) and renews the subscriptions
+            assert await client.async_wait_connected(3)
+            received = []
+            client.on_message = received.append
+            await asyncio.sleep(0.1)
+            broker.publish(f"/appliance/{DEVICE_ID}/publish", b"{}")
+            await asyncio.sleep(0.1)
+            assert len(received) == 1
+            assert client.connections == 2
+            await client.async_stop()
+
+    asyncio.run(_test())
+
+
+def test_mqttclient_keepalive_flood(socket_enabled):
+    """a broker busy sending to us must not keep us from PINGREQ-ing"""
+
+    async def _test():
+        async with MQTTBroker() as broker:
+            client = MerossMQTTClient("127.0.0.1", broker.port, keepalive=2)
+            received = []
+            client.on_message = received.append
+            client.start()
+            assert await client.async_wait_connected()
+            await client.async_subscribe(mc.TOPIC_DISCOVERY)
+            topic = f"/appliance/{DEVICE_ID}/publish"
+            # flood for longer than keepalive without us sending anything
+            for _ in range(50):
+                broker.publish(topic, b"{}")
+                await asyncio.sleep(0.05)
+            assert len(received) == 50
+            assert client.published == 0
+            assert broker.pingreqs
+            assert client.connected
+            assert client.connections == 1
+            await client.async_stop()
+
+    asyncio.run(_test())
+
+
+def test_mqttclient_keepalive_disabled(socket_enabled):
+    """keepalive == 0 means no PINGREQ at all"""
+
+    async def _test():
+        async with MQTTBroker() as broker:
+            client = MerossMQTTClient("127.0.0.1", broker.port, keepalive=0)
+            client.start()
+            assert await client.async_wait_connected()
+            await asyncio.sleep(0.5)
+            assert broker.pingreqs == 0
+            assert client.connected
+            assert client.publish(f"/appliance/{DEVICE_ID}/publish", b"{}")
+            await client.async_stop()
+
+    asyncio.run(_test())
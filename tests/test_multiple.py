@@ -0,0 +1,105 @@
+"""Test the polling GETs packed in Appliance.Control.Multiple against the emulator."""
+from contextlib import contextmanager
+from json import dumps as json_dumps
+from time import time
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.meross_lan.const import CONF_PAYLOAD, CONF_PROTOCOL, CONF_PROTOCOL_HTTP
+from custom_components.meross_lan.emulator import build_emulator
+from custom_components.meross_lan.merossclient import const as mc, build_payload
+
+from .const import MOCK_DEVICE_CONFIG
+from .helpers import build_device, destroy_device
+
+# the (polled) namespaces the emulator replies to besides NS_ALL
+TRACE_NAMESPACES = {
+    mc.NS_APPLIANCE_SYSTEM_RUNTIME: {mc.KEY_RUNTIME: {mc.KEY_SIGNAL: 90}},
+    mc.NS_APPLIANCE_HUB_BATTERY: {mc.KEY_BATTERY: []},
+}
+
+
+def _build_emulator(tmp_path, device):
+    """write a (tsv) trace out of the mock config so to emulate the same device"""
+    descriptor = MOCK_DEVICE_CONFIG[CONF_PAYLOAD]
+    namespaces = {
+        mc.NS_APPLIANCE_SYSTEM_ABILITY: {mc.KEY_ABILITY: descriptor[mc.KEY_ABILITY]},
+        mc.NS_APPLIANCE_SYSTEM_ALL: {mc.KEY_ALL: descriptor[mc.KEY_ALL]},
+        **TRACE_NAMESPACES,
+    }
+    tracefile = tmp_path / "msh300.csv"
+    tracefile.write_text(
+        "".join(
+            f"0\tRX\thttp\t{mc.METHOD_GETACK}\t{namespace}\t{json_dumps(payload)}\n"
+            for namespace, payload in namespaces.items()
+        ),
+        encoding="utf8",
+    )
+    return build_emulator(str(tracefile), device.device_id, device.key)
+
+
+@contextmanager
+def _emulated(device, emulator):
+    """serve the device HTTP requests through the emulator: yields the namespaces requested"""
+    requests = []
+
+    async def _async_request(namespace: str, method: str, payload: dict):
+        requests.append(namespace)
+        message = build_payload(namespace, method, payload, emulator.key, mc.MANUFACTURER)
+        return emulator.handle(message[mc.KEY_HEADER], message[mc.KEY_PAYLOAD])
+
+    with patch.object(device._get_httpclient(), "async_request", _async_request):
+        yield requests
+
+
+def _build_device(hass):
+    device = build_device(hass, **{CONF_PROTOCOL: CONF_PROTOCOL_HTTP})
+    device._online = True
+    device.hasmqtt = False
+    return device
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_multiple_dispatch(hass, tmp_path):
+    device = _build_device(hass)
+    emulator = _build_emulator(tmp_path, device)
+    assert device._multiple_len == 5
+    with _emulated(device, emulator) as requests:
+        await device._async_request_updates(time(), None)
+        await hass.async_block_till_done()
+    # a single packed request (DNDMode is always requested right after NS_ALL on HTTP)..
+    assert requests == [mc.NS_APPLIANCE_CONTROL_MULTIPLE, mc.NS_APPLIANCE_SYSTEM_DNDMODE]
+    assert device._multiple_len == 5
+    # ..and every reply unpacked and dispatched to its own namespace
+    for namespace in (mc.NS_APPLIANCE_SYSTEM_ALL, *TRACE_NAMESPACES):
+        policy = device.polling_dictionary[namespace]
+        assert policy.lastupdate
+        assert policy.lastupdate >= policy.lastrequest
+        assert namespace not in device.negative_cache
+    await destroy_device(hass, device)
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_multiple_error(hass, tmp_path):
+    device = _build_device(hass)
+    emulator = _build_emulator(tmp_path, device)
+    # the device chokes on our packed request
+    emulator.descriptor.ability[mc.NS_APPLIANCE_CONTROL_MULTIPLE][mc.KEY_MAXCMDNUM] = 1
+    with _emulated(device, emulator) as requests:
+        await device._async_request_updates(time(), None)
+        await hass.async_block_till_done()
+    # batching is disabled and the requests re-sent one by one
+    assert device._multiple_len == 0
+    assert requests[0] == mc.NS_APPLIANCE_CONTROL_MULTIPLE
+    assert sorted(requests[1:]) == sorted(
+        (mc.NS_APPLIANCE_SYSTEM_ALL, mc.NS_APPLIANCE_SYSTEM_DNDMODE, *TRACE_NAMESPACES)
+    )
+    for namespace in (mc.NS_APPLIANCE_SYSTEM_ALL, *TRACE_NAMESPACES):
+        assert device.polling_dictionary[namespace].lastupdate
+    # and the next cycle doesn't pack anymore
+    with _emulated(device, emulator) as requests:
+        await device._async_request_updates(time(), None)
+        await hass.async_block_till_done()
+    assert mc.NS_APPLIANCE_CONTROL_MULTIPLE not in requests
+    await destroy_device(hass, device)
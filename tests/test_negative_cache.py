@@ -0,0 +1,117 @@
+"""Test the negative cache of the (polled) namespaces failing on the device."""
+from copy import deepcopy
+from time import time
+from unittest.mock import AsyncMock, patch
+
+from custom_components.meross_lan.const import (
+    CONF_NEGATIVE_CACHE,
+    CONF_PAYLOAD,
+    DOMAIN,
+    PARAM_NEGATIVE_CACHE_BACKOFF_MIN,
+)
+from custom_components.meross_lan.merossclient import const as mc, build_payload
+
+from .helpers import build_device, destroy_device
+
+NAMESPACE = mc.NS_APPLIANCE_SYSTEM_RUNTIME
+
+
+def _receive(device, namespace: str, method: str, payload: dict | None = None):
+    message = build_payload(namespace, method, payload or {}, device.key, mc.MANUFACTURER)
+    device.receive(message[mc.KEY_HEADER], message[mc.KEY_PAYLOAD], None)
+
+
+def _build_device(hass, **data):
+    device = build_device(hass, **data)
+    device._online = True
+    return device
+
+
+async def test_negative_cache_backoff(hass):
+    device = _build_device(hass)
+    policy = device.polling_policy_add(NAMESPACE, skip_mqtt=False)
+    # an ERROR to a SET is not a polling failure
+    _receive(device, NAMESPACE, mc.METHOD_ERROR)
+    assert NAMESPACE not in device.negative_cache
+    # ERRORs to our GETs are, with doubling backoff
+    epoch = time()
+    policy.lastrequest = epoch
+    _receive(device, NAMESPACE, mc.METHOD_ERROR)
+    failures, until = device.negative_cache[NAMESPACE]
+    assert failures == 1
+    assert until - epoch >= PARAM_NEGATIVE_CACHE_BACKOFF_MIN
+    # accounted once per request
+    _receive(device, NAMESPACE, mc.METHOD_ERROR)
+    assert device.negative_cache[NAMESPACE][0] == 1
+    policy.lastrequest = time()
+    _receive(device, NAMESPACE, mc.METHOD_ERROR)
+    failures, until = device.negative_cache[NAMESPACE]
+    assert failures == 2
+    assert until - epoch >= 2 * PARAM_NEGATIVE_CACHE_BACKOFF_MIN
+    # not polled while suspended
+    with patch.object(device, "async_request_poll", AsyncMock()) as poll_mock:
+        await device.async_request_updates(time(), None)
+    assert NAMESPACE not in [call.args[0] for call in poll_mock.call_args_list]
+    # and released as soon as it works again
+    _receive(device, NAMESPACE, mc.METHOD_GETACK)
+    assert NAMESPACE not in device.negative_cache
+    await destroy_device(hass, device)
+
+
+async def test_negative_cache_persistence(hass):
+    device = _build_device(hass)
+    device.polling_policy_add(NAMESPACE).lastrequest = time()
+    _receive(device, NAMESPACE, mc.METHOD_ERROR)
+    await hass.async_block_till_done()
+    entry = hass.config_entries.async_get_entry(device.entry_id)
+    data = deepcopy(dict(entry.data))
+    assert NAMESPACE in data[CONF_NEGATIVE_CACHE]["namespaces"]
+    await destroy_device(hass, device)
+    await hass.config_entries.async_remove(entry.entry_id)
+    # restored on reload..
+    device = _build_device(hass, **data)
+    assert device.negative_cache[NAMESPACE][0] == 1
+    entry = hass.config_entries.async_get_entry(device.entry_id)
+    await destroy_device(hass, device)
+    await hass.config_entries.async_remove(entry.entry_id)
+    # ..unless the device abilities changed in the meantime
+    data[CONF_PAYLOAD][mc.KEY_ABILITY]["Appliance.Control.ToggleX"] = {}
+    device = _build_device(hass, **data)
+    assert not device.negative_cache
+    await destroy_device(hass, device)
+
+
+async def test_negative_cache_invalidation(hass):
+    device = _build_device(hass)
+    device.negative_cache[NAMESPACE] = [1, time() + PARAM_NEGATIVE_CACHE_BACKOFF_MIN]
+    device._online = False
+    with patch.object(device, "_async_request_updates", AsyncMock()), patch.object(
+        device, "request_get"
+    ) as request_get_mock:
+        # coming online the device is asked for its (eventually new) abilities
+        _receive(device, mc.NS_APPLIANCE_SYSTEM_TIME, mc.METHOD_GETACK)
+        assert device.online
+        request_get_mock.assert_called_once_with(mc.NS_APPLIANCE_SYSTEM_ABILITY)
+        # the same abilities: the negative cache is still valid..
+        ability = deepcopy(device.descriptor.ability)
+        _receive(device, mc.NS_APPLIANCE_SYSTEM_ABILITY, mc.METHOD_GETACK, {mc.KEY_ABILITY: ability})
+        assert NAMESPACE in device.negative_cache
+        # ..while new ones invalidate it
+        ability["Appliance.Control.ToggleX"] = {}
+        _receive(device, mc.NS_APPLIANCE_SYSTEM_ABILITY, mc.METHOD_GETACK, {mc.KEY_ABILITY: ability})
+        assert not device.negative_cache
+        await hass.async_block_till_done()
+    entry = hass.config_entries.async_entries(DOMAIN)[0]
+    assert not entry.data[CONF_NEGATIVE_CACHE]["namespaces"]
+    await destroy_device(hass, device)
+
+
+async def test_negative_cache_hub_pairing(hass):
+    device = _build_device(hass)
+    device.negative_cache[NAMESPACE] = [1, time() + PARAM_NEGATIVE_CACHE_BACKOFF_MIN]
+    p_hub = deepcopy(device.descriptor.digest[mc.KEY_HUB])
+    p_hub[mc.KEY_SUBDEVICE].append({mc.KEY_ID: "0100AAAA", "mts100v3": {}})
+    with patch.object(device, "request_get") as request_get_mock:
+        device._parse_hub(p_hub)
+        request_get_mock.assert_called_once_with(mc.NS_APPLIANCE_SYSTEM_ABILITY)
+    await destroy_device(hass, device)
@@ -0,0 +1,104 @@
+"""Test the circuit breaker (backoff and quarantine) for offline devices."""
+import asyncio
+from time import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from custom_components.meross_lan.const import (
+    CONF_HOST,
+    CONF_PROTOCOL,
+    CONF_PROTOCOL_HTTP,
+    DOMAIN,
+    PARAM_OFFLINE_BACKOFF_MAX,
+    PARAM_QUARANTINE_PERIOD,
+    PARAM_QUARANTINE_TIMEOUT,
+)
+
+from .helpers import build_device, destroy_device
+
+
+def _build_device(hass):
+    device = build_device(hass, **{CONF_PROTOCOL: CONF_PROTOCOL_HTTP})
+    device.lastrequest = 1  # (long) past the startup request
+    device._polling_epoch = time()
+    return device
+
+
+async def test_offline_backoff(hass):
+    device = _build_device(hass)
+    delays = []
+    with patch.object(device, "_async_request_offline", AsyncMock()) as offline_mock, patch.object(
+        device.api, "polling_schedule"
+    ):
+        while len(delays) < 6:
+            await device._async_polling_callback()
+            delays.append(device._polling_delay)
+    period = device.polling_period
+    expected = []
+    delay = period
+    for _ in range(6):
+        delay = min(delay * 2, PARAM_OFFLINE_BACKOFF_MAX)
+        expected.append(delay)
+    assert delays == expected
+    assert delays[-1] == PARAM_OFFLINE_BACKOFF_MAX
+    assert offline_mock.call_count == 6
+    assert not device.quarantined
+    await destroy_device(hass, device)
+
+
+async def test_offline_quarantine(hass):
+    device = _build_device(hass)
+    device._offline_epoch = time() - PARAM_QUARANTINE_TIMEOUT - 1
+    api = device.api
+    with patch.object(device, "_async_request_offline", AsyncMock()), patch.object(
+        api, "polling_schedule"
+    ):
+        await device._async_polling_callback()
+        assert device.quarantined
+        assert device._polling_delay == PARAM_QUARANTINE_PERIOD
+        # the quarantine lane is separate from the healthy devices one
+        with patch.object(device, "_async_polling_callback", AsyncMock()) as polling_mock:
+            async with api._quarantine_semaphore:
+                task = hass.async_create_task(api._async_polling_run(device))
+                await asyncio.sleep(0)
+                assert not polling_mock.called
+                assert not api._polling_semaphore.locked()
+            await task
+            assert polling_mock.call_count == 1
+    await destroy_device(hass, device)
+
+
+async def test_offline_dhcp_reset(hass):
+    """a (DHCP) address update bypasses the backoff"""
+    device = _build_device(hass)
+    device._offline_epoch = time() - PARAM_QUARANTINE_TIMEOUT - 1
+    api = device.api
+    with patch.object(device, "_async_request_offline", AsyncMock()), patch.object(
+        api, "polling_schedule"
+    ) as schedule_mock:
+        await device._async_polling_callback()
+        assert device.quarantined
+        entry = hass.config_entries.async_entries(DOMAIN)[0]
+        hass.config_entries.async_update_entry(
+            entry, data=dict(entry.data, **{CONF_HOST: "10.0.0.2"})
+        )
+        await hass.async_block_till_done()
+        assert device.host == "10.0.0.2"
+        assert device.lastrequest == 0
+        assert not device.quarantined
+        assert device._polling_delay == device.polling_period
+        assert schedule_mock.call_args.args == (device, 0)
+    await destroy_device(hass, device)
+
+
+async def test_offline_probe_tcp(hass):
+    device = _build_device(hass)
+    writer = MagicMock()
+    writer.wait_closed = AsyncMock(side_effect=ConnectionResetError())
+    with patch("asyncio.open_connection", AsyncMock(return_value=(None, writer))):
+        # accepted: the close handshake is awaited but its outcome doesn't matter
+        assert await device._async_probe_tcp()
+        writer.close.assert_called_once()
+        writer.wait_closed.assert_awaited_once()
+    with patch("asyncio.open_connection", AsyncMock(side_effect=ConnectionRefusedError())):
+        assert not await device._async_probe_tcp()
+    await destroy_device(hass, device)
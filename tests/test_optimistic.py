@@ -0,0 +1,112 @@
+"""Test the optimistic commands confirmation/rollback."""
+import asyncio
+from logging import WARNING
+from unittest.mock import patch
+
+from custom_components.meross_lan.const import CONF_DEVICE_ID, CONF_KEY, CONF_PAYLOAD
+from custom_components.meross_lan.meross_entity import EXTRA_ATTR_PENDING, STATE_OFF, STATE_ON
+from custom_components.meross_lan.merossclient import const as mc
+
+from .const import MOCK_KEY
+from .helpers import AckMock, build_device, destroy_device
+
+NAMESPACE = mc.NS_APPLIANCE_HUB_MTS100_ADJUST
+P_LIGHT = {"channel": 0, "capacity": 6, "rgb": 16753920, "temperature": 100, "luminance": 100, "onoff": 1}
+MOCK_BULB_CONFIG = {
+    CONF_DEVICE_ID: "2010158110545390855148e1e9a1b2c3",
+    CONF_KEY: MOCK_KEY,
+    CONF_PAYLOAD: {
+        mc.KEY_ALL: {"system": {"hardware": {"type": "msl120", "version": "2.0.0", "uuid": "2010158110545390855148e1e9a1b2c3", "macAddress": "48:e1:e9:a1:b2:c3"}, "firmware": {"version": "2.1.2", "innerIp": "10.0.0.2"}}, "digest": {"light": P_LIGHT}},
+        mc.KEY_ABILITY: {"Appliance.System.All": {}, "Appliance.System.Ability": {}, "Appliance.Control.Light": {"capacity": 7}},
+    },
+}
+
+
+def _build_entity(hass):
+    device = build_device(hass)
+    entity = device.subdevices["01008C11"].number_adjust_temperature
+    entity._attr_state = 0
+    return device, entity
+
+
+async def test_optimistic_reported(hass):
+    """a state reported by the device while the command is pending is not rolled back"""
+    device, entity = _build_entity(hass)
+    ack = AckMock()
+    with patch.object(device, "async_request_ack", ack):
+        task = hass.async_create_task(entity.async_request_optimistic(NAMESPACE, {}, 5))
+        await asyncio.sleep(0)
+        assert entity._attr_state == 5
+        entity.update_state(5)  # i.e. a PUSH
+        ack.requests[0][3].set_exception(asyncio.TimeoutError())
+        await task
+    assert entity._attr_state == 5
+    assert EXTRA_ATTR_PENDING not in entity.extra_state_attributes
+    await destroy_device(hass, device)
+
+
+async def test_optimistic_superseded(hass):
+    """only the latest command rolls back"""
+    device, entity = _build_entity(hass)
+    ack = AckMock()
+    with patch.object(device, "async_request_ack", ack):
+        task_1 = hass.async_create_task(entity.async_request_optimistic(NAMESPACE, {}, 1))
+        task_2 = hass.async_create_task(entity.async_request_optimistic(NAMESPACE, {}, 2))
+        await asyncio.sleep(0)
+        assert entity._attr_state == 2
+        # the older fails: the newer owns the state
+        ack.requests[0][3].set_exception(asyncio.TimeoutError())
+        await task_1
+        assert entity._attr_state == 2
+        # the newer fails too: back to the state before any command
+        ack.requests[1][3].set_exception(asyncio.TimeoutError())
+        await task_2
+    assert entity._attr_state == 0
+    assert entity._optimistic_token is None
+    await destroy_device(hass, device)
+
+
+async def test_optimistic_error(hass):
+    """unexpected errors roll back and are logged"""
+    device, entity = _build_entity(hass)
+    ack = AckMock()
+    with patch.object(device, "async_request_ack", ack), patch.object(
+        device, "log"
+    ) as log_mock:
+        task = hass.async_create_task(entity.async_request_optimistic(NAMESPACE, {}, 5))
+        await asyncio.sleep(0)
+        ack.requests[0][3].set_exception(KeyError("oops"))
+        await task
+        assert entity._attr_state == 0
+        assert log_mock.call_args.args[0] == WARNING
+        assert "KeyError" in log_mock.call_args.args
+        # timeouts are expected and not worth a warning
+        log_mock.reset_mock()
+        task = hass.async_create_task(entity.async_request_optimistic(NAMESPACE, {}, 5))
+        await asyncio.sleep(0)
+        ack.requests[1][3].set_exception(asyncio.TimeoutError())
+        await task
+        assert not log_mock.called
+    await destroy_device(hass, device)
+
+
+async def test_optimistic_light_off(hass):
+    """the ACK to turn_off confirms the light payload too (so later PUSHes are not skipped)"""
+    device = build_device(hass, MOCK_BULB_CONFIG)
+    device._online = True
+    light = device.entities[0]
+    device._handle_Appliance_Control_Light({}, {mc.KEY_LIGHT: dict(P_LIGHT)})
+    assert light.is_on
+    ack = AckMock()
+    with patch.object(device, "async_request_ack", ack):
+        task = hass.async_create_task(light.async_turn_off())
+        await asyncio.sleep(0)
+        assert ack.requests[0][0] == mc.NS_APPLIANCE_CONTROL_LIGHT
+        ack.requests[0][3].set_result(({}, {}))
+        await task
+    assert light._attr_state == STATE_OFF
+    assert light._light[mc.KEY_ONOFF] == 0
+    # switched on again from the app
+    device._handle_Appliance_Control_Light({}, {mc.KEY_LIGHT: dict(P_LIGHT)})
+    assert light._attr_state == STATE_ON
+    await destroy_device(hass, device)
@@ -0,0 +1,124 @@
+"""Test the polling policies: the option parser and the policy engine."""
+from time import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from custom_components.meross_lan.config_flow import (
+    ERR_INVALID_POLLING_POLICY,
+    ConfigError,
+    _parse_polling_policy,
+)
+from custom_components.meross_lan.const import CONF_PAYLOAD
+from custom_components.meross_lan.merossclient import const as mc
+
+from .const import MOCK_DEVICE_CONFIG
+from .helpers import build_device, destroy_device
+
+ABILITY = MOCK_DEVICE_CONFIG[CONF_PAYLOAD][mc.KEY_ABILITY]
+
+
+def test_parse_polling_policy():
+    assert _parse_polling_policy(None, ABILITY) == {}
+    assert _parse_polling_policy(" , ", ABILITY) == {}
+    assert _parse_polling_policy(
+        f"{mc.NS_APPLIANCE_SYSTEM_RUNTIME}:60, {mc.NS_APPLIANCE_HUB_BATTERY} : 0,",
+        ABILITY,
+    ) == {mc.NS_APPLIANCE_SYSTEM_RUNTIME: 60, mc.NS_APPLIANCE_HUB_BATTERY: 0}
+    # without an ability (unknown device) any namespace is accepted
+    assert _parse_polling_policy("Appliance.Unknown:30", {}) == {"Appliance.Unknown": 30}
+
+
+@pytest.mark.parametrize(
+    "value,ability",
+    [
+        ("Appliance.Unknown:30", ABILITY),  # not supported by the device
+        (f"{mc.NS_APPLIANCE_SYSTEM_RUNTIME}:abc", ABILITY),
+        (f"{mc.NS_APPLIANCE_SYSTEM_RUNTIME}", ABILITY),
+        (f"{mc.NS_APPLIANCE_SYSTEM_RUNTIME}:-1", ABILITY),
+        (":60", {}),
+    ],
+)
+def test_parse_polling_policy_error(value, ability):
+    with pytest.raises(ConfigError) as error:
+        _parse_polling_policy(value, ability)
+    assert error.value.reason == ERR_INVALID_POLLING_POLICY
+
+
+def _build_device(hass):
+    device = build_device(hass)
+    device._online = True
+    device.polling_dictionary.clear()
+    return device
+
+
+async def _polled(device, epoch, namespace=None) -> list[str]:
+    with patch.object(device, "async_request_poll", AsyncMock()) as poll_mock:
+        await device.async_request_updates(epoch, namespace)
+    return [call.args[0] for call in poll_mock.call_args_list]
+
+
+async def test_policy_period(hass):
+    device = _build_device(hass)
+    policy = device.polling_policy_add(
+        mc.NS_APPLIANCE_SYSTEM_RUNTIME, period=60, skip_mqtt=False
+    )
+    epoch = time()
+    # never updated: requested whatever the period
+    assert await _polled(device, epoch) == [mc.NS_APPLIANCE_SYSTEM_RUNTIME]
+    policy.lastupdate = epoch - 30
+    assert await _polled(device, epoch) == []
+    policy.lastupdate = epoch - 60
+    assert await _polled(device, epoch) == [mc.NS_APPLIANCE_SYSTEM_RUNTIME]
+    await destroy_device(hass, device)
+
+
+async def test_policy_skip_mqtt(hass):
+    device = _build_device(hass)
+    policy = device.polling_policy_add(mc.NS_APPLIANCE_HUB_BATTERY)
+    epoch = time()
+    policy.lastupdate = epoch - 1
+    device.lastmqtt = epoch
+    assert await _polled(device, epoch) == []
+    # MQTT silent for long: back to polling
+    device.lastmqtt = 0
+    assert await _polled(device, epoch) == [mc.NS_APPLIANCE_HUB_BATTERY]
+    await destroy_device(hass, device)
+
+
+async def test_policy_entities(hass):
+    device = _build_device(hass)
+    entity = MagicMock(enabled=False)
+    device.polling_policy_add(mc.NS_APPLIANCE_HUB_BATTERY, entities=(entity,))
+    epoch = time()
+    assert await _polled(device, epoch) == []
+    entity.enabled = True
+    assert await _polled(device, epoch) == [mc.NS_APPLIANCE_HUB_BATTERY]
+    await destroy_device(hass, device)
+
+
+async def test_policy_override(hass):
+    device = _build_device(hass)
+    policy = device.polling_policy_add(mc.NS_APPLIANCE_HUB_BATTERY, period=3600)
+    epoch = time()
+    policy.lastupdate = epoch - 20
+    device.lastmqtt = epoch
+    device.polling_overrides = {mc.NS_APPLIANCE_HUB_BATTERY: 10}
+    # the override wins over both the policy period and skip_mqtt
+    assert await _polled(device, epoch) == [mc.NS_APPLIANCE_HUB_BATTERY]
+    policy.lastupdate = epoch - 5
+    assert await _polled(device, epoch) == []
+    await destroy_device(hass, device)
+
+
+async def test_policy_online(hass):
+    """coming online everything is requested but the namespace just received"""
+    device = _build_device(hass)
+    epoch = time()
+    for namespace in (mc.NS_APPLIANCE_SYSTEM_RUNTIME, mc.NS_APPLIANCE_HUB_BATTERY):
+        device.polling_policy_add(namespace, period=3600).lastupdate = epoch
+    device.lastmqtt = epoch
+    assert await _polled(device, epoch, mc.NS_APPLIANCE_SYSTEM_RUNTIME) == [
+        mc.NS_APPLIANCE_HUB_BATTERY
+    ]
+    await destroy_device(hass, device)
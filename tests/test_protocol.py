@@ -0,0 +1,85 @@
+"""Test the (protocol auto) transport probing and selection."""
+from time import time
+from unittest.mock import AsyncMock, patch
+
+from custom_components.meross_lan.const import (
+    CONF_LIVENESS,
+    CONF_LIVENESS_NAMESPACE,
+    CONF_PROTOCOL,
+    CONF_PROTOCOL_AUTO,
+    CONF_PROTOCOL_HTTP,
+    CONF_PROTOCOL_MQTT,
+)
+from custom_components.meross_lan.merossclient import const as mc
+
+from .helpers import build_device, destroy_device, mqtt_connected
+
+
+def _build_device(hass):
+    device = build_device(
+        hass,
+        **{CONF_PROTOCOL: CONF_PROTOCOL_AUTO, CONF_LIVENESS: CONF_LIVENESS_NAMESPACE},
+    )
+    device._online = True
+    device.hedge = True
+    device._host = "10.0.0.1"
+    device.hasmqtt = True
+    device.lastmqtt = time()
+    return device
+
+
+async def test_protocol_probe_liveness(hass):
+    device = _build_device(hass)
+    with mqtt_connected(device.api), patch.object(
+        device, "async_http_request_strict", AsyncMock()
+    ) as http_mock, patch.object(
+        device, "async_mqtt_request", AsyncMock()
+    ) as mqtt_mock:
+        device.curr_protocol = CONF_PROTOCOL_MQTT
+        await device._async_protocol_probe(time())
+        assert http_mock.call_args.args[0] == mc.NS_APPLIANCE_SYSTEM_ONLINE
+        # not before PARAM_PROTOCOL_PROBE_PERIOD
+        await device._async_protocol_probe(time())
+        assert http_mock.call_count == 1
+        device._protocol_probe_epoch = 0
+        device.curr_protocol = CONF_PROTOCOL_HTTP
+        await device._async_protocol_probe(time())
+        assert mqtt_mock.call_args.args[0] == mc.NS_APPLIANCE_SYSTEM_ONLINE
+    await destroy_device(hass, device)
+
+
+async def test_protocol_switch_deliberate(hass):
+    device = _build_device(hass)
+    device.curr_protocol = CONF_PROTOCOL_MQTT
+    device.mqtt_rtt.sample(1)
+    device._get_httpclient().rtt.sample(0.1)
+    with mqtt_connected(device.api):
+        device._protocol_select(time())
+        assert device.curr_protocol is CONF_PROTOCOL_HTTP
+        assert device.pref_protocol is CONF_PROTOCOL_HTTP
+        # MQTT is still known to work: hedging (and fallback) stay enabled
+        assert device.lastmqtt
+        assert device._hedge_enabled(mc.METHOD_SET)
+        # a failure driven switch is not as confident
+        device.switch_protocol(CONF_PROTOCOL_MQTT, "http TimeoutError")
+        assert not device.lastmqtt
+        assert not device._hedge_enabled(mc.METHOD_SET)
+    await destroy_device(hass, device)
+
+
+async def test_protocol_publish_failed(hass):
+    device = _build_device(hass)
+    device.hedge = False
+    device.curr_protocol = CONF_PROTOCOL_MQTT
+    with mqtt_connected(device.api) as mqtt_publish, patch.object(
+        device, "_http_enqueue", return_value=False
+    ) as http_mock:
+        # the broker went away in the meantime: fall back to HTTP
+        mqtt_publish.return_value = False
+        device.request(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {})
+        assert mqtt_publish.call_count == 1
+        assert device.curr_protocol is CONF_PROTOCOL_HTTP
+        assert http_mock.call_args.args[0] == mc.NS_APPLIANCE_SYSTEM_ALL
+        assert not device._mqtt_transactions
+        assert not device._inflight_gets
+    await destroy_device(hass, device)
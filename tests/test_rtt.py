@@ -0,0 +1,51 @@
+"""Test the (RFC 6298 like) round trip time estimator."""
+from custom_components.meross_lan.merossclient import RttEstimator
+
+
+def test_rtt_sample():
+    rtt = RttEstimator(rto_max=5)
+    assert rtt.srtt is None
+    assert rtt.rto == 1
+    rtt.sample(0.2)
+    assert rtt.srtt == 0.2
+    assert rtt.rttvar == 0.1
+    # srtt + 4 * rttvar = 0.6 is clamped to rto_min
+    assert rtt.rto == rtt.rto_min == 1
+    rtt.sample(2)
+    assert 0.2 < rtt.srtt < 2
+    assert rtt.rto == min(rtt.srtt + 4 * rtt.rttvar, 5)
+    assert rtt.samples == 2
+    rtt.sample(10)
+    assert rtt.rto == 5
+
+
+def test_rtt_timeout_backoff():
+    rtt = RttEstimator(rto_max=5)
+    rtt.sample(0.1)
+    assert rtt.rto == 1
+    rtt.timeout()
+    assert rtt.rto == 2
+    rtt.timeout()
+    assert rtt.rto == 4
+    rtt.timeout()
+    assert rtt.rto == 5
+    assert rtt.timeouts == 3
+    # a fresh sample recomputes the rto
+    rtt.sample(0.1)
+    assert rtt.rto == 1
+
+
+def test_rtt_attempts():
+    rtt = RttEstimator()
+    assert rtt.attempts == 3
+    for _ in range(50):
+        rtt.sample(0.1)
+    assert rtt.loss == 0
+    # a healthy device always gets a retry
+    assert rtt.attempts == 2
+    rtt.timeout()
+    assert 0.1 < rtt.loss
+    assert rtt.attempts == 3
+    while rtt.loss >= 0.1:
+        rtt.sample(0.1)
+    assert rtt.attempts == 2
@@ -0,0 +1,91 @@
+"""Test (and micro-benchmark) the protocol signing helper."""
+from hashlib import md5
+from time import perf_counter
+
+import pytest
+
+from custom_components.meross_lan.merossclient import (
+    const as mc,
+    MerossSigner,
+    build_payload,
+    get_replykey,
+)
+
+from .const import MOCK_KEY
+
+BENCHMARK_MESSAGES = 10000
+
+
+def _legacy_sign(header: dict, key: str):
+    return md5((header[mc.KEY_MESSAGEID] + key + str(header[mc.KEY_TIMESTAMP])).encode('utf-8')).hexdigest()
+
+
+def test_signing_wire_format():
+    signer = MerossSigner()
+    messageids = set()
+    for _ in range(100):
+        messageid = signer.messageid()
+        assert len(messageid) == 32
+        int(messageid, 16)
+        messageids.add(messageid)
+    assert len(messageids) == 100
+
+    message = build_payload(mc.NS_APPLIANCE_SYSTEM_ALL, mc.METHOD_GET, {}, MOCK_KEY, mc.MANUFACTURER)
+    header = message[mc.KEY_HEADER]
+    assert header[mc.KEY_SIGN] == _legacy_sign(header, MOCK_KEY)
+    assert get_replykey(header, MOCK_KEY) is MOCK_KEY
+    # verified cache must not hide a wrong key
+    assert get_replykey(header, "wrong_key") is header
+    header[mc.KEY_TIMESTAMP] += 1
+    assert get_replykey(header, MOCK_KEY) is header
+
+
+def test_signing_verify():
+    signer = MerossSigner()
+    headers = []
+    for i in range(1000):
+        messageid = signer.messageid()
+        timestamp = 1638365548 + i // 100
+        headers.append({
+            mc.KEY_MESSAGEID: messageid,
+            mc.KEY_TIMESTAMP: timestamp,
+            mc.KEY_SIGN: signer.sign(messageid, MOCK_KEY, timestamp),
+        })
+    assert len({header[mc.KEY_MESSAGEID] for header in headers}) == len(headers)
+
+    verifier = MerossSigner()
+    for header in headers:
+        # the cached suffix must not leak across timestamps
+        assert header[mc.KEY_SIGN] == _legacy_sign(header, MOCK_KEY)
+        assert verifier.verify(header, MOCK_KEY)
+        assert not verifier.verify(header, "wrong_key")
+    # the verified cache is bounded
+    assert len(verifier._verified) <= MerossSigner.VERIFIED_CACHE_SIZE
+
+
+@pytest.mark.benchmark
+def test_signing_benchmark(capsys):
+    signer = MerossSigner()
+    t_start = perf_counter()
+    headers = []
+    for i in range(BENCHMARK_MESSAGES):
+        messageid = signer.messageid()
+        timestamp = 1638365548 + i // 1000
+        headers.append({
+            mc.KEY_MESSAGEID: messageid,
+            mc.KEY_TIMESTAMP: timestamp,
+            mc.KEY_SIGN: signer.sign(messageid, MOCK_KEY, timestamp),
+        })
+    t_sign = perf_counter() - t_start
+
+    verifier = MerossSigner()
+    t_start = perf_counter()
+    for header in headers:
+        verifier.verify(header, MOCK_KEY)
+    t_verify = perf_counter() - t_start
+
+    with capsys.disabled():
+        print(
+            f"\n{BENCHMARK_MESSAGES} messages: sign {BENCHMARK_MESSAGES / t_sign:.0f} msg/s"
+            f" - verify {BENCHMARK_MESSAGES / t_verify:.0f} msg/s"
+        )
@@ -0,0 +1,89 @@
+"""Test the polling 'transition mode' (entities moving)."""
+import asyncio
+from time import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from custom_components.meross_lan.merossclient import const as mc
+
+from .helpers import build_device, destroy_device
+
+NAMESPACE = mc.NS_APPLIANCE_ROLLERSHUTTER_POSITION
+
+
+def _build_device(hass):
+    device = build_device(hass)
+    device._online = True
+    return device
+
+
+async def test_transition_running(hass):
+    device = _build_device(hass)
+    device._transitions[MagicMock()] = (NAMESPACE,)
+    gate = hass.loop.create_future()
+    polled = []
+
+    async def _async_request_poll(namespace, payload):
+        polled.append(namespace)
+        await gate
+
+    with patch.object(device, "async_request_poll", _async_request_poll), patch.object(
+        device, "async_multiple_requests_flush", AsyncMock()
+    ), patch.object(device, "async_request_updates", AsyncMock()) as updates_mock:
+        task = hass.async_create_task(device._async_request_transition())
+        await asyncio.sleep(0)
+        assert polled == [NAMESPACE]
+        # transitions don't overlap..
+        await device._async_request_transition()
+        assert device._transition_requests == 1
+        # ..but don't hold back a full update (i.e. coming online)
+        await device._async_request_updates(time(), None)
+        assert updates_mock.call_count == 1
+        assert device._updates_duplicates == 0
+        gate.set_result(None)
+        await task
+        assert not device._transition_running
+        # while a full update is running, the transition is skipped
+        device._updates_running = True
+        await device._async_request_transition()
+        assert device._transition_requests == 1
+        device._updates_running = False
+    await destroy_device(hass, device)
+
+
+async def test_transition_polling(hass):
+    device = _build_device(hass)
+    api = device.api
+    entity = MagicMock()
+    api.polling_schedule(device, device.transition_period + 10)
+    with patch.object(api, "polling_schedule") as schedule_mock:
+        # entering the transition mode anticipates the polling cycle..
+        device.transition_start(entity, (NAMESPACE,))
+        assert schedule_mock.call_args.args == (device, device.transition_period)
+        # ..only once
+        device.transition_start(entity, (NAMESPACE,))
+        assert schedule_mock.call_count == 1
+        device._polling_epoch = time()
+        with patch.object(
+            device, "_async_request_transition", AsyncMock()
+        ) as transition_mock, patch.object(
+            device, "_async_request_updates", AsyncMock()
+        ) as updates_mock:
+            await device._async_polling_callback()
+        # the regular cycle is not due yet
+        assert transition_mock.call_count == 1
+        assert not updates_mock.called
+        assert schedule_mock.call_args.args[1] <= device.transition_period
+    assert device.transition_end(entity)
+    assert not device.transition_end(entity)
+    await destroy_device(hass, device)
+
+
+async def test_transition_advance_later(hass):
+    """an already closer polling cycle is not postponed"""
+    device = _build_device(hass)
+    api = device.api
+    api.polling_schedule(device, 1)
+    with patch.object(api, "polling_schedule") as schedule_mock:
+        device.transition_start(MagicMock(), (NAMESPACE,))
+        assert not schedule_mock.called
+    await destroy_device(hass, device)